@@ -0,0 +1,60 @@
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from loguru import logger
+
+
+class BoundedExecutor:
+    """Thread pool that rejects work when full instead of queueing it forever.
+
+    At most max_workers jobs run and max_queue more wait. Each key (a chat
+    id) may have at most per_key_limit jobs running or waiting. submit()
+    returns None when any of these limits is hit, so the caller can answer
+    right away.
+    """
+
+    def __init__(self, max_workers, max_queue, per_key_limit, name='worker'):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._capacity = max_workers + max_queue
+        self._per_key_limit = per_key_limit
+        self._pending = 0
+        self._in_flight = Counter()
+        self._lock = threading.Lock()
+
+    def submit(self, key, fn, *args, **kwargs):
+        with self._lock:
+            if self._pending >= self._capacity or self._in_flight[key] >= self._per_key_limit:
+                return None
+            self._pending += 1
+            self._in_flight[key] += 1
+        try:
+            future = self._executor.submit(self._run, fn, *args, **kwargs)
+        except RuntimeError:
+            # Executor already shut down
+            self._release(key)
+            return None
+        future.add_done_callback(lambda _: self._release(key))
+        return future
+
+    @staticmethod
+    def _run(fn, *args, **kwargs):
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            logger.error(f"Background job {getattr(fn, '__name__', fn)} failed: {str(e)}")
+            raise
+
+    def _release(self, key):
+        with self._lock:
+            self._pending -= 1
+            self._in_flight[key] -= 1
+            if not self._in_flight[key]:
+                del self._in_flight[key]
+
+    def stats(self):
+        with self._lock:
+            return {'pending': self._pending, 'capacity': self._capacity,
+                    'per_key': dict(self._in_flight)}
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
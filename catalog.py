@@ -0,0 +1,131 @@
+import bisect
+import threading
+import unicodedata
+from collections import defaultdict
+
+
+def normalize(name):
+    """Catalog key: accents stripped, case-folded, whitespace collapsed.
+    "Phở  Bò" and "pho bo" share the key "pho bo"."""
+    decomposed = unicodedata.normalize('NFD', name.replace('đ', 'd').replace('Đ', 'D'))
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(stripped.casefold().split())
+
+
+def _trigrams(key):
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FoodCatalog:
+    """In-memory index of a chat's foods.
+
+    `by_key` maps the normalized key to the stored name for O(1) lookups,
+    a sorted key list answers prefix queries with bisect, and a trigram
+    posting list narrows fuzzy queries down to foods sharing a trigram
+    with the query.
+    """
+
+    def __init__(self, names=()):
+        self.by_key = {}
+        self._sorted_keys = []
+        self._trigrams = defaultdict(set)
+        self._trigram_counts = {}
+        self._lock = threading.Lock()
+        self.version = 0  # bumped on every change, lets callers cache derived views
+        for name in names:
+            self.add(name)
+
+    def add(self, name):
+        key = normalize(name)
+        with self._lock:
+            if key in self.by_key:
+                return False
+            self.by_key[key] = name
+            bisect.insort(self._sorted_keys, key)
+            trigrams = _trigrams(key)
+            for trigram in trigrams:
+                self._trigrams[trigram].add(key)
+            self._trigram_counts[key] = len(trigrams)
+            self.version += 1
+            return True
+
+    def remove(self, name):
+        """Drop a food by any spelling, returns the stored name or None"""
+        key = normalize(name)
+        with self._lock:
+            stored = self.by_key.pop(key, None)
+            if stored is None:
+                return None
+            del self._sorted_keys[bisect.bisect_left(self._sorted_keys, key)]
+            for trigram in _trigrams(key):
+                self._trigrams[trigram].discard(key)
+            del self._trigram_counts[key]
+            self.version += 1
+            return stored
+
+    def get(self, name):
+        return self.by_key.get(normalize(name))
+
+    def __contains__(self, name):
+        return normalize(name) in self.by_key
+
+    def __len__(self):
+        return len(self.by_key)
+
+    def names(self):
+        with self._lock:
+            return [self.by_key[key] for key in self._sorted_keys]
+
+    def pages(self, page_size, max_chars):
+        """Names in key order, split into pages of at most page_size names and max_chars"""
+        pages, page, length = [], [], 0
+        for name in self.names():
+            if page and (len(page) == page_size or length + len(name) + 3 > max_chars):
+                pages.append(page)
+                page, length = [], 0
+            page.append(name)
+            length += len(name) + 3  # "- " and the newline
+        if page:
+            pages.append(page)
+        return pages
+
+    def prefix(self, query, limit=10):
+        """Foods whose key starts with the normalized query, in key order"""
+        query = normalize(query)
+        with self._lock:
+            start = bisect.bisect_left(self._sorted_keys, query)
+            found = []
+            for key in self._sorted_keys[start:]:
+                if not key.startswith(query) or len(found) == limit:
+                    break
+                found.append(self.by_key[key])
+            return found
+
+    def fuzzy(self, query, limit=10, threshold=0.3):
+        """Foods ranked by trigram similarity (Jaccard) to the query"""
+        query_trigrams = _trigrams(normalize(query))
+        shared = defaultdict(int)
+        with self._lock:
+            for trigram in query_trigrams:
+                for key in self._trigrams.get(trigram, ()):
+                    shared[key] += 1
+            ranked = []
+            for key, common in shared.items():
+                similarity = common / (len(query_trigrams) + self._trigram_counts[key] - common)
+                if similarity >= threshold:
+                    ranked.append((-similarity, key))
+            ranked.sort()
+            return [self.by_key[key] for _, key in ranked[:limit]]
+
+    def search(self, query, limit=10):
+        """Prefix matches first, then fuzzy matches"""
+        found = self.prefix(query, limit)
+        if len(found) == limit:
+            return found
+        for name in self.fuzzy(query, limit):
+            if len(found) == limit:
+                break
+            if name not in found:
+                found.append(name)
+        return found
@@ -0,0 +1,161 @@
+import os
+import threading
+from config import (
+    CHAT_ID, CHAT_IDS, CHATS_DIR, DB_FILE, HISTORY_JOURNAL, HISTORY_SNAPSHOT,
+    RECENT_FOOD_DAYS, RECOMMEND_HALF_LIFE_DAYS, LIST_PAGE_SIZE, VOTE_SCHEDULE, CLOSE_VOTE_SCHEDULE
+)
+from history import HistoryJournal
+from storage import ChatStore
+from recent_foods import RecentFoodWindow
+from recommend import FoodScores
+from catalog import FoodCatalog
+
+# State is partitioned per group chat: every chat has its own database,
+# history journal and recent-food window, so groups never contend on the
+# same files or locks. The chat from CHAT_ID keeps the original files in
+# data/ and imports the legacy JSON files, every other chat lives in
+# data/chats/<chat_id>/.
+
+DEFAULT_SCHEDULES = {'vote': VOTE_SCHEDULE, 'close-vote': CLOSE_VOTE_SCHEDULE}
+
+
+class Chat:
+    """State partition of one group chat"""
+
+    def __init__(self, chat_id):
+        self.chat_id = chat_id
+        if chat_id == CHAT_ID:
+            db_file, journal, snapshot = DB_FILE, HISTORY_JOURNAL, HISTORY_SNAPSHOT
+        else:
+            directory = os.path.join(CHATS_DIR, chat_id)
+            db_file = os.path.join(directory, 'lunch_bot.db')
+            journal = os.path.join(directory, 'history.jsonl')
+            snapshot = os.path.join(directory, 'history_snapshot.jsonl')
+        self.history = HistoryJournal(journal, snapshot)
+        self.store = ChatStore(db_file, self.history, legacy_import=chat_id == CHAT_ID)
+        self._recent_window = None
+        self._food_scores = None
+        self._catalog = None
+        self._list_pages = (None, None, [])  # (catalog, version, pages)
+        self._lock = threading.Lock()
+        self._scores_lock = threading.Lock()
+
+    def recent_window(self):
+        """Recent-food window, loaded from the database once per process"""
+        with self._lock:
+            if self._recent_window is None:
+                window = RecentFoodWindow(RECENT_FOOD_DAYS)
+                for food, selected_at in self.store.load_recent_foods(window.cutoff()):
+                    window.add(food, selected_at)
+                self._recent_window = window
+            self._recent_window.expire()
+            return self._recent_window
+
+    def catalog(self):
+        """Index of the chat's foods, loaded once per process"""
+        with self._lock:
+            if self._catalog is None:
+                self._catalog = FoodCatalog(self.store.load_foods())
+            return self._catalog
+
+    def add_food(self, name):
+        """Add a food unless it exists under any spelling, returns the stored name"""
+        catalog = self.catalog()
+        existing = catalog.get(name)
+        if existing is not None:
+            return existing
+        if self.store.add_food(name):
+            catalog.add(name)
+            return name
+        # Added by another process since the catalog was loaded
+        with self._lock:
+            self._catalog = None
+        return self.catalog().get(name)
+
+    def remove_food(self, name):
+        """Remove a food by any spelling, returns the stored name or None"""
+        removed = self.catalog().remove(name)
+        if self.store.remove_food(name) and removed is None:
+            removed = name
+        return removed
+
+    def list_pages(self):
+        """Pages of /list, rebuilt only when the catalog has changed"""
+        catalog = self.catalog()
+        cached_catalog, version, pages = self._list_pages
+        if cached_catalog is not catalog or version != catalog.version:
+            version = catalog.version
+            # Leave room under Telegram's 4096 characters for the header
+            pages = catalog.pages(LIST_PAGE_SIZE, 3500)
+            self._list_pages = (catalog, version, pages)
+        return pages
+
+    def food_scores(self):
+        """Food scores, built from the whole history once per process and
+        kept current by record_poll()"""
+        with self._scores_lock:
+            if self._food_scores is None:
+                self._food_scores = FoodScores.from_history(
+                    self.history.iter_records(), RECOMMEND_HALF_LIFE_DAYS)
+            return self._food_scores
+
+    def record_poll(self, key, record):
+        """Append a closed poll to the history and fold it into the scores"""
+        self.history.append(key, record)
+        with self._scores_lock:
+            scores = self._food_scores
+        if scores is not None:
+            scores.add(key, record)
+
+    def schedule(self, job):
+        """Cron expression of 'vote' or 'close-vote', set with /schedule or from config"""
+        return self.store.get_meta(f'schedule:{job}', DEFAULT_SCHEDULES[job])
+
+    def set_schedule(self, job, expression):
+        self.store.set_meta(f'schedule:{job}', expression)
+
+
+_chats = {}
+_chats_lock = threading.Lock()
+_poll_chats = {}  # poll_id -> chat_id, poll answers don't say which chat they belong to
+
+
+def is_served(chat_id):
+    return str(chat_id) in CHAT_IDS
+
+
+def get_chat(chat_id):
+    chat_id = str(chat_id)
+    # The id becomes a directory name under CHATS_DIR, never accept one we don't serve
+    if chat_id not in CHAT_IDS:
+        raise ValueError(f"Chat {chat_id} is not in CHAT_IDS")
+    with _chats_lock:
+        chat = _chats.get(chat_id)
+        if chat is None:
+            chat = _chats[chat_id] = Chat(chat_id)
+        return chat
+
+
+def all_chats():
+    return [get_chat(chat_id) for chat_id in CHAT_IDS]
+
+
+def remember_poll(poll_id, chat_id):
+    _poll_chats[poll_id] = str(chat_id)
+
+
+def chat_for_poll(poll_id):
+    """Chat that owns an active poll, looked up in every chat on a miss
+    (the poll may have been created by another process)"""
+    chat_id = _poll_chats.get(poll_id)
+    if chat_id is None:
+        for chat in all_chats():
+            poll = chat.store.get_active('food_poll')
+            if poll:
+                _poll_chats[poll['poll_id']] = chat.chat_id
+        chat_id = _poll_chats.get(poll_id)
+    return get_chat(chat_id) if chat_id is not None else None
+
+
+def forget_poll(poll_id):
+    _poll_chats.pop(poll_id, None)
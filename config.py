@@ -1,8 +1,8 @@
 # config.py
 import os
+import threading
 from dotenv import load_dotenv
 from loguru import logger
-import telebot
 
 # Load environment variables
 load_dotenv()
@@ -10,20 +10,97 @@ load_dotenv()
 # Bot configuration
 BOT_TOKEN = os.getenv('BOT_TOKEN')
 CHAT_ID = os.getenv('CHAT_ID')
+# Every group the bot serves, comma separated. CHAT_ID keeps the data
+# files in data/, other groups get their own directory under CHATS_DIR
+CHAT_IDS = [c.strip() for c in os.getenv('CHAT_IDS', CHAT_ID or '').split(',') if c.strip()]
+if CHAT_ID and CHAT_ID not in CHAT_IDS:
+    CHAT_IDS.insert(0, CHAT_ID)
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 
+# Webhook mode (main.py --webhook)
+WEBHOOK_URL = os.getenv('WEBHOOK_URL')  # public base URL, e.g. https://bot.example.com
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET')
+WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', 8443))
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/telegram/webhook')
+
 # File paths
 FOOD_FILE = 'data/food_list.json'
 ACTIVE_VOTE_FILE = 'data/active_votes.json'
 COMPLETED_VOTE_FILE = 'data/completed_votes.json'
 WEEK_FOOD='data/week_food.json'
+DB_FILE = 'data/lunch_bot.db'
+CONTROL_SOCKET = os.getenv('CONTROL_SOCKET', 'data/control.sock')
+HISTORY_JOURNAL = 'data/history.jsonl'
+HISTORY_SNAPSHOT = 'data/history_snapshot.jsonl'
+CHATS_DIR = 'data/chats'
+# Foods picked within this many days are left out of the next poll
+RECENT_FOOD_DAYS = int(os.getenv('RECENT_FOOD_DAYS', 7))
+# /list shows this many foods per page
+LIST_PAGE_SIZE = int(os.getenv('LIST_PAGE_SIZE', 20))
+# Past polls count half as much toward a food's score every this many days
+RECOMMEND_HALF_LIFE_DAYS = float(os.getenv('RECOMMEND_HALF_LIFE_DAYS', 60))
+# Journal size that triggers a background compaction into the snapshot
+HISTORY_COMPACT_BYTES = int(os.getenv('HISTORY_COMPACT_BYTES', 256 * 1024))
+
+# /ai requests run on a bounded worker pool so they never block other handlers
+AI_MAX_WORKERS = int(os.getenv('AI_MAX_WORKERS', 4))
+AI_MAX_QUEUE = int(os.getenv('AI_MAX_QUEUE', 8))
+AI_MAX_PER_CHAT = int(os.getenv('AI_MAX_PER_CHAT', 2))
+# Minimum seconds between edits of a streaming /ai reply
+AI_STREAM_EDIT_INTERVAL = float(os.getenv('AI_STREAM_EDIT_INTERVAL', 1.0))
+# Cache of /ai answers for repeated prompts, AI_CACHE_SIZE=0 disables it
+AI_CACHE_SIZE = int(os.getenv('AI_CACHE_SIZE', 128))
+AI_CACHE_TTL = int(os.getenv('AI_CACHE_TTL', 3600))
+
+# Outbound rate limits, Telegram allows ~30 messages/s overall and 20/min in a group
+OUTBOUND_GLOBAL_RATE = float(os.getenv('OUTBOUND_GLOBAL_RATE', 25))
+OUTBOUND_CHAT_RATE = float(os.getenv('OUTBOUND_CHAT_RATE', 20 / 60))
+OUTBOUND_CHAT_BURST = int(os.getenv('OUTBOUND_CHAT_BURST', 5))
+# Message edits (streamed /ai replies, /list pages) have their own per-chat budget
+OUTBOUND_EDIT_RATE = float(os.getenv('OUTBOUND_EDIT_RATE', 1))
+OUTBOUND_EDIT_BURST = int(os.getenv('OUTBOUND_EDIT_BURST', 3))
+
+# Expense tracker that /debt payments are copied to (its /api/expenses/lunch-import/),
+# unset to keep payments in the lunch bot only
+EXPENSE_API_URL = os.getenv('EXPENSE_API_URL')
+EXPENSE_API_TOKEN = os.getenv('EXPENSE_API_TOKEN')
+
+# Poll schedule run inside the bot process (cron syntax, local time)
+VOTE_SCHEDULE = os.getenv('VOTE_SCHEDULE', '45 10 * * 1-5')
+CLOSE_VOTE_SCHEDULE = os.getenv('CLOSE_VOTE_SCHEDULE', '16 12 * * 1-5')
+SCHEDULER_ENABLED = os.getenv('SCHEDULER_ENABLED', 'True') == 'True'
+# Runs missed by at most this many minutes are made up when the bot starts
+SCHEDULE_CATCHUP_MINUTES = int(os.getenv('SCHEDULE_CATCHUP_MINUTES', 90))
+HOLIDAYS = os.getenv('HOLIDAYS', '')  # 2025-01-01,2025-04-30,...
 
 # Initialize bot
 if not BOT_TOKEN or not CHAT_ID:
     logger.error("error .env")
     raise ValueError("error .env")
 
-bot = telebot.TeleBot(BOT_TOKEN)
+
+class LazyBot:
+    """telebot.TeleBot built on first use, commands that never talk to Telegram skip the import"""
+
+    def __init__(self, token):
+        self._token = token
+        self._bot = None
+        self._lock = threading.Lock()
+
+    def _get(self):
+        if self._bot is None:
+            with self._lock:
+                if self._bot is None:
+                    import telebot
+                    self._bot = telebot.TeleBot(self._token)
+        return self._bot
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+
+
+bot = LazyBot(BOT_TOKEN)
 
 
 def initialize_logger():
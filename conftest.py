@@ -0,0 +1,5 @@
+import os
+
+# config.py refuses to load without these, the unit tests never talk to Telegram
+os.environ.setdefault('BOT_TOKEN', '123456:test-token')
+os.environ.setdefault('CHAT_ID', '-100')
@@ -0,0 +1,108 @@
+import json
+import os
+import socket
+import socketserver
+import threading
+from loguru import logger
+
+# Local control channel of the running bot. Clients send one JSON line
+# {"command": "vote", "args": {"chat_id": ...}} over a Unix-domain socket and get one JSON line
+# back, {"ok": true, ...}. Commands run on a background thread of the
+# daemon, so the client returns as soon as the daemon has accepted them.
+# The only argument is chat_id, which must be one of the served chats.
+
+
+class _ControlHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline(64 * 1024))
+            command = request['command']
+            args = request.get('args') or {}
+            if not isinstance(args, dict) or set(args) - {'chat_id'}:
+                raise TypeError(args)
+        except (ValueError, KeyError, TypeError, AttributeError):
+            self._respond({'ok': False, 'error': 'bad request'})
+            return
+        if 'chat_id' in args and str(args['chat_id']) not in self.server.chat_ids:
+            self._respond({'ok': False, 'error': f"unknown chat {args['chat_id']}"})
+            return
+        if command == 'ping':
+            self._respond({'ok': True, 'pid': os.getpid()})
+            return
+        function = self.server.commands.get(command)
+        if function is None:
+            self._respond({'ok': False, 'error': f'unknown command {command}'})
+            return
+        threading.Thread(target=_run_command, args=(command, function, args),
+                         name=f'control-{command}', daemon=True).start()
+        self._respond({'ok': True, 'accepted': command})
+        logger.info(f"Control command accepted: {command}")
+
+    def _respond(self, response):
+        self.wfile.write((json.dumps(response) + '\n').encode('utf-8'))
+
+
+def _run_command(command, function, args):
+    try:
+        function(**args)
+    except Exception as e:
+        logger.error(f"Control command {command} failed: {str(e)}")
+
+
+class ControlServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, commands, chat_ids=()):
+        self.path = path
+        self.commands = commands
+        self.chat_ids = {str(chat_id) for chat_id in chat_ids}
+        _remove_stale_socket(path)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # bind() creates the socket file, the umask makes it owner-only from the start
+        umask = os.umask(0o177)
+        try:
+            super().__init__(path, _ControlHandler)
+        finally:
+            os.umask(umask)
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name='control-socket', daemon=True).start()
+        logger.info(f"Control socket listening on {self.path}")
+        return self
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def _remove_stale_socket(path):
+    """Delete a socket file left by a dead daemon, refuse to steal a live one"""
+    if not os.path.exists(path):
+        return
+    try:
+        send_command(path, 'ping', timeout=1)
+    except OSError:
+        os.remove(path)
+        return
+    raise RuntimeError(f"Another bot is already listening on {path}")
+
+
+def send_command(path, command, timeout=5, args=None):
+    """Ask the running daemon to execute `command`, raises OSError if it is not reachable"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        request = {'command': command}
+        if args:
+            request['args'] = args
+        sock.sendall((json.dumps(request) + '\n').encode('utf-8'))
+        with sock.makefile('rb') as reader:
+            line = reader.readline()
+    if not line:
+        raise ConnectionError("Control socket closed without a response")
+    return json.loads(line)
@@ -0,0 +1,75 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from loguru import logger
+from config import EXPENSE_API_URL, EXPENSE_API_TOKEN
+
+# /debt payments copied to the expense tracker's bulk import endpoint, so
+# lunch debts show up there with the right members. The tracker skips
+# records it already has (same chat and history key), which makes a
+# failed push safe to repeat with `main.py --sync-expenses`.
+
+SYNC_BATCH_SIZE = 200
+
+
+def enabled():
+    return bool(EXPENSE_API_URL)
+
+
+def post_payments(chat_id, entries):
+    """Send (key, record) pairs in one request, returns the tracker's summary"""
+    body = json.dumps({
+        'source': f'lunch:{chat_id}',
+        'records': [{'key': key, 'record': record} for key, record in entries],
+    }, ensure_ascii=False).encode('utf-8')
+    request = urllib.request.Request(
+        EXPENSE_API_URL.rstrip('/') + '/api/expenses/lunch-import/',
+        data=body,
+        headers={'Content-Type': 'application/json', 'X-Lunch-Token': EXPENSE_API_TOKEN or ''},
+        method='POST',
+    )
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.loads(response.read().decode('utf-8'))
+
+
+def push_payment(chat_id, key, record):
+    """Copy one payment to the tracker on a background thread"""
+    if not enabled():
+        return
+
+    def push():
+        try:
+            summary = post_payments(chat_id, [(key, record)])
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            logger.warning(f"Could not copy payment {key} of chat {chat_id} to the expense tracker: {str(e)}")
+            return
+        if summary.get('unmatched'):
+            logger.warning(f"Expense tracker has no member for: {', '.join(summary['unmatched'])}")
+        logger.info(f"Payment {key} of chat {chat_id} copied to the expense tracker")
+
+    threading.Thread(target=push, name='expense-sync', daemon=True).start()
+
+
+def sync_history(chat):
+    """Send every payment in the chat's history, SYNC_BATCH_SIZE per request"""
+    totals = {'created': 0, 'skipped': 0}
+    unmatched = set()
+    batch = []
+
+    def flush():
+        summary = post_payments(chat.chat_id, batch)
+        totals['created'] += summary.get('created', 0)
+        totals['skipped'] += summary.get('skipped', 0)
+        unmatched.update(summary.get('unmatched', []))
+        batch.clear()
+
+    for key, record in chat.history.iter_records():
+        if record.get('type') != 'payment':
+            continue
+        batch.append((key, record))
+        if len(batch) == SYNC_BATCH_SIZE:
+            flush()
+    if batch:
+        flush()
+    return totals, sorted(unmatched)
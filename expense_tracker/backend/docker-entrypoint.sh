@@ -14,6 +14,7 @@ python manage.py collectstatic --noinput --clear
 echo "Starting services with Supervisor..."
 echo "  - Gunicorn (Django web server)"
 echo "  - Telegram Polling (payment confirmation bot)"
+echo "  - Reminder job worker"
 
 # Create log directory for supervisor
 mkdir -p /var/log/supervisor
@@ -88,6 +88,19 @@ CORS_ALLOW_CREDENTIALS = True
 
 # Telegram Bot
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
+# Keep-alive connections to the Bot API per process, and retries of failed calls
+TELEGRAM_HTTP_POOL_SIZE = int(os.getenv('TELEGRAM_HTTP_POOL_SIZE', 10))
+TELEGRAM_HTTP_RETRIES = int(os.getenv('TELEGRAM_HTTP_RETRIES', 2))
+# Outgoing message limits (per second, per process) and bulk reminder concurrency
+TELEGRAM_GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', 25))
+TELEGRAM_CHAT_RATE = float(os.getenv('TELEGRAM_CHAT_RATE', 1))
+TELEGRAM_CHAT_BURST = int(os.getenv('TELEGRAM_CHAT_BURST', 3))
+TELEGRAM_BULK_WORKERS = int(os.getenv('TELEGRAM_BULK_WORKERS', 8))
+# A running reminder job without a heartbeat (a member sent) for this long is assumed orphaned and requeued
+TELEGRAM_JOB_STALE_MINUTES = int(os.getenv('TELEGRAM_JOB_STALE_MINUTES', 30))
+
+# Lunch bot: token it sends in X-Lunch-Token to import its payments
+LUNCH_IMPORT_TOKEN = os.getenv('LUNCH_IMPORT_TOKEN')
 
 STATIC_URL = "/static/"
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
@@ -100,6 +113,12 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Rendered QR images: in-process LRU (bytes) in front of a shared directory.
+# Kept out of MEDIA_ROOT, which nginx serves publicly, since the images carry bank details
+QR_CACHE_MEMORY_BYTES = int(os.getenv('QR_CACHE_MEMORY_BYTES', 4 * 1024 * 1024))
+QR_CACHE_DISK_BYTES = int(os.getenv('QR_CACHE_DISK_BYTES', 64 * 1024 * 1024))
+QR_CACHE_DIR = os.getenv('QR_CACHE_DIR', os.path.join(BASE_DIR, 'var', 'qr_cache'))
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 CSRF_TRUSTED_ORIGINS = [
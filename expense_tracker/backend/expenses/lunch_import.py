@@ -0,0 +1,166 @@
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from members.models import Member
+from .models import Expense, ExpenseParticipant
+
+CENT = Decimal('0.01')
+# Tries when a concurrent import wins the race for some source keys
+IMPORT_ATTEMPTS = 3
+
+
+def _amount(value):
+    return Decimal(str(value)).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def _created_at(key, record):
+    """Time of the payment: the record key is its ISO timestamp"""
+    for value in (key, record.get('datetime')):
+        try:
+            moment = datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            continue
+        return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+    return None
+
+
+def _resolve_members(payments):
+    """Map every name used in the payments to a Member with two queries:
+    by Telegram user id when the lunch bot knows it, then by name"""
+    telegram_ids = {}
+    names = set()
+    for _, record in payments:
+        for name, telegram_id in (record.get('telegram_ids') or {}).items():
+            telegram_ids[name.strip()] = str(telegram_id)
+        names.update(name.strip() for name in [record.get('payer') or ''] + list(record.get('participants') or []))
+    names.discard('')
+
+    by_telegram_id = {
+        member.telegram_id: member
+        for member in Member.objects.filter(telegram_id__in=set(telegram_ids.values()))
+    }
+    resolved = {}
+    for name in names:
+        member = by_telegram_id.get(telegram_ids.get(name))
+        if member is not None:
+            resolved[name] = member
+
+    unresolved = names - resolved.keys()
+    if unresolved:
+        by_name = {}
+        for member in Member.objects.all().only('id', 'name', 'telegram_id'):
+            by_name.setdefault(member.name.strip().casefold(), member)
+        for name in unresolved:
+            member = by_name.get(name.casefold())
+            if member is not None:
+                resolved[name] = member
+    return resolved
+
+
+def _existing_keys(source_keys):
+    return set(Expense.objects.filter(source_key__in=source_keys).values_list('source_key', flat=True))
+
+
+def _plan(payments, source_keys, existing, members, created_by):
+    """Expenses to create (not imported yet, payer known) with their participants and dates"""
+    plan = {'expenses': [], 'participants': [], 'created_at': [], 'skipped': 0, 'unmatched': set()}
+    existing = set(existing)
+    for source_key, (key, record) in zip(source_keys, payments):
+        if source_key in existing:
+            plan['skipped'] += 1
+            continue
+        existing.add(source_key)
+        payer = members.get((record.get('payer') or '').strip())
+        if payer is None or not record.get('amount'):
+            if payer is None:
+                plan['unmatched'].add((record.get('payer') or '').strip())
+            plan['skipped'] += 1
+            continue
+        participants = {}
+        for name in record.get('participants') or []:
+            member = members.get(name.strip())
+            if member is None:
+                plan['unmatched'].add(name.strip())
+            else:
+                participants[member.id] = member
+        participants.setdefault(payer.id, payer)
+
+        per_person = _amount(record.get('per_person') or record['amount'] / len(participants))
+        plan['expenses'].append(Expense(
+            name=f"Ăn trưa: {record.get('food') or key}",
+            total_amount=_amount(record['amount']),
+            payer=payer,
+            created_by=created_by,
+            source_key=source_key,
+        ))
+        plan['participants'].append([
+            (member, per_person, member.id == payer.id) for member in participants.values()
+        ])
+        plan['created_at'].append(_created_at(key, record))
+    return plan
+
+
+def _save(plan):
+    with transaction.atomic():
+        Expense.objects.bulk_create(plan['expenses'])
+        # created_at is auto_now_add, backdate imported expenses to the lunch
+        dated = []
+        for expense, moment in zip(plan['expenses'], plan['created_at']):
+            if moment is not None:
+                expense.created_at = moment
+                dated.append(expense)
+        if dated:
+            Expense.objects.bulk_update(dated, ['created_at'])
+        ExpenseParticipant.objects.bulk_create([
+            ExpenseParticipant(expense=expense, member=member, amount_owed=amount, is_paid=is_paid)
+            for expense, rows in zip(plan['expenses'], plan['participants'])
+            for member, amount, is_paid in rows
+        ])
+
+
+def import_lunch_payments(entries, source='lunch', created_by=None):
+    """Create an Expense per lunch bot payment record.
+
+    Args:
+        entries: (key, record) pairs from the lunch bot history, records
+            that are not payments are ignored
+        source: prefix of Expense.source_key, usually 'lunch:<chat_id>'
+        created_by: User recorded as the creator of the expenses
+
+    Returns:
+        dict with the number of expenses created, records skipped (already
+        imported or payer unknown) and the names that matched no member
+
+    Raises:
+        ValueError: if a source_key would not fit Expense.source_key
+    """
+    payments = [(str(key), record) for key, record in entries
+                if isinstance(record, dict) and record.get('type') == 'payment']
+    skipped = len(entries) - len(payments)
+    if not payments:
+        return {'created': 0, 'skipped': skipped, 'unmatched': []}
+
+    source_keys = [f"{source}:{key}" for key, _ in payments]
+    max_length = Expense._meta.get_field('source_key').max_length
+    too_long = [source_key for source_key in source_keys if len(source_key) > max_length]
+    if too_long:
+        raise ValueError(f"source and key must fit in {max_length} characters: {too_long[0]!r}")
+    members = _resolve_members(payments)
+
+    for attempt in range(IMPORT_ATTEMPTS):
+        plan = _plan(payments, source_keys, _existing_keys(source_keys), members, created_by)
+        try:
+            _save(plan)
+            break
+        except IntegrityError:
+            # A concurrent import committed some of these payments after we
+            # read the existing keys, read them again and import the rest
+            if attempt == IMPORT_ATTEMPTS - 1:
+                raise
+
+    return {
+        'created': len(plan['expenses']),
+        'skipped': skipped + plan['skipped'],
+        'unmatched': sorted(name for name in plan['unmatched'] if name),
+    }
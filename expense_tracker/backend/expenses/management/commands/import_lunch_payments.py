@@ -0,0 +1,61 @@
+import json
+import os
+from django.core.management.base import BaseCommand, CommandError
+from expenses.lunch_import import import_lunch_payments
+
+
+class Command(BaseCommand):
+    help = 'Import the payments of lunch bot history files (history.jsonl / history_snapshot.jsonl) as expenses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('history_files', nargs='+', type=str, help='Lunch bot history JSONL files')
+        parser.add_argument(
+            '--source',
+            type=str,
+            default='lunch',
+            help='Source prefix of the imported expenses, e.g. lunch:<chat_id> (default: lunch)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Records imported per transaction (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        totals = {'created': 0, 'skipped': 0}
+        unmatched = set()
+        batch = []
+
+        def flush():
+            try:
+                summary = import_lunch_payments(batch, source=options['source'])
+            except ValueError as e:
+                raise CommandError(str(e))
+            totals['created'] += summary['created']
+            totals['skipped'] += summary['skipped']
+            unmatched.update(summary['unmatched'])
+            batch.clear()
+
+        for path in options['history_files']:
+            if not os.path.exists(path):
+                self.stdout.write(self.style.ERROR(f'File not found: {path}'))
+                continue
+            self.stdout.write(f'Reading {path}...')
+            with open(path, encoding='utf-8') as handle:
+                for line in handle:
+                    try:
+                        entry = json.loads(line)
+                        batch.append((entry['key'], entry['record']))
+                    except (ValueError, KeyError, TypeError):
+                        # Partially written tail or corrupt line
+                        continue
+                    if len(batch) >= options['batch_size']:
+                        flush()
+        if batch:
+            flush()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {totals['created']} expenses, skipped {totals['skipped']} records"))
+        if unmatched:
+            self.stdout.write(self.style.WARNING(f"No member found for: {', '.join(sorted(unmatched))}"))
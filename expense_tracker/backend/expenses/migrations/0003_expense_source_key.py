@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0002_expense_created_by'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expense',
+            name='source_key',
+            field=models.CharField(blank=True, help_text='Id of the record this expense was imported from, e.g. lunch:<chat>:<time>', max_length=100, null=True, unique=True),
+        ),
+    ]
@@ -11,6 +11,10 @@ class Expense(models.Model):
                                    blank=True, related_name='created_expenses')
     participants = models.ManyToManyField(Member, through='ExpenseParticipant')
     created_at = models.DateTimeField(auto_now_add=True)
+    source_key = models.CharField(
+        max_length=100, unique=True, null=True, blank=True,
+        help_text="Id of the record this expense was imported from, e.g. lunch:<chat>:<time>"
+    )
 
     def __str__(self):
         return self.name
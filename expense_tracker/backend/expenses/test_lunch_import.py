@@ -0,0 +1,166 @@
+"""
+Tests for importing lunch bot payments as expenses
+"""
+
+import json
+import pytest
+from decimal import Decimal
+from django.core.management import call_command
+from django.test import override_settings
+from unittest.mock import patch
+from rest_framework.test import APIClient
+from expenses.lunch_import import import_lunch_payments
+from expenses.models import Expense, ExpenseParticipant
+from members.models import Member
+
+
+def payment(payer='Bob', participants=('Alice', 'Bob'), amount=100000, **extra):
+    record = {
+        'type': 'payment',
+        'payer': payer,
+        'amount': amount,
+        'per_person': amount / len(participants),
+        'food': 'Phở',
+        'total_participants': len(participants),
+        'participants': list(participants),
+    }
+    record.update(extra)
+    return record
+
+
+@pytest.mark.django_db
+class TestImportLunchPayments:
+
+    @pytest.fixture
+    def members(self):
+        alice = Member.objects.create(name="Alice", telegram_id="111111")
+        bob = Member.objects.create(name="Bob", telegram_id="222222")
+        return alice, bob
+
+    def test_creates_expense_with_participants(self, members):
+        alice, bob = members
+        summary = import_lunch_payments([
+            ('2025-03-04T12:30:00', payment()),
+            ('2025-03-04T11:00:00', {'type': 'food', 'selected': 'Phở'}),
+        ], source='lunch:-100')
+
+        assert summary == {'created': 1, 'skipped': 1, 'unmatched': []}
+        expense = Expense.objects.get()
+        assert expense.source_key == 'lunch:-100:2025-03-04T12:30:00'
+        assert expense.payer == bob
+        assert expense.total_amount == Decimal('100000.00')
+        assert expense.created_at.date().isoformat() == '2025-03-04'
+        rows = {row.member: row for row in ExpenseParticipant.objects.filter(expense=expense)}
+        assert rows[alice].amount_owed == Decimal('50000.00')
+        assert not rows[alice].is_paid
+        assert rows[bob].is_paid
+
+    def test_matches_telegram_ids_before_names(self, members):
+        alice, _ = members
+        record = payment(payer='Bob', participants=('Chị Alice ', 'Bob'),
+                         telegram_ids={'Chị Alice ': 111111, 'Bob': 222222})
+
+        summary = import_lunch_payments([('2025-03-04T12:30:00', record)])
+
+        assert summary['unmatched'] == []
+        assert ExpenseParticipant.objects.filter(member=alice, is_paid=False).count() == 1
+
+    def test_reimport_is_skipped(self, members):
+        entries = [('2025-03-04T12:30:00', payment())]
+        import_lunch_payments(entries)
+
+        summary = import_lunch_payments(entries)
+
+        assert summary['created'] == 0
+        assert summary['skipped'] == 1
+        assert Expense.objects.count() == 1
+
+    def test_payment_imported_concurrently_is_skipped(self, members):
+        entries = [('2025-03-04T12:30:00', payment()), ('2025-03-05T12:30:00', payment())]
+        import_lunch_payments(entries[:1])
+
+        # The other import committed after this one read the existing keys
+        with patch('expenses.lunch_import._existing_keys', side_effect=[set(), {'lunch:2025-03-04T12:30:00'}]):
+            summary = import_lunch_payments(entries)
+
+        assert summary['created'] == 1
+        assert summary['skipped'] == 1
+        assert Expense.objects.count() == 2
+
+    def test_source_key_longer_than_field_is_rejected(self, members):
+        with pytest.raises(ValueError):
+            import_lunch_payments([('2025-03-04T12:30:00', payment())], source='lunch:' + 'x' * 100)
+
+        assert not Expense.objects.exists()
+
+    def test_unknown_payer_is_skipped(self, members):
+        summary = import_lunch_payments([('2025-03-04T12:30:00', payment(payer='Carol'))])
+
+        assert summary['created'] == 0
+        assert summary['unmatched'] == ['Carol']
+        assert not Expense.objects.exists()
+
+    def test_management_command_reads_history_files(self, members, tmp_path):
+        journal = tmp_path / 'history.jsonl'
+        lines = [
+            json.dumps({'key': '2025-03-04T12:30:00', 'record': payment()}),
+            json.dumps({'key': '2025-03-05T12:30:00', 'record': payment(participants=('Alice', 'Bob', 'Carol'))}),
+            '{"key": "2025-03-06T12:30:00", "rec',
+        ]
+        journal.write_text('\n'.join(lines), encoding='utf-8')
+
+        call_command('import_lunch_payments', str(journal), '--batch-size', '1')
+
+        assert Expense.objects.count() == 2
+
+
+@pytest.mark.django_db
+class TestLunchImportEndpoint:
+
+    @pytest.fixture(autouse=True)
+    def members(self):
+        Member.objects.create(name="Alice", telegram_id="111111")
+        Member.objects.create(name="Bob", telegram_id="222222")
+
+    def body(self):
+        return {'source': 'lunch:-100', 'records': [{'key': '2025-03-04T12:30:00', 'record': payment()}]}
+
+    @override_settings(LUNCH_IMPORT_TOKEN='secret')
+    def test_token_authenticates_the_lunch_bot(self):
+        client = APIClient()
+
+        response = client.post('/api/expenses/lunch-import/', self.body(), format='json',
+                               HTTP_X_LUNCH_TOKEN='secret')
+
+        assert response.status_code == 201
+        assert response.data['created'] == 1
+
+    @override_settings(LUNCH_IMPORT_TOKEN='secret')
+    def test_wrong_token_is_rejected(self):
+        client = APIClient()
+
+        response = client.post('/api/expenses/lunch-import/', self.body(), format='json',
+                               HTTP_X_LUNCH_TOKEN='wrong')
+
+        assert response.status_code == 403
+        assert not Expense.objects.exists()
+
+    @override_settings(LUNCH_IMPORT_TOKEN=None)
+    def test_unset_token_does_not_open_the_endpoint(self):
+        client = APIClient()
+
+        response = client.post('/api/expenses/lunch-import/', self.body(), format='json',
+                               HTTP_X_LUNCH_TOKEN='')
+
+        assert response.status_code == 403
+
+    @override_settings(LUNCH_IMPORT_TOKEN='secret')
+    def test_overlong_source_is_a_bad_request(self):
+        client = APIClient()
+        body = {**self.body(), 'source': 'lunch:' + 'x' * 100}
+
+        response = client.post('/api/expenses/lunch-import/', body, format='json',
+                               HTTP_X_LUNCH_TOKEN='secret')
+
+        assert response.status_code == 400
+        assert not Expense.objects.exists()
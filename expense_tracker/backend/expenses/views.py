@@ -1,9 +1,21 @@
 from rest_framework import viewsets, permissions, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.conf import settings
+from django.utils.crypto import constant_time_compare
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import Expense, ExpenseParticipant
 from .serializers import ExpenseSerializer
+from .lunch_import import import_lunch_payments
+
+
+class HasLunchImportToken(permissions.BasePermission):
+    """Lets the lunch bot in with the X-Lunch-Token header instead of a session"""
+
+    def has_permission(self, request, view):
+        token = getattr(settings, 'LUNCH_IMPORT_TOKEN', None)
+        sent = request.headers.get('X-Lunch-Token')
+        return bool(token and sent and constant_time_compare(token, sent))
 
 
 class ExpenseViewSet(viewsets.ModelViewSet):
@@ -62,3 +74,28 @@ class ExpenseViewSet(viewsets.ModelViewSet):
             return Response({'status': 'success', 'is_paid': participant.is_paid})
         except ExpenseParticipant.DoesNotExist:
             return Response({'error': 'Participant not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    @action(detail=False, methods=['post'], url_path='lunch-import',
+            permission_classes=[permissions.IsAuthenticated | HasLunchImportToken])
+    def lunch_import(self, request):
+        """Bulk import of lunch bot payments.
+
+        Body: {"source": "lunch:<chat_id>", "records": [{"key": ..., "record": {...}}]}
+        Records already imported (same source and key) are skipped.
+        """
+        records = request.data.get('records')
+        if not isinstance(records, list):
+            return Response({'error': 'records must be a list'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            entries = [(entry['key'], entry['record']) for entry in records]
+        except (KeyError, TypeError):
+            return Response({'error': 'each record needs key and record'}, status=status.HTTP_400_BAD_REQUEST)
+        source = request.data.get('source') or 'lunch'
+        if not isinstance(source, str):
+            return Response({'error': 'source must be a string'}, status=status.HTTP_400_BAD_REQUEST)
+        user = request.user if request.user.is_authenticated else None
+        try:
+            summary = import_lunch_payments(entries, source=source, created_by=user)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(summary, status=status.HTTP_201_CREATED if summary['created'] else status.HTTP_200_OK)
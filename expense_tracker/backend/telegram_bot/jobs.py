@@ -0,0 +1,93 @@
+"""
+Database-backed queue of reminder jobs.
+
+send-reminder/ and send-bulk-reminders/ only enqueue a ReminderJob; the
+process_reminder_jobs worker claims queued jobs one at a time and sends
+them with TelegramService.send_bulk_reminders(), saving each member's
+outcome as soon as it is known so GET jobs/<id>/ can show progress.
+"""
+
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from .models import ReminderJob
+from .services import TelegramService
+
+
+def enqueue_reminders(member_ids, user=None):
+    """Queue reminders for member_ids, duplicates are sent once"""
+    return ReminderJob.objects.create(
+        member_ids=list(dict.fromkeys(member_ids)),
+        created_by=user if user and user.is_authenticated else None
+    )
+
+
+def lease_expiry():
+    """End of the lease a worker holds on a running job until its next heartbeat"""
+    minutes = getattr(settings, 'TELEGRAM_JOB_STALE_MINUTES', 30)
+    return timezone.now() + timedelta(minutes=minutes)
+
+
+def claim_next_job():
+    """
+    Mark the oldest queued job running and return it, None if there is none.
+    The conditional UPDATE makes the claim safe with several workers.
+    """
+    while True:
+        job = ReminderJob.objects.filter(status='queued').order_by('created_at', 'pk').first()
+        if job is None:
+            return None
+        claimed = ReminderJob.objects.filter(pk=job.pk, status='queued').update(
+            status='running', started_at=timezone.now(), lease_expires_at=lease_expiry()
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+
+def requeue_stale_jobs():
+    """
+    Put back jobs left running by a worker that died, i.e. whose lease ran
+    out without a heartbeat. A long job that keeps sending renews its
+    lease and is never picked up twice. Requeued jobs resume with the
+    members that have no result yet.
+    """
+    return ReminderJob.objects.filter(
+        status='running', lease_expires_at__lt=timezone.now()
+    ).update(status='queued')
+
+
+def run_job(job, service=None):
+    """Send the reminders of a claimed job, recording results as they complete"""
+    service = service or TelegramService()
+    done = {result['member_id'] for result in job.results}
+    pending = [member_id for member_id in job.member_ids if member_id not in done]
+
+    def record(result):
+        # Saving a result is also the heartbeat that keeps the job leased
+        job.results.append(result)
+        ReminderJob.objects.filter(pk=job.pk).update(results=job.results, lease_expires_at=lease_expiry())
+
+    try:
+        service.send_bulk_reminders(pending, on_result=record)
+    except Exception as e:
+        print(f"❌ [TELEGRAM JOBS] Job {job.pk} failed: {e}")
+        job.status, job.error = 'failed', str(e)
+    else:
+        job.status = 'done'
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'results', 'finished_at'])
+    return job
+
+
+def run_pending_jobs(limit=None):
+    """Run queued jobs until the queue is empty (or `limit` jobs ran), returns how many ran"""
+    requeue_stale_jobs()
+    count = 0
+    while limit is None or count < limit:
+        job = claim_next_job()
+        if job is None:
+            break
+        run_job(job)
+        count += 1
+    return count
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from telegram_bot.jobs import run_pending_jobs
+from utils.qr_service import QRService
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Send queued reminder jobs (send-reminder/, send-bulk-reminders/)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2,
+            help='Seconds between queue checks when idle (default: 2)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Drain the queue once and exit'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("Reminder job worker started")
+        while True:
+            try:
+                count = run_pending_jobs()
+                if count:
+                    qr_stats = QRService.cache_stats()
+                    self.stdout.write(self.style.SUCCESS(
+                        f"Ran {count} reminder job(s), QR cache hit rate: {qr_stats['hit_rate']}"
+                    ))
+            except Exception as e:
+                logger.exception("Error running reminder jobs")
+                self.stdout.write(self.style.ERROR(f"Error running reminder jobs: {e}"))
+            if options['once']:
+                return
+            # Long-running worker: drop connections the database may have closed
+            close_old_connections()
+            time.sleep(options['interval'])
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telegram_bot', '0003_reminderjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TelegramPhoto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payload_key', models.CharField(help_text='SHA-256 of the QR payload and render options', max_length=64, unique=True)),
+                ('file_id', models.CharField(help_text='Telegram file_id of the largest photo size', max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('used_at', models.DateTimeField(auto_now=True, help_text='Last upload or reuse')),
+            ],
+        ),
+    ]
@@ -135,3 +135,85 @@ class TelegramUpdateOffset(models.Model):
         obj.offset = new_offset
         obj.save()
         return obj
+
+
+class ReminderJob(models.Model):
+    """
+    Queued debt reminders, sent by the process_reminder_jobs worker.
+    The API only records the job and answers 202, results are filled in
+    per member while the worker sends.
+    """
+
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    member_ids = models.JSONField(help_text="Members to remind, in order")
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='queued',
+        db_index=True,
+        help_text="Queued until a worker claims the job"
+    )
+    results = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="Outcome per member sent so far: member_id, success, duration_ms[, error]"
+    )
+    error = models.TextField(blank=True, default='', help_text="Why the job failed as a whole")
+    created_by = models.ForeignKey(
+        'auth.User',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='reminder_jobs'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    lease_expires_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Renewed by the worker after every member, a running job past it was abandoned"
+    )
+
+    class Meta:
+        ordering = ['created_at']
+
+    def __str__(self):
+        return f"Reminder job {self.pk} ({self.status}, {len(self.results)}/{len(self.member_ids)})"
+
+    @property
+    def progress(self):
+        total = len(self.member_ids)
+        sent = len(self.results)
+        return {
+            'total': total,
+            'sent': sent,
+            'succeeded': sum(1 for r in self.results if r.get('success')),
+            'percent': round(sent * 100 / total) if total else 100,
+        }
+
+
+class TelegramPhoto(models.Model):
+    """
+    file_id Telegram assigned to an uploaded QR image, keyed by the QR
+    payload hash (QRService.payload_key). Sending the file_id again lets
+    Telegram reuse the stored photo instead of receiving a new upload.
+    """
+
+    payload_key = models.CharField(
+        max_length=64,
+        unique=True,
+        help_text="SHA-256 of the QR payload and render options"
+    )
+    file_id = models.CharField(max_length=255, help_text="Telegram file_id of the largest photo size")
+    created_at = models.DateTimeField(auto_now_add=True)
+    used_at = models.DateTimeField(auto_now=True, help_text="Last upload or reuse")
+
+    def __str__(self):
+        return f"Photo {self.payload_key[:12]}… → {self.file_id[:16]}…"
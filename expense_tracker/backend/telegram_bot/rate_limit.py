@@ -0,0 +1,93 @@
+"""
+Outgoing message rate limits of the Telegram Bot API.
+
+Telegram allows about 30 messages per second over all chats and about one
+per second in a single chat, and answers 429 with retry_after when a bot
+goes faster. Every send reserves a slot in a global token bucket and in the
+bucket of its chat; callers sleep until both have a token, so concurrent
+senders (the bulk reminder fan-out) share one budget instead of each
+flooding the API. A 429 blocks the chat's bucket for retry_after.
+
+Limits are per process: run one sender process or divide the rates.
+"""
+
+import threading
+import time
+
+
+class TokenBucket:
+    """Token bucket that hands out reservations: take() returns how long the
+    caller has to wait for its token, tokens may go negative while callers
+    are queued."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = None
+        self.blocked_until = 0.0
+
+    def take(self, now):
+        if self.updated is not None:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        return max(wait, self.blocked_until - now)
+
+    def block(self, until):
+        self.blocked_until = max(self.blocked_until, until)
+
+    def idle(self, now):
+        """True once the bucket has been full and unblocked for a whole refill
+        period, it then behaves exactly like a new bucket"""
+        full_at = self.blocked_until
+        if self.updated is not None:
+            full_at = max(full_at, self.updated + (self.capacity - self.tokens) / self.rate)
+        return now - full_at >= self.capacity / self.rate
+
+
+class SendLimiter:
+    """Global and per-chat buckets shared by every sender of the process"""
+
+    def __init__(self, global_rate, chat_rate, chat_burst):
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.chats = {}
+        self._next_sweep = None
+        self._lock = threading.Lock()
+
+    def _chat_bucket(self, chat_id):
+        bucket = self.chats.get(chat_id)
+        if bucket is None:
+            bucket = self.chats[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return bucket
+
+    def _evict_idle(self, now):
+        # A worker sends to many chats over its life, drop the buckets that
+        # carry no state, at most once per refill period
+        if self._next_sweep is not None and now < self._next_sweep:
+            return
+        self._next_sweep = now + self.chat_burst / self.chat_rate
+        for chat_id in [chat_id for chat_id, bucket in self.chats.items() if bucket.idle(now)]:
+            del self.chats[chat_id]
+
+    def reserve(self, chat_id, now=None):
+        """Seconds to wait before sending to chat_id"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._evict_idle(now)
+            return max(self.global_bucket.take(now), self._chat_bucket(str(chat_id)).take(now))
+
+    def acquire(self, chat_id):
+        wait = self.reserve(chat_id)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def retry_after(self, chat_id, seconds, now=None):
+        """Telegram answered 429 for chat_id: hold its sends for `seconds`"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._chat_bucket(str(chat_id)).block(now + seconds)
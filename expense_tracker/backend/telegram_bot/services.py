@@ -1,9 +1,14 @@
 import io
 import json
-import requests
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from telegram_bot import telegram_http
 from django.conf import settings
+from django.db import IntegrityError, connection
+from django.utils import timezone
 from members.models import Member
 from expenses.models import ExpenseParticipant
+from telegram_bot.models import TelegramPhoto
 from collections import defaultdict
 from utils.qr_service import QRService
 
@@ -66,6 +71,50 @@ class TelegramService:
             print(f"❌ [TELEGRAM SERVICE] Error: {e}")
             return False
 
+    def send_bulk_reminders(self, member_ids, max_workers=None, on_result=None):
+        """
+        Send debt reminders to many members concurrently.
+        Workers share the process's rate limits (see rate_limit), so the
+        fan-out never sends faster than Telegram allows.
+
+        Args:
+            member_ids: Member IDs, duplicates are sent once
+            max_workers: Concurrent reminders (default: TELEGRAM_BULK_WORKERS)
+            on_result: Called in the caller's thread with each result as it completes
+
+        Returns:
+            list: {'member_id', 'success', 'duration_ms'[, 'error']} per member, in input order
+        """
+        member_ids = list(dict.fromkeys(member_ids))
+        if not member_ids:
+            return []
+        workers = max_workers or getattr(settings, 'TELEGRAM_BULK_WORKERS', 8)
+
+        def remind(member_id):
+            started = time.monotonic()
+            result = {'member_id': member_id}
+            try:
+                result['success'] = self.send_debt_reminder(member_id)
+            except Exception as e:
+                print(f"❌ [TELEGRAM SERVICE] Error sending to member {member_id}: {e}")
+                result.update(success=False, error=str(e))
+            finally:
+                # Worker threads open their own DB connections
+                connection.close()
+            result['duration_ms'] = round((time.monotonic() - started) * 1000)
+            return result
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=min(workers, len(member_ids)),
+                                thread_name_prefix='telegram-reminder') as executor:
+            futures = [executor.submit(remind, member_id) for member_id in member_ids]
+            for future in as_completed(futures):
+                result = future.result()
+                results[result['member_id']] = result
+                if on_result:
+                    on_result(result)
+        return [results[member_id] for member_id in member_ids]
+
     def _send_payer_details_with_qr(self, chat_id, debtor_name, payer, participants):
         payer_total = sum(p.amount_owed for p in participants)
 
@@ -108,16 +157,18 @@ class TelegramService:
         # Tạo nội dung chuyển khoản: "TenTra no TenNhan"
         description = f"{safe_debtor_name} tra {safe_payer_name}"
 
-        # Tạo QR bytes cục bộ
-        qr_bytes = None
+        # QR cục bộ: chỉ render khi Telegram chưa có file_id cho payload này
+        qr = None
         if payer.bank_name and payer.account_number:
-            qr_bytes = QRService.generate_qr_image(
-                bank_name=payer.bank_name,
-                account_number=payer.account_number,
-                amount=payer_total,
-                description=description,
-                account_name=payer.name
-            )
+            payload = QRService.build_payload(payer.bank_name, payer.account_number, payer_total, description)
+            if payload:
+                qr = (QRService.payload_key(payload), lambda: QRService.generate_qr_image(
+                    bank_name=payer.bank_name,
+                    account_number=payer.account_number,
+                    amount=payer_total,
+                    description=description,
+                    account_name=payer.name
+                ))
             message += f"\n🏦 {payer.bank_name} - {payer.account_number}"
 
         # Create inline keyboard with payment confirmation button
@@ -127,8 +178,8 @@ class TelegramService:
         if not isinstance(debtor_id, int) or not isinstance(payer.id, int):
             print(f"⚠️ [TELEGRAM] Invalid ID types: debtor={type(debtor_id)}, payer={type(payer.id)}")
             # Fallback: send message without button
-            if qr_bytes:
-                self._send_photo_bytes(chat_id, qr_bytes, message)
+            if qr:
+                self._send_qr_photo(chat_id, qr, message)
             else:
                 message += "\n⚠️ <i>Chưa có thông tin ngân hàng để tạo QR</i>"
                 self._send_text_message(chat_id, message)
@@ -143,8 +194,8 @@ class TelegramService:
         if len(callback_data.encode('utf-8')) > 64:
             print(f"⚠️ [TELEGRAM] Callback data exceeds 64 bytes: {len(callback_data)} bytes")
             # Fallback: send message without button
-            if qr_bytes:
-                self._send_photo_bytes(chat_id, qr_bytes, message)
+            if qr:
+                self._send_qr_photo(chat_id, qr, message)
             else:
                 message += "\n⚠️ <i>Chưa có thông tin ngân hàng để tạo QR</i>"
                 self._send_text_message(chat_id, message)
@@ -161,11 +212,11 @@ class TelegramService:
 
         # Gửi ảnh QR nếu có, nếu không thì gửi text
         # If message exceeds photo caption limit (1024 chars), send text first then QR separately
-        if qr_bytes and len(message) > 1024:
+        if qr and len(message) > 1024:
             self._send_text_message(chat_id, message)
-            self._send_photo_bytes(chat_id, qr_bytes, caption="", reply_markup=keyboard)
-        elif qr_bytes:
-            self._send_photo_bytes(chat_id, qr_bytes, message, reply_markup=keyboard)
+            self._send_qr_photo(chat_id, qr, caption="", reply_markup=keyboard)
+        elif qr:
+            self._send_qr_photo(chat_id, qr, message, reply_markup=keyboard)
         else:
             message += "\n⚠️ <i>Chưa có thông tin ngân hàng để tạo QR</i>"
             self._send_text_message_with_keyboard(chat_id, message, keyboard)
@@ -178,7 +229,7 @@ class TelegramService:
                 'text': message,
                 'parse_mode': 'HTML'
             }
-            response = requests.post(url, json=payload, timeout=10)
+            response = telegram_http.post(url, json=payload)
             return response.status_code == 200
         except Exception as e:
             print(f"Error sending text: {e}")
@@ -198,7 +249,7 @@ class TelegramService:
             if reply_markup:
                 payload['reply_markup'] = reply_markup
 
-            response = requests.post(url, json=payload, timeout=15)
+            response = telegram_http.post(url, json=payload)
             return response.status_code == 200
         except Exception as e:
             print(f"Error sending photo URL: {e}")
@@ -206,6 +257,11 @@ class TelegramService:
 
     def _send_photo_bytes(self, chat_id, photo_bytes, caption="", reply_markup=None):
         """Send photo from bytes using multipart upload"""
+        response = self._upload_photo(chat_id, photo_bytes, caption, reply_markup)
+        return response is not None and response.status_code == 200
+
+    def _upload_photo(self, chat_id, photo_bytes, caption="", reply_markup=None):
+        """Multipart sendPhoto, returns the response (None on network error)"""
         try:
             url = f"{self.base_url}/sendPhoto"
             files = {'photo': ('qr.png', io.BytesIO(photo_bytes), 'image/png')}
@@ -216,11 +272,78 @@ class TelegramService:
             }
             if reply_markup:
                 data['reply_markup'] = json.dumps(reply_markup)
-            response = requests.post(url, data=data, files=files, timeout=15)
-            return response.status_code == 200
+            return telegram_http.post(url, data=data, files=files)
         except Exception as e:
             print(f"Error sending photo bytes: {e}")
+            return None
+
+    def _send_qr_photo(self, chat_id, qr, caption="", reply_markup=None):
+        """
+        Send a QR image, reusing the file_id of an earlier upload of the same payload.
+
+        Args:
+            chat_id: Telegram chat ID
+            qr: (payload_key, render) where render() returns the PNG bytes
+            caption: Photo caption (HTML)
+            reply_markup: Optional inline keyboard dict
+
+        Returns:
+            bool: Success status
+        """
+        payload_key, render = qr
+        file_id = TelegramPhoto.objects.filter(payload_key=payload_key).values_list('file_id', flat=True).first()
+        if file_id:
+            payload = {'chat_id': chat_id, 'photo': file_id, 'caption': caption, 'parse_mode': 'HTML'}
+            if reply_markup:
+                payload['reply_markup'] = reply_markup
+            try:
+                response = telegram_http.post(f"{self.base_url}/sendPhoto", json=payload)
+            except Exception as e:
+                print(f"Error sending photo file_id: {e}")
+                return False
+            if response.status_code == 200:
+                TelegramPhoto.objects.filter(payload_key=payload_key).update(used_at=timezone.now())
+                return True
+            if not self._rejected_file_id(response):
+                return False
+            # file_id expired or unknown to Telegram: forget it and upload again
+            print(f"⚠️ [TELEGRAM] Cached file_id rejected, re-uploading QR {payload_key[:12]}")
+            TelegramPhoto.objects.filter(payload_key=payload_key).delete()
+
+        photo_bytes = render()
+        if not photo_bytes:
+            return False
+        response = self._upload_photo(chat_id, photo_bytes, caption, reply_markup)
+        if response is None or response.status_code != 200:
+            return False
+        file_id = self._photo_file_id(response)
+        if file_id:
+            try:
+                TelegramPhoto.objects.update_or_create(payload_key=payload_key, defaults={'file_id': file_id})
+            except IntegrityError:
+                # Another worker stored the same payload first
+                pass
+        return True
+
+    @staticmethod
+    def _rejected_file_id(response):
+        """True when Telegram refused a photo because of its file_id"""
+        if response.status_code != 400:
+            return False
+        try:
+            description = response.json().get("description", "")
+        except ValueError:
             return False
+        return "file" in description.lower()
+
+    @staticmethod
+    def _photo_file_id(response):
+        """file_id of the largest size in a sendPhoto response"""
+        try:
+            sizes = response.json()["result"]["photo"]
+            return max(sizes, key=lambda size: size.get("width", 0))["file_id"]
+        except (ValueError, KeyError, TypeError):
+            return None
 
     def get_telegram_updates(self, timeout=30):
         """
@@ -247,7 +370,7 @@ class TelegramService:
         # HTTP request outside transaction to avoid holding DB lock
         try:
             url = f"{self.base_url}/getUpdates"
-            response = requests.post(
+            response = telegram_http.post(
                 url,
                 json={"offset": current_offset + 1, "timeout": timeout},
                 timeout=timeout + 5  # Add 5s buffer
@@ -273,7 +396,7 @@ class TelegramService:
                 print(f"❌ [TELEGRAM] getUpdates failed: code={error_code}")
                 return []
 
-        except requests.Timeout:
+        except telegram_http.Timeout:
             # Normal for long polling - return empty
             return []
         except Exception as e:
@@ -303,7 +426,7 @@ class TelegramService:
         }
 
         try:
-            response = requests.post(url, json=payload, timeout=10)
+            response = telegram_http.post(url, json=payload)
 
             if response.status_code == 200:
                 return response.json().get("result")
@@ -343,8 +466,7 @@ class TelegramService:
             payload["show_alert"] = show_alert
 
         try:
-            # Increased timeout to 10s for poor network conditions
-            response = requests.post(url, json=payload, timeout=10)
+            response = telegram_http.post(url, json=payload)
             return response.status_code == 200
         except Exception as e:
             print(f"❌ [TELEGRAM] Error answering callback: {type(e).__name__}")
@@ -376,7 +498,7 @@ class TelegramService:
             payload["reply_markup"] = reply_markup
 
         try:
-            response = requests.post(url, json=payload, timeout=10)
+            response = telegram_http.post(url, json=payload)
 
             if response.status_code == 200:
                 return True
@@ -416,7 +538,7 @@ class TelegramService:
                 'parse_mode': 'HTML',
                 'reply_markup': keyboard
             }
-            response = requests.post(url, json=payload, timeout=10)
+            response = telegram_http.post(url, json=payload)
             return response.status_code == 200
         except Exception as e:
             print(f"Error sending text with keyboard: {e}")
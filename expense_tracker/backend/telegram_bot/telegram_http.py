@@ -0,0 +1,140 @@
+"""
+Pooled HTTP client for the Telegram Bot API.
+
+Drop-in for the parts of the requests module TelegramService uses
+(post() and the exceptions), backed by one keep-alive Session per process
+so reminders don't pay a TCP + TLS handshake per message. Every call gets
+the timeout of its Bot API method and is retried with backoff when that is
+safe:
+
+- the request never reached Telegram (DNS, refused, connect timeout)
+- Telegram answered 429, the message was not processed, wait retry_after
+  (for a chat, every sender of that chat waits, see rate_limit)
+- 5xx or a dropped connection, only for idempotent methods
+
+Read timeouts are never retried, the caller already waited the full timeout.
+Calls that carry a chat_id first wait for a slot in the process's
+SendLimiter, which keeps all senders under Telegram's rate limits.
+"""
+
+import os
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from urllib3.exceptions import NewConnectionError
+from telegram_bot.rate_limit import SendLimiter
+
+# Re-exported so callers can keep catching requests' exceptions
+Timeout = requests.Timeout
+ConnectionError = requests.ConnectionError
+RequestException = requests.RequestException
+
+# (connect, read) timeout per Bot API method, a timeout passed to post() wins
+TIMEOUTS = {
+    'sendMessage': (3.05, 10),
+    'sendPhoto': (3.05, 20),
+    'editMessageText': (3.05, 10),
+    'answerCallbackQuery': (3.05, 5),
+}
+DEFAULT_TIMEOUT = (3.05, 15)
+# Methods that may be repeated without a second visible effect
+IDEMPOTENT_METHODS = {'getUpdates', 'answerCallbackQuery', 'editMessageText'}
+BACKOFF_SECONDS = 0.5
+MAX_RETRY_AFTER = 30
+
+_local = {'pid': None, 'session': None, 'limiter': None}
+_lock = threading.Lock()
+
+
+def get_session():
+    """Session of this process, created on first use (and again after a fork)"""
+    pid = os.getpid()
+    with _lock:
+        if _local['pid'] != pid:
+            pool_size = getattr(settings, 'TELEGRAM_HTTP_POOL_SIZE', 10)
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _local['pid'], _local['session'] = pid, session
+            _local['limiter'] = SendLimiter(
+                getattr(settings, 'TELEGRAM_GLOBAL_RATE', 25),
+                getattr(settings, 'TELEGRAM_CHAT_RATE', 1),
+                getattr(settings, 'TELEGRAM_CHAT_BURST', 3),
+            )
+        return _local['session']
+
+
+def get_limiter():
+    """SendLimiter of this process, shared by every thread"""
+    get_session()
+    return _local['limiter']
+
+
+def _chat_id(kwargs):
+    for key in ('json', 'data'):
+        payload = kwargs.get(key)
+        if isinstance(payload, dict) and payload.get('chat_id') is not None:
+            return payload['chat_id']
+    return None
+
+
+def _not_sent(error):
+    """True when the request failed before Telegram could have received it"""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+def _retry_after(response):
+    try:
+        seconds = response.json().get('parameters', {}).get('retry_after', 1)
+    except ValueError:
+        seconds = 1
+    return min(float(seconds), MAX_RETRY_AFTER)
+
+
+def _rewind(files):
+    # Uploads are file objects, a retry has to send them from the start
+    for value in (files or {}).values():
+        if isinstance(value, tuple) and hasattr(value[1], 'seek'):
+            value[1].seek(0)
+
+
+def post(url, timeout=None, **kwargs):
+    """POST to a Bot API method URL, same arguments and result as requests.post"""
+    method = url.rsplit('/', 1)[-1]
+    idempotent = method in IDEMPOTENT_METHODS
+    retries = getattr(settings, 'TELEGRAM_HTTP_RETRIES', 2)
+    timeout = timeout or TIMEOUTS.get(method, DEFAULT_TIMEOUT)
+    chat_id = _chat_id(kwargs)
+
+    for attempt in range(retries + 1):
+        last = attempt == retries
+        _rewind(kwargs.get('files'))
+        if chat_id is not None:
+            get_limiter().acquire(chat_id)
+        try:
+            response = get_session().post(url, timeout=timeout, **kwargs)
+        except requests.Timeout as e:
+            if last or not _not_sent(e):
+                raise
+        except requests.ConnectionError as e:
+            if last or not (idempotent or _not_sent(e)):
+                raise
+        else:
+            if last:
+                return response
+            if response.status_code == 429:
+                if chat_id is not None:
+                    # acquire() at the top of the loop waits it out
+                    get_limiter().retry_after(chat_id, _retry_after(response))
+                else:
+                    time.sleep(_retry_after(response))
+                continue
+            if not (response.status_code >= 500 and idempotent):
+                return response
+        time.sleep(BACKOFF_SECONDS * 2 ** attempt)
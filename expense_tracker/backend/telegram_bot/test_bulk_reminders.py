@@ -0,0 +1,147 @@
+"""
+Unit tests for concurrent bulk reminders
+Tests the shared send rate limits and the reminder fan-out.
+"""
+
+import threading
+import time
+from unittest.mock import Mock, patch
+from telegram_bot import telegram_http
+from telegram_bot.rate_limit import SendLimiter, TokenBucket
+from telegram_bot.services import TelegramService
+
+
+class TestTokenBucket:
+
+    def test_burst_then_rate(self):
+        bucket = TokenBucket(rate=2, capacity=2)
+
+        waits = [bucket.take(now=0.0) for _ in range(4)]
+
+        assert waits == [0.0, 0.0, 0.5, 1.0]
+
+    def test_refills_over_time(self):
+        bucket = TokenBucket(rate=1, capacity=1)
+        bucket.take(now=0.0)
+
+        assert bucket.take(now=1.0) == 0.0
+
+    def test_block_holds_until_deadline(self):
+        bucket = TokenBucket(rate=10, capacity=10)
+        bucket.block(5.0)
+
+        assert bucket.take(now=2.0) == 3.0
+
+
+class TestSendLimiter:
+
+    def test_chats_have_separate_budgets(self):
+        limiter = SendLimiter(global_rate=100, chat_rate=1, chat_burst=1)
+
+        assert limiter.reserve('a', now=0.0) == 0.0
+        assert limiter.reserve('b', now=0.0) == 0.0
+        assert limiter.reserve('a', now=0.0) == 1.0
+
+    def test_global_budget_is_shared(self):
+        limiter = SendLimiter(global_rate=2, chat_rate=10, chat_burst=10)
+
+        waits = [limiter.reserve(chat, now=0.0) for chat in 'abc']
+
+        assert waits == [0.0, 0.0, 0.5]
+
+    def test_retry_after_only_holds_that_chat(self):
+        limiter = SendLimiter(global_rate=100, chat_rate=10, chat_burst=10)
+
+        limiter.retry_after('a', 7, now=0.0)
+
+        assert limiter.reserve('a', now=0.0) == 7.0
+        assert limiter.reserve('b', now=0.0) == 0.0
+
+    def test_idle_full_buckets_are_evicted(self):
+        limiter = SendLimiter(global_rate=100, chat_rate=1, chat_burst=2)
+        limiter.reserve('a', now=0.0)
+        limiter.reserve('b', now=0.0)
+        limiter.reserve('b', now=0.0)
+
+        # 'a' is full again at 1s and idle for the 2s refill period by 3s, 'b' only by 4s
+        limiter.reserve('c', now=3.5)
+
+        assert set(limiter.chats) == {'b', 'c'}
+
+    def test_blocked_bucket_is_kept(self):
+        limiter = SendLimiter(global_rate=100, chat_rate=1, chat_burst=1)
+        limiter.retry_after('a', 60, now=0.0)
+
+        limiter.reserve('b', now=10.0)
+
+        assert limiter.reserve('a', now=10.0) == 50.0
+
+    def test_429_holds_the_chat_in_post(self):
+        limiter = Mock()
+        session = Mock()
+        throttled = Mock(status_code=429)
+        throttled.json.return_value = {"parameters": {"retry_after": 4}}
+        session.post.side_effect = [throttled, Mock(status_code=200)]
+
+        with patch('telegram_bot.telegram_http.get_session', return_value=session), \
+                patch('telegram_bot.telegram_http.get_limiter', return_value=limiter):
+            result = telegram_http.post("https://api.telegram.org/botTOKEN/sendMessage", json={"chat_id": "42"})
+
+        assert result.status_code == 200
+        limiter.retry_after.assert_called_once_with("42", 4.0)
+        assert limiter.acquire.call_count == 2
+
+
+class TestSendBulkReminders:
+
+    def test_results_keep_input_order_and_skip_duplicates(self):
+        service = TelegramService()
+        with patch.object(service, 'send_debt_reminder', side_effect=lambda member_id: member_id != 2):
+            results = service.send_bulk_reminders([3, 1, 2, 3])
+
+        assert [r['member_id'] for r in results] == [3, 1, 2]
+        assert [r['success'] for r in results] == [True, True, False]
+        assert all('duration_ms' in r for r in results)
+
+    def test_reminders_run_concurrently(self):
+        service = TelegramService()
+        running, peak = [0], [0]
+        lock = threading.Lock()
+
+        def slow_reminder(member_id):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.05)
+            with lock:
+                running[0] -= 1
+            return True
+
+        with patch.object(service, 'send_debt_reminder', side_effect=slow_reminder):
+            service.send_bulk_reminders(range(8), max_workers=4)
+
+        assert peak[0] == 4
+
+    def test_on_result_sees_every_member(self):
+        service = TelegramService()
+        seen = []
+
+        with patch.object(service, 'send_debt_reminder', return_value=True):
+            service.send_bulk_reminders([1, 2, 3], on_result=seen.append)
+
+        assert sorted(r['member_id'] for r in seen) == [1, 2, 3]
+
+    def test_failure_is_reported_per_member(self):
+        service = TelegramService()
+
+        def remind(member_id):
+            if member_id == 2:
+                raise RuntimeError("boom")
+            return True
+
+        with patch.object(service, 'send_debt_reminder', side_effect=remind):
+            results = service.send_bulk_reminders([1, 2])
+
+        assert results[0]['success'] is True
+        assert results[1] == {'member_id': 2, 'success': False, 'error': 'boom',
+                              'duration_ms': results[1]['duration_ms']}
@@ -0,0 +1,113 @@
+"""
+Unit tests for QR photo file_id reuse
+Tests that uploaded QR images are re-sent by file_id and re-uploaded when Telegram rejects it.
+"""
+
+import pytest
+from decimal import Decimal
+from unittest.mock import Mock, patch
+from expenses.models import Expense, ExpenseParticipant
+from members.models import Member
+from telegram_bot.models import TelegramPhoto
+from telegram_bot.services import TelegramService
+from utils.qr_cache import QRCache
+
+KEY = "a" * 64
+
+
+def uploaded(file_id):
+    mock_response = Mock()
+    mock_response.status_code = 200
+    mock_response.json.return_value = {"ok": True, "result": {"photo": [
+        {"file_id": f"{file_id}-small", "width": 90},
+        {"file_id": file_id, "width": 410},
+    ]}}
+    return mock_response
+
+
+def rejected(description):
+    mock_response = Mock()
+    mock_response.status_code = 400
+    mock_response.json.return_value = {"ok": False, "description": description}
+    return mock_response
+
+
+@pytest.mark.django_db
+class TestSendQrPhoto:
+
+    @patch('telegram_bot.services.telegram_http.post')
+    def test_first_send_uploads_and_stores_file_id(self, mock_post):
+        mock_post.return_value = uploaded("FILE1")
+        render = Mock(return_value=b"png")
+
+        assert TelegramService()._send_qr_photo("chat123", (KEY, render), "caption") is True
+
+        render.assert_called_once()
+        assert "files" in mock_post.call_args[1]
+        assert TelegramPhoto.objects.get(payload_key=KEY).file_id == "FILE1"
+
+    @patch('telegram_bot.services.telegram_http.post')
+    def test_repeat_send_reuses_file_id(self, mock_post):
+        TelegramPhoto.objects.create(payload_key=KEY, file_id="FILE1")
+        mock_post.return_value = uploaded("FILE1")
+        render = Mock(return_value=b"png")
+        keyboard = {"inline_keyboard": [[{"text": "Paid", "callback_data": "x"}]]}
+
+        assert TelegramService()._send_qr_photo("chat123", (KEY, render), "caption", reply_markup=keyboard)
+
+        render.assert_not_called()
+        payload = mock_post.call_args[1]["json"]
+        assert payload["photo"] == "FILE1"
+        assert payload["reply_markup"] == keyboard
+
+    @patch('telegram_bot.services.telegram_http.post')
+    def test_rejected_file_id_is_replaced_by_new_upload(self, mock_post):
+        TelegramPhoto.objects.create(payload_key=KEY, file_id="EXPIRED")
+        mock_post.side_effect = [rejected("Bad Request: wrong file identifier/HTTP URL specified"), uploaded("FILE2")]
+        render = Mock(return_value=b"png")
+
+        assert TelegramService()._send_qr_photo("chat123", (KEY, render), "caption") is True
+
+        render.assert_called_once()
+        assert mock_post.call_count == 2
+        assert TelegramPhoto.objects.get(payload_key=KEY).file_id == "FILE2"
+
+    @patch('telegram_bot.services.telegram_http.post')
+    def test_other_errors_keep_file_id(self, mock_post):
+        TelegramPhoto.objects.create(payload_key=KEY, file_id="FILE1")
+        mock_post.return_value = rejected("Bad Request: chat not found")
+        render = Mock(return_value=b"png")
+
+        assert TelegramService()._send_qr_photo("chat123", (KEY, render), "caption") is False
+
+        render.assert_not_called()
+        assert mock_post.call_count == 1
+        assert TelegramPhoto.objects.filter(payload_key=KEY, file_id="FILE1").exists()
+
+    @patch('telegram_bot.services.telegram_http.post')
+    def test_failed_upload_stores_nothing(self, mock_post):
+        mock_post.return_value = rejected("Bad Request: chat not found")
+
+        assert TelegramService()._send_qr_photo("chat123", (KEY, lambda: b"png"), "caption") is False
+
+        assert not TelegramPhoto.objects.exists()
+
+    @patch('telegram_bot.services.telegram_http.post')
+    def test_repeat_reminder_uploads_qr_once(self, mock_post, tmp_path):
+        debtor = Member.objects.create(name="Alice", telegram_id="111111")
+        lender = Member.objects.create(name="Bob", telegram_id="222222",
+                                       bank_name="Vietcombank", account_number="0123456789")
+        expense = Expense.objects.create(name="Lunch", total_amount=Decimal('100.00'), payer=lender)
+        ExpenseParticipant.objects.create(expense=expense, member=debtor, amount_owed=Decimal('50.00'))
+        mock_post.return_value = uploaded("FILE1")
+        service = TelegramService()
+        cache = QRCache(memory_bytes=1024 * 1024, disk_bytes=1024 * 1024, directory=str(tmp_path))
+
+        with patch('utils.qr_service.get_qr_cache', return_value=cache):
+            assert service.send_debt_reminder(debtor.id)
+            assert service.send_debt_reminder(debtor.id)
+
+        uploads = [c for c in mock_post.call_args_list if "files" in c[1]]
+        by_file_id = [c for c in mock_post.call_args_list if (c[1].get("json") or {}).get("photo") == "FILE1"]
+        assert len(uploads) == 1
+        assert len(by_file_id) == 1
@@ -0,0 +1,180 @@
+"""
+Unit tests for the reminder job queue
+Tests enqueueing from the API, claiming, running and the job status endpoint.
+"""
+
+import pytest
+from datetime import timedelta
+from unittest.mock import Mock
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APIClient
+from telegram_bot.jobs import claim_next_job, enqueue_reminders, requeue_stale_jobs, run_job
+from telegram_bot.models import ReminderJob
+
+
+def fake_service(outcomes):
+    """TelegramService stand-in that reports `outcomes` (member_id -> success)"""
+    service = Mock()
+
+    def send_bulk_reminders(member_ids, on_result=None):
+        results = []
+        for member_id in member_ids:
+            result = {'member_id': member_id, 'success': outcomes[member_id], 'duration_ms': 1}
+            on_result(result)
+            results.append(result)
+        return results
+
+    service.send_bulk_reminders.side_effect = send_bulk_reminders
+    return service
+
+
+@pytest.fixture
+def client(django_user_model):
+    api_client = APIClient()
+    api_client.force_authenticate(django_user_model.objects.create(username="admin"))
+    return api_client
+
+
+@pytest.mark.django_db
+class TestReminderEndpoints:
+
+    def test_send_reminder_queues_job(self, client):
+        response = client.post('/api/telegram/send-reminder/', {'member_id': 5}, format='json')
+
+        assert response.status_code == 202
+        job = ReminderJob.objects.get(pk=response.data['job_id'])
+        assert job.member_ids == [5]
+        assert job.status == 'queued'
+
+    def test_send_bulk_reminders_queues_one_job(self, client):
+        response = client.post('/api/telegram/send-bulk-reminders/', {'member_ids': [1, 2, 2]}, format='json')
+
+        assert response.status_code == 202
+        assert response.data['progress'] == {'total': 2, 'sent': 0, 'succeeded': 0, 'percent': 0}
+        assert ReminderJob.objects.get().member_ids == [1, 2]
+
+    def test_send_bulk_reminders_requires_members(self, client):
+        response = client.post('/api/telegram/send-bulk-reminders/', {'member_ids': []}, format='json')
+
+        assert response.status_code == 400
+        assert not ReminderJob.objects.exists()
+
+    @pytest.mark.parametrize('member_ids', [[{'id': 1}], [[1]], ['1'], [1, None], [True]])
+    def test_send_bulk_reminders_rejects_non_integer_ids(self, client, member_ids):
+        response = client.post('/api/telegram/send-bulk-reminders/', {'member_ids': member_ids}, format='json')
+
+        assert response.status_code == 400
+        assert not ReminderJob.objects.exists()
+
+    def test_send_reminder_rejects_non_integer_id(self, client):
+        response = client.post('/api/telegram/send-reminder/', {'member_id': {'id': 1}}, format='json')
+
+        assert response.status_code == 400
+
+    def test_job_status_reports_outcomes(self, client):
+        job = enqueue_reminders([1, 2])
+        run_job(claim_next_job(), service=fake_service({1: True, 2: False}))
+
+        response = client.get(f'/api/telegram/jobs/{job.pk}/')
+
+        assert response.status_code == 200
+        assert response.data['status'] == 'done'
+        assert response.data['progress'] == {'total': 2, 'sent': 2, 'succeeded': 1, 'percent': 100}
+        assert [r['member_id'] for r in response.data['results']] == [1, 2]
+        assert response.data['elapsed_ms'] is not None
+
+    def test_unknown_job_is_404(self, client):
+        response = client.get('/api/telegram/jobs/999/')
+
+        assert response.status_code == 404
+
+
+@pytest.mark.django_db
+class TestReminderJobQueue:
+
+    def test_jobs_are_claimed_oldest_first_and_once(self):
+        first = enqueue_reminders([1])
+        second = enqueue_reminders([2])
+
+        assert claim_next_job().pk == first.pk
+        assert claim_next_job().pk == second.pk
+        assert claim_next_job() is None
+
+    def test_results_are_saved_while_running(self):
+        job = enqueue_reminders([1, 2])
+        claimed = claim_next_job()
+        saved = []
+        service = fake_service({1: True, 2: True})
+        original = service.send_bulk_reminders.side_effect
+
+        def watch(member_ids, on_result=None):
+            def record(result):
+                on_result(result)
+                saved.append(len(ReminderJob.objects.get(pk=job.pk).results))
+            return original(member_ids, on_result=record)
+
+        service.send_bulk_reminders.side_effect = watch
+        run_job(claimed, service=service)
+
+        assert saved == [1, 2]
+
+    def test_failed_send_marks_job_failed(self):
+        enqueue_reminders([1])
+        service = Mock()
+        service.send_bulk_reminders.side_effect = RuntimeError("Telegram down")
+
+        job = run_job(claim_next_job(), service=service)
+
+        job.refresh_from_db()
+        assert job.status == 'failed'
+        assert job.error == 'Telegram down'
+
+    def test_stale_job_resumes_with_unsent_members(self):
+        job = enqueue_reminders([1, 2])
+        ReminderJob.objects.filter(pk=job.pk).update(
+            status='running',
+            started_at=timezone.now() - timedelta(hours=1),
+            lease_expires_at=timezone.now() - timedelta(minutes=1),
+            results=[{'member_id': 1, 'success': True, 'duration_ms': 1}]
+        )
+
+        assert requeue_stale_jobs() == 1
+        service = fake_service({2: True})
+        run_job(claim_next_job(), service=service)
+
+        service.send_bulk_reminders.assert_called_once()
+        assert service.send_bulk_reminders.call_args[0][0] == [2]
+        job.refresh_from_db()
+        assert [r['member_id'] for r in job.results] == [1, 2]
+
+    def test_long_running_job_with_live_lease_is_not_requeued(self):
+        job = enqueue_reminders([1, 2])
+        ReminderJob.objects.filter(pk=job.pk).update(
+            status='running',
+            started_at=timezone.now() - timedelta(hours=2),
+            lease_expires_at=timezone.now() + timedelta(minutes=5)
+        )
+
+        assert requeue_stale_jobs() == 0
+        assert claim_next_job() is None
+
+    def test_each_result_renews_the_lease(self, settings):
+        settings.TELEGRAM_JOB_STALE_MINUTES = 10
+        job = enqueue_reminders([1])
+        claimed = claim_next_job()
+        ReminderJob.objects.filter(pk=job.pk).update(lease_expires_at=timezone.now())
+
+        run_job(claimed, service=fake_service({1: True}))
+
+        job.refresh_from_db()
+        assert job.lease_expires_at > timezone.now() + timedelta(minutes=9)
+
+    def test_worker_command_drains_queue(self, monkeypatch):
+        enqueue_reminders([1])
+        enqueue_reminders([2])
+        monkeypatch.setattr('telegram_bot.jobs.TelegramService', lambda: fake_service({1: True, 2: True}))
+
+        call_command('process_reminder_jobs', '--once')
+
+        assert set(ReminderJob.objects.values_list('status', flat=True)) == {'done'}
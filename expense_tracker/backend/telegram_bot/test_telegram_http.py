@@ -0,0 +1,137 @@
+"""
+Unit tests for the pooled Telegram HTTP client
+Tests session reuse, per-method timeouts and the retry policy.
+"""
+
+import io
+import pytest
+import requests
+from unittest.mock import Mock, patch
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+from telegram_bot import telegram_http
+
+BASE = "https://api.telegram.org/botTOKEN"
+
+
+def response(status_code, body=None):
+    mock_response = Mock()
+    mock_response.status_code = status_code
+    mock_response.json.return_value = body or {}
+    return mock_response
+
+
+def refused():
+    reason = NewConnectionError(None, "Connection refused")
+    return requests.ConnectionError(MaxRetryError(None, BASE, reason))
+
+
+@pytest.fixture
+def session():
+    mock_session = Mock()
+    with patch('telegram_bot.telegram_http.get_session', return_value=mock_session), \
+            patch('telegram_bot.telegram_http.time.sleep') as mock_sleep:
+        mock_session.sleep = mock_sleep
+        yield mock_session
+
+
+class TestPooledSession:
+
+    def test_session_is_shared_within_a_process(self):
+        assert telegram_http.get_session() is telegram_http.get_session()
+
+    def test_pool_size_comes_from_settings(self, settings):
+        settings.TELEGRAM_HTTP_POOL_SIZE = 3
+        telegram_http._local['pid'] = None
+
+        adapter = telegram_http.get_session().get_adapter(BASE)
+
+        assert adapter._pool_maxsize == 3
+
+
+class TestTimeouts:
+
+    def test_method_timeout_is_used(self, session):
+        session.post.return_value = response(200)
+
+        telegram_http.post(f"{BASE}/answerCallbackQuery", json={})
+
+        assert session.post.call_args[1]["timeout"] == telegram_http.TIMEOUTS['answerCallbackQuery']
+
+    def test_caller_timeout_wins(self, session):
+        session.post.return_value = response(200)
+
+        telegram_http.post(f"{BASE}/getUpdates", json={}, timeout=35)
+
+        assert session.post.call_args[1]["timeout"] == 35
+
+
+class TestRetries:
+
+    def test_429_is_retried_after_retry_after(self, session):
+        session.post.side_effect = [
+            response(429, {"parameters": {"retry_after": 3}}),
+            response(200),
+        ]
+
+        result = telegram_http.post(f"{BASE}/sendMessage", json={})
+
+        assert result.status_code == 200
+        session.sleep.assert_called_once_with(3.0)
+
+    def test_server_error_is_retried_for_idempotent_method(self, session):
+        session.post.side_effect = [response(502), response(200)]
+
+        result = telegram_http.post(f"{BASE}/editMessageText", json={})
+
+        assert result.status_code == 200
+        assert session.post.call_count == 2
+
+    def test_server_error_is_not_retried_for_send(self, session):
+        session.post.return_value = response(502)
+
+        result = telegram_http.post(f"{BASE}/sendMessage", json={})
+
+        assert result.status_code == 502
+        assert session.post.call_count == 1
+
+    def test_dropped_connection_is_not_retried_for_send(self, session):
+        session.post.side_effect = requests.ConnectionError("Connection aborted")
+
+        with pytest.raises(requests.ConnectionError):
+            telegram_http.post(f"{BASE}/sendMessage", json={})
+
+        assert session.post.call_count == 1
+
+    def test_refused_connection_is_retried_for_send(self, session):
+        sent = []
+
+        def upload(url, files=None, **kwargs):
+            sent.append(files['photo'][1].read())
+            if len(sent) == 1:
+                raise refused()
+            return response(200)
+
+        session.post.side_effect = upload
+        photo = io.BytesIO(b"png")
+
+        result = telegram_http.post(f"{BASE}/sendPhoto", data={}, files={'photo': ('qr.png', photo, 'image/png')})
+
+        assert result.status_code == 200
+        assert sent == [b"png", b"png"]
+
+    def test_read_timeout_is_not_retried(self, session):
+        session.post.side_effect = requests.ReadTimeout()
+
+        with pytest.raises(requests.Timeout):
+            telegram_http.post(f"{BASE}/getUpdates", json={}, timeout=35)
+
+        assert session.post.call_count == 1
+
+    def test_gives_up_after_configured_retries(self, session, settings):
+        settings.TELEGRAM_HTTP_RETRIES = 1
+        session.post.side_effect = [refused(), refused()]
+
+        with pytest.raises(requests.ConnectionError):
+            telegram_http.post(f"{BASE}/answerCallbackQuery", json={})
+
+        assert session.post.call_count == 2
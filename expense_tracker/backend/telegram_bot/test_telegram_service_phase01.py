@@ -13,7 +13,7 @@ class TestTelegramServicePolling:
     """Test get_telegram_updates() method"""
 
     @patch('django.db.transaction.atomic')
-    @patch('telegram_bot.services.requests.post')
+    @patch('telegram_bot.services.telegram_http.post')
     @patch('telegram_bot.models.TelegramUpdateOffset.objects')
     def test_get_telegram_updates_with_correct_offset(self, mock_objects, mock_post, mock_atomic):
         """Test polling uses stored offset + 1"""
@@ -36,7 +36,7 @@ class TestTelegramServicePolling:
         assert len(updates) == 1
 
     @patch('django.db.transaction.atomic')
-    @patch('telegram_bot.services.requests.post')
+    @patch('telegram_bot.services.telegram_http.post')
     @patch('telegram_bot.models.TelegramUpdateOffset.objects')
     def test_get_telegram_updates_with_timeout(self, mock_objects, mock_post, mock_atomic):
         """Test long polling timeout parameter"""
@@ -57,7 +57,7 @@ class TestTelegramServicePolling:
         assert call_args[1]["timeout"] == 35  # 30 + 5 buffer
 
     @patch('django.db.transaction.atomic')
-    @patch('telegram_bot.services.requests.post')
+    @patch('telegram_bot.services.telegram_http.post')
     @patch('telegram_bot.models.TelegramUpdateOffset.objects')
     def test_get_telegram_updates_handles_timeout_exception(self, mock_objects, mock_post, mock_atomic):
         """Test that request timeout returns empty list (normal for long polling)"""
@@ -72,7 +72,7 @@ class TestTelegramServicePolling:
         assert updates == []
 
     @patch('django.db.transaction.atomic')
-    @patch('telegram_bot.services.requests.post')
+    @patch('telegram_bot.services.telegram_http.post')
     @patch('telegram_bot.models.TelegramUpdateOffset.objects')
     def test_get_telegram_updates_handles_api_error(self, mock_objects, mock_post, mock_atomic):
         """Test API error returns empty list"""
@@ -92,7 +92,7 @@ class TestTelegramServicePolling:
 class TestTelegramServiceInlineKeyboards:
     """Test send_message_with_keyboard() method"""
 
-    @patch('telegram_bot.services.requests.post')
+    @patch('telegram_bot.services.telegram_http.post')
     def test_send_message_with_keyboard_success(self, mock_post):
         """Test sending message with inline keyboard"""
         mock_response = Mock()
@@ -126,7 +126,7 @@ class TestTelegramServiceInlineKeyboards:
         assert payload["parse_mode"] == "HTML"
         assert payload["reply_markup"]["inline_keyboard"] == keyboard
 
-    @patch('telegram_bot.services.requests.post')
+    @patch('telegram_bot.services.telegram_http.post')
     def test_send_message_with_keyboard_handles_error(self, mock_post):
         """Test error handling returns None"""
         mock_response = Mock()
@@ -147,7 +147,7 @@ class TestTelegramServiceInlineKeyboards:
 class TestTelegramServiceCallbackQueries:
     """Test answer_callback_query() method"""
 
-    @patch('telegram_bot.services.requests.post')
+    @patch('telegram_bot.services.telegram_http.post')
     def test_answer_callback_query_success(self, mock_post):
         """Test answering callback query removes loading spinner"""
         mock_response = Mock()
@@ -164,7 +164,7 @@ class TestTelegramServiceCallbackQueries:
         assert "answerCallbackQuery" in call_args[0][0]
         assert call_args[1]["json"]["callback_query_id"] == "callback_id_123"
 
-    @patch('telegram_bot.services.requests.post')
+    @patch('telegram_bot.services.telegram_http.post')
     def test_answer_callback_query_with_text(self, mock_post):
         """Test callback answer with notification text"""
         mock_response = Mock()
@@ -184,7 +184,7 @@ class TestTelegramServiceCallbackQueries:
         assert payload["text"] == "Đã xác nhận!"
         assert payload["show_alert"] is True
 
-    @patch('telegram_bot.services.requests.post')
+    @patch('telegram_bot.services.telegram_http.post')
     def test_answer_callback_query_handles_error(self, mock_post):
         """Test error handling returns False"""
         mock_post.side_effect = Exception("Network error")
@@ -198,7 +198,7 @@ class TestTelegramServiceCallbackQueries:
 class TestTelegramServiceMessageEditing:
     """Test edit_message_text() method"""
 
-    @patch('telegram_bot.services.requests.post')
+    @patch('telegram_bot.services.telegram_http.post')
     def test_edit_message_text_success(self, mock_post):
         """Test editing message text"""
         mock_response = Mock()
@@ -222,7 +222,7 @@ class TestTelegramServiceMessageEditing:
         assert payload["text"] == "Updated text"
         assert payload["parse_mode"] == "HTML"
 
-    @patch('telegram_bot.services.requests.post')
+    @patch('telegram_bot.services.telegram_http.post')
     def test_edit_message_text_remove_buttons(self, mock_post):
         """Test removing buttons by passing None"""
         mock_response = Mock()
@@ -242,7 +242,7 @@ class TestTelegramServiceMessageEditing:
         payload = call_args[1]["json"]
         assert "reply_markup" not in payload  # None means omit from payload
 
-    @patch('telegram_bot.services.requests.post')
+    @patch('telegram_bot.services.telegram_http.post')
     def test_edit_message_text_handles_deleted_message(self, mock_post):
         """Test non-critical error when message deleted by user"""
         mock_response = Mock()
@@ -292,7 +292,7 @@ class TestTelegramUpdateOffset:
 class TestSendPhotoUrlWithKeyboard:
     """Test _send_photo_url() with reply_markup parameter"""
 
-    @patch('telegram_bot.services.requests.post')
+    @patch('telegram_bot.services.telegram_http.post')
     def test_send_photo_url_with_keyboard(self, mock_post):
         """Test sending photo with inline keyboard"""
         mock_response = Mock()
@@ -316,7 +316,7 @@ class TestSendPhotoUrlWithKeyboard:
         payload = call_args[1]["json"]
         assert payload["reply_markup"] == keyboard
 
-    @patch('telegram_bot.services.requests.post')
+    @patch('telegram_bot.services.telegram_http.post')
     def test_send_photo_url_without_keyboard(self, mock_post):
         """Test sending photo without keyboard (backward compatibility)"""
         mock_response = Mock()
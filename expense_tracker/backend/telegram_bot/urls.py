@@ -4,5 +4,7 @@ from . import views
 urlpatterns = [
     path('send-reminder/', views.send_debt_reminder, name='send_debt_reminder'),
     path('send-bulk-reminders/', views.send_bulk_reminders, name='send_bulk_reminders'),
+    path('jobs/<int:job_id>/', views.reminder_job_status, name='reminder_job_status'),
     path('generate-qr/', views.generate_qr_code, name='generate_qr_code'),  # NEW URL
+    path('qr-cache-stats/', views.qr_cache_stats, name='qr_cache_stats'),
 ]
@@ -1,13 +1,33 @@
 import base64
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from .services import TelegramService
-from members.models import Member
+from .jobs import enqueue_reminders
+from .models import ReminderJob
 from utils.qr_service import QRService
 
 
+def job_response(job):
+    return {
+        'job_id': job.pk,
+        'status': job.status,
+        'progress': job.progress,
+        'results': job.results,
+        'error': job.error,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+        'elapsed_ms': round((job.finished_at - job.started_at).total_seconds() * 1000)
+        if job.started_at and job.finished_at else None,
+    }
+
+
+def is_member_id(value):
+    # bool is an int subclass, but True is not a member id
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def send_debt_reminder(request):
@@ -15,18 +35,14 @@ def send_debt_reminder(request):
 
     if not member_id:
         return Response({'error': 'Member ID is required'}, status=status.HTTP_400_BAD_REQUEST)
+    if not is_member_id(member_id):
+        return Response({'error': 'Member ID must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
 
-    try:
-        telegram_service = TelegramService()
-        success = telegram_service.send_debt_reminder(member_id)
-
-        if success:
-            return Response({'message': 'Reminder sent successfully'})
-        else:
-            return Response({'error': 'Failed to send reminder or no unpaid expenses'}, status=status.HTTP_400_BAD_REQUEST)
-    except Exception as e:
-        print(f"Error in send_debt_reminder view: {e}")
-        return Response({'error': 'Failed to send reminder'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    job = enqueue_reminders([member_id], request.user)
+    return Response(
+        {'message': 'Reminder queued', **job_response(job)},
+        status=status.HTTP_202_ACCEPTED
+    )
 
 
 @api_view(['POST'])
@@ -34,25 +50,27 @@ def send_debt_reminder(request):
 def send_bulk_reminders(request):
     member_ids = request.data.get('member_ids', [])
 
-    if not member_ids:
+    if not member_ids or not isinstance(member_ids, list):
         return Response({'error': 'Member IDs are required'}, status=status.HTTP_400_BAD_REQUEST)
+    if not all(is_member_id(member_id) for member_id in member_ids):
+        return Response({'error': 'Member IDs must be a list of integers'}, status=status.HTTP_400_BAD_REQUEST)
 
-    telegram_service = TelegramService()
-    results = []
+    job = enqueue_reminders(member_ids, request.user)
+    return Response(
+        {'message': f'Queued {len(job.member_ids)} reminders', **job_response(job)},
+        status=status.HTTP_202_ACCEPTED
+    )
 
-    for member_id in member_ids:
-        try:
-            success = telegram_service.send_debt_reminder(member_id)
-            results.append({'member_id': member_id, 'success': success})
-        except Exception as e:
-            print(f"Error sending to member {member_id}: {e}")
-            results.append({'member_id': member_id, 'success': False, 'error': str(e)})
 
-    successful = sum(1 for r in results if r['success'])
-    return Response({
-        'message': f'Sent {successful}/{len(results)} reminders successfully',
-        'results': results
-    })
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def reminder_job_status(request, job_id):
+    """Progress and per-member outcomes of a reminder job"""
+    try:
+        job = ReminderJob.objects.get(pk=job_id)
+    except ReminderJob.DoesNotExist:
+        return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(job_response(job))
 
 
 @api_view(['POST'])
@@ -97,3 +115,10 @@ def generate_qr_code(request):
             {'error': 'Failed to generate QR code'},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def qr_cache_stats(request):
+    """Hit-rate stats of the QR image cache in the serving process"""
+    return Response(QRService.cache_stats())
@@ -0,0 +1,168 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from django.conf import settings
+
+
+def payload_hash(payload):
+    """Cache key of a QR payload (the EMV string plus render options)"""
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class QRCache:
+    """
+    Two-level cache of rendered QR PNGs, keyed by payload hash.
+
+    Level 1 is an in-process LRU bounded by bytes. Level 2 is a private
+    directory (outside MEDIA_ROOT, the images carry bank account details)
+    shared by every process; when it grows past its
+    byte budget the least recently used files (by mtime, refreshed on
+    hit) are removed. Hits and misses are counted per process.
+    """
+
+    def __init__(self, memory_bytes, disk_bytes, directory):
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.directory = directory
+        self._memory = OrderedDict()
+        self._memory_used = 0
+        self._disk_used = None  # scanned on first write
+        self._lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'memory_evictions': 0, 'disk_evictions': 0}
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f'{key}.png')
+
+    def get(self, key):
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return data
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.stats['misses'] += 1
+            return None
+        with self._lock:
+            self.stats['disk_hits'] += 1
+            self._remember(key, data)
+        return data
+
+    def put(self, key, data):
+        with self._lock:
+            self._remember(key, data)
+        self._write(key, data)
+
+    def get_or_render(self, key, render):
+        """Cached bytes of `key`, calling render() and caching its result on a miss"""
+        data = self.get(key)
+        if data is None:
+            data = render()
+            if data is not None:
+                self.put(key, data)
+        return data
+
+    def _remember(self, key, data):
+        if len(data) > self.memory_bytes:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_used -= len(previous)
+        self._memory[key] = data
+        self._memory_used += len(data)
+        while self._memory_used > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_used -= len(evicted)
+            self.stats['memory_evictions'] += 1
+
+    def _write(self, key, data):
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+            try:
+                previous = os.stat(path).st_size
+            except FileNotFoundError:
+                previous = 0
+            # Write then rename so other processes never read a partial file
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"⚠️ [QR CACHE] Could not write {path}: {e}")
+            return
+        with self._lock:
+            if self._disk_used is None:
+                self._disk_used = sum(size for _, size, _ in self._scan())
+            else:
+                # An overwrite replaces the old file, only the difference is new
+                self._disk_used += len(data) - previous
+            over = self._disk_used > self.disk_bytes
+        if over:
+            self._evict_disk()
+
+    def _scan(self):
+        """(path, size, mtime) of every cached file"""
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith('.png'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def _evict_disk(self):
+        # Down to 90% of the budget so every write doesn't trigger a scan
+        entries = sorted(self._scan(), key=lambda entry: entry[2])
+        used = sum(size for _, size, _ in entries)
+        target = self.disk_bytes * 0.9
+        for path, size, _ in entries:
+            if used <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            used -= size
+            with self._lock:
+                self.stats['disk_evictions'] += 1
+        with self._lock:
+            self._disk_used = used
+
+    def report(self):
+        """Counters plus hit rate and memory use, for monitoring"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['memory_entries'] = len(self._memory)
+            stats['memory_bytes'] = self._memory_used
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['memory_hits'] + stats['disk_hits']) / lookups, 4) if lookups else None
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_qr_cache():
+    """Process-wide QRCache, configured from settings on first use"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = QRCache(
+                memory_bytes=getattr(settings, 'QR_CACHE_MEMORY_BYTES', 4 * 1024 * 1024),
+                disk_bytes=getattr(settings, 'QR_CACHE_DISK_BYTES', 64 * 1024 * 1024),
+                directory=getattr(settings, 'QR_CACHE_DIR', os.path.join(settings.BASE_DIR, 'var', 'qr_cache')),
+            )
+        return _cache
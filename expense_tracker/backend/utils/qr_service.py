@@ -2,6 +2,7 @@ import urllib.parse
 import re
 import io
 import qrcode
+from utils.qr_cache import get_qr_cache, payload_hash
 
 
 class QRService:
@@ -62,9 +63,13 @@ class QRService:
 
         return base_url + query_params
 
+    # Render options, part of the cache key so changing them invalidates cached images
+    QR_BOX_SIZE = 10
+    QR_BORDER = 4
+
     @classmethod
-    def generate_qr_image(cls, bank_name, account_number, amount, description, account_name=None):
-        """Returns PNG bytes of a locally-generated VietQR EMV QR code."""
+    def build_payload(cls, bank_name, account_number, amount, description):
+        """VietQR EMV payload string, None if the bank is not supported."""
         if not bank_name or not account_number:
             return None
 
@@ -74,13 +79,29 @@ class QRService:
             return None
 
         clean_desc = cls._clean_description(description)
-        payload = cls._build_emv_payload(bank_bin, account_number, amount, clean_desc)
+        return cls._build_emv_payload(bank_bin, account_number, amount, clean_desc)
+
+    @classmethod
+    def payload_key(cls, payload):
+        """Hash identifying the rendered image of a payload (see utils.qr_cache)"""
+        return payload_hash(f"{payload}|{cls.QR_BOX_SIZE}|{cls.QR_BORDER}")
 
+    @classmethod
+    def generate_qr_image(cls, bank_name, account_number, amount, description, account_name=None):
+        """Returns PNG bytes of a locally-generated VietQR EMV QR code.
+        Images are cached by payload hash, repeated payloads skip rendering."""
+        payload = cls.build_payload(bank_name, account_number, amount, description)
+        if payload is None:
+            return None
+        return get_qr_cache().get_or_render(cls.payload_key(payload), lambda: cls._render_png(payload))
+
+    @classmethod
+    def _render_png(cls, payload):
         qr = qrcode.QRCode(
             version=None,
             error_correction=qrcode.constants.ERROR_CORRECT_M,
-            box_size=10,
-            border=4
+            box_size=cls.QR_BOX_SIZE,
+            border=cls.QR_BORDER
         )
         qr.add_data(payload)
         qr.make(fit=True)
@@ -91,6 +112,11 @@ class QRService:
         buffer.seek(0)
         return buffer.getvalue()
 
+    @staticmethod
+    def cache_stats():
+        """Hit-rate stats of the QR image cache in this process"""
+        return get_qr_cache().report()
+
     @classmethod
     def _build_emv_payload(cls, bank_bin, account_number, amount, description):
         member_info = cls._tlv('00', bank_bin) + cls._tlv('01', account_number)
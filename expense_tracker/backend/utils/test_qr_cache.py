@@ -0,0 +1,104 @@
+"""
+Unit tests for the two-level QR image cache
+Tests the memory LRU, the disk store and QRService integration.
+"""
+
+import os
+import pytest
+from unittest.mock import Mock, patch
+from utils.qr_cache import QRCache
+from utils.qr_service import QRService
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return QRCache(memory_bytes=10, disk_bytes=100, directory=str(tmp_path))
+
+
+class TestQRCache:
+
+    def test_miss_renders_and_stores_both_levels(self, cache, tmp_path):
+        render = Mock(return_value=b"png")
+
+        assert cache.get_or_render("ab12", render) == b"png"
+        assert cache.get_or_render("ab12", render) == b"png"
+
+        render.assert_called_once()
+        assert (tmp_path / "ab" / "ab12.png").read_bytes() == b"png"
+        assert cache.report()['memory_hits'] == 1
+        assert cache.report()['misses'] == 1
+
+    def test_memory_is_lru_by_bytes(self, cache):
+        cache.put("aa01", b"12345")
+        cache.put("aa02", b"12345")
+        cache.get("aa01")
+        cache.put("aa03", b"12345")
+
+        assert list(cache._memory) == ["aa01", "aa03"]
+        assert cache.report()['memory_bytes'] == 10
+        assert cache.report()['memory_evictions'] == 1
+
+    def test_disk_level_serves_other_processes(self, cache, tmp_path):
+        cache.put("ab12", b"png")
+        other_process = QRCache(memory_bytes=10, disk_bytes=100, directory=str(tmp_path))
+
+        assert other_process.get("ab12") == b"png"
+        assert other_process.report()['disk_hits'] == 1
+        assert other_process.report()['hit_rate'] == 1.0
+
+    def test_disk_evicts_least_recently_used(self, cache, tmp_path):
+        for i in range(4):
+            cache.put(f"ab0{i}", b"x" * 30)
+            path = tmp_path / "ab" / f"ab0{i}.png"
+            os.utime(path, (i, i))
+
+        cache.put("ab04", b"x" * 30)
+
+        remaining = sorted(p.name for p in (tmp_path / "ab").iterdir())
+        # Evicts the oldest files down to 90% of the 100 byte budget
+        assert remaining == ["ab02.png", "ab03.png", "ab04.png"]
+        assert cache.report()['disk_evictions'] == 2
+
+    def test_overwrite_is_not_counted_twice(self, cache, tmp_path):
+        for _ in range(5):
+            cache.put("ab01", b"x" * 30)
+
+        assert cache._disk_used == 30
+        assert cache.report()['disk_evictions'] == 0
+        assert (tmp_path / "ab" / "ab01.png").exists()
+
+    def test_directory_is_outside_media_root(self, settings):
+        media_root = os.path.join(os.path.abspath(settings.MEDIA_ROOT), '')
+
+        assert not os.path.abspath(settings.QR_CACHE_DIR).startswith(media_root)
+
+    def test_unwritable_directory_still_returns_image(self, tmp_path):
+        blocked = tmp_path / "file"
+        blocked.write_text("not a directory")
+        cache = QRCache(memory_bytes=10, disk_bytes=100, directory=str(blocked))
+
+        assert cache.get_or_render("ab12", lambda: b"png") == b"png"
+
+
+class TestQRServiceCaching:
+
+    def test_repeated_payload_skips_rendering(self, cache):
+        args = dict(bank_name='Vietcombank', account_number='0123456789',
+                    amount=50000, description='Alice tra Bob')
+        cache.memory_bytes = 1024 * 1024
+
+        with patch('utils.qr_service.get_qr_cache', return_value=cache), \
+                patch.object(QRService, '_render_png', wraps=QRService._render_png) as render:
+            first = QRService.generate_qr_image(**args)
+            second = QRService.generate_qr_image(**args)
+            QRService.generate_qr_image(**{**args, 'amount': 60000})
+
+        assert first == second
+        assert first.startswith(b"\x89PNG")
+        assert render.call_count == 2
+
+    def test_unsupported_bank_is_not_cached(self, cache):
+        with patch('utils.qr_service.get_qr_cache', return_value=cache):
+            assert QRService.generate_qr_image('Unknown Bank', '0123', 1000, 'x') is None
+
+        assert cache.report()['hit_rate'] is None
@@ -0,0 +1,78 @@
+import threading
+import unicodedata
+from loguru import logger
+from cache import TTLCache
+from config import GEMINI_API_KEY, AI_CACHE_SIZE, AI_CACHE_TTL
+
+MODEL = "gemini-2.0-flash"
+
+_client = None
+_generate_content_config = None
+_client_lock = threading.Lock()
+
+# Answers to recent prompts, keyed by the normalized prompt
+response_cache = TTLCache(AI_CACHE_SIZE, AI_CACHE_TTL)
+
+
+def get_client():
+    """Long-lived Gemini client and generation config, created on first use"""
+    global _client, _generate_content_config
+    with _client_lock:
+        if _client is None:
+            # google.genai takes most of a second to import, only /ai pays for it
+            from google import genai
+            from google.genai import types
+            _client = genai.Client(
+                api_key=GEMINI_API_KEY,
+            )
+            _generate_content_config = types.GenerateContentConfig(
+                temperature=1,
+                top_p=0.95,
+                top_k=40,
+                max_output_tokens=8192,
+                response_mime_type="text/plain",
+            )
+        return _client, _generate_content_config
+
+
+def normalize_prompt(prompt):
+    """Cache key: NFC-normalized, case-folded, whitespace collapsed"""
+    return ' '.join(unicodedata.normalize('NFC', prompt).casefold().split())
+
+
+def stream_gemini(prompt):
+    """Yield the text chunks of the Gemini response as they arrive"""
+    key = normalize_prompt(prompt)
+    cached = response_cache.get(key)
+    if cached is not None:
+        logger.info(f"Gemini cache hit: {response_cache.stats()}")
+        yield cached
+        return
+
+    client, generate_content_config = get_client()
+    from google.genai import types
+    contents = [
+        types.Content(
+            role="user",
+            parts=[
+                types.Part.from_text(
+                    text=prompt
+                ),
+            ],
+        ),
+    ]
+
+    chunks = []
+    for chunk in client.models.generate_content_stream(
+        model=MODEL,
+        contents=contents,
+        config=generate_content_config,
+    ):
+        if chunk.text:
+            chunks.append(chunk.text)
+            yield chunk.text
+
+    # Only complete answers are cached
+    if chunks:
+        response_cache.set(key, ''.join(chunks))
+
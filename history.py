@@ -0,0 +1,294 @@
+import bisect
+import fcntl
+import heapq
+import json
+import os
+import threading
+from contextlib import contextmanager
+from loguru import logger
+from config import HISTORY_COMPACT_BYTES
+
+# Completed votes history, stored as an append-only journal plus a sorted
+# snapshot. Every event is one JSON line {"key": ..., "record": ...}
+# appended to the journal. Compaction moves the journal aside, merges it
+# into the snapshot in a background thread and writes a key -> byte
+# offset index next to the snapshot.
+#
+#   history.jsonl             journal, appended to by every process
+#   history.jsonl.compacting  journal being merged (only during compaction)
+#   history_snapshot.jsonl    sorted by key, one line per record
+#   history_snapshot.idx      {"key": offset} for the snapshot
+#
+# Every chat has its own set of files, see chats.py.
+
+
+@contextmanager
+def _file_lock(path, mode):
+    """fcntl lock shared by every process using the same data/ directory"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'a') as lock:
+        fcntl.flock(lock.fileno(), mode)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+
+def _encode(key, record):
+    return (json.dumps({'key': key, 'record': record}, ensure_ascii=False) + '\n').encode('utf-8')
+
+
+def _decode(line):
+    entry = json.loads(line)
+    return entry['key'], entry['record']
+
+
+def _trim_partial_tail(f):
+    """Cut the unterminated fragment a crashed append left at the end of the journal"""
+    end = f.seek(0, os.SEEK_END)
+    if end == 0:
+        return
+    f.seek(end - 1)
+    if f.read(1) == b'\n':
+        return
+    position = end
+    while position > 0:
+        step = min(4096, position)
+        position -= step
+        f.seek(position)
+        newline = f.read(step).rfind(b'\n')
+        if newline != -1:
+            f.truncate(position + newline + 1)
+            break
+    else:
+        f.truncate(0)
+    logger.warning(f"Dropped the partial tail of {f.name} left by an interrupted append")
+
+
+def _iter_lines(handle):
+    with handle:
+        for line in handle:
+            if not line.endswith(b'\n'):
+                # Partially written tail of a crashed append
+                break
+            try:
+                yield _decode(line)
+            except (ValueError, KeyError):
+                logger.error(f"Skipping corrupt history line in {handle.name}")
+
+
+class HistoryJournal:
+    """History of one chat: journal, snapshot and index in the same directory"""
+
+    def __init__(self, journal, snapshot, compact_bytes=HISTORY_COMPACT_BYTES):
+        self.journal = journal
+        self.snapshot = snapshot
+        self.compact_bytes = compact_bytes
+        self.compacting = journal + '.compacting'
+        self.snapshot_index = os.path.splitext(snapshot)[0] + '.idx'
+        self._lock_file = journal + '.lock'
+        self._compact_lock_file = journal + '.compact.lock'
+        self._compact_thread = None
+        self._compact_thread_lock = threading.Lock()
+        self._index_cache = {'mtime': None, 'index': {}, 'keys': []}
+
+    def append(self, key, record):
+        """Append one event with a single write and fsync"""
+        self.append_many([(key, record)])
+
+    def append_many(self, entries):
+        data = b''.join(_encode(key, record) for key, record in entries)
+        if not data:
+            return
+        # Exclusive lock: the tail check must not see another process's write in progress
+        with _file_lock(self._lock_file, fcntl.LOCK_EX):
+            with open(self.journal, 'a+b') as f:
+                _trim_partial_tail(f)
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+        self.maybe_compact()
+
+    def append_missing(self, entries):
+        """Append only the entries whose key is not in the history yet, returns how many.
+        Lets an import whose database transaction was rolled back after the
+        journal write run again without duplicating events."""
+        entries = list(entries)
+        if not entries:
+            return 0
+        known = {key for key, _ in self.iter_records(since=min(key for key, _ in entries))}
+        missing = [(key, record) for key, record in entries if key not in known]
+        self.append_many(missing)
+        return len(missing)
+
+    def _open_segments(self, since=None):
+        """Open snapshot and journals together so a concurrent compaction can't tear the view.
+        With `since` the snapshot is positioned at its first key >= since, or skipped."""
+        handles = []
+        with _file_lock(self._lock_file, fcntl.LOCK_SH):
+            for path in (self.snapshot, self.compacting, self.journal):
+                try:
+                    handle = open(path, 'rb')
+                except FileNotFoundError:
+                    continue
+                if since is not None and path == self.snapshot:
+                    offset = self._snapshot_offset(since)
+                    if offset is None:
+                        handle.close()
+                        continue
+                    handle.seek(offset)
+                handles.append(handle)
+        return handles
+
+    def iter_records(self, since=None):
+        """Lazily yield (key, record) for the whole history, oldest segment first,
+        or only the keys >= since"""
+        for handle in self._open_segments(since):
+            for key, record in _iter_lines(handle):
+                if since is None or key >= since:
+                    yield key, record
+
+    def _load_index(self):
+        try:
+            mtime = os.stat(self.snapshot_index).st_mtime_ns
+        except FileNotFoundError:
+            return {}
+        if self._index_cache['mtime'] != mtime:
+            with open(self.snapshot_index, 'r', encoding='utf-8') as f:
+                self._index_cache['index'] = json.load(f)
+            # Written in snapshot order, so the keys are already sorted
+            self._index_cache['keys'] = list(self._index_cache['index'])
+            self._index_cache['mtime'] = mtime
+        return self._index_cache['index']
+
+    def _snapshot_offset(self, since):
+        """Byte offset of the first snapshot key >= since, None if there is none"""
+        index = self._load_index()
+        if not index:
+            return 0  # no index, scan the whole snapshot
+        keys = self._index_cache['keys']
+        position = bisect.bisect_left(keys, since)
+        return index[keys[position]] if position < len(keys) else None
+
+    def get(self, key):
+        """Look up one record, journals first then the snapshot index"""
+        found = None
+        for path in (self.compacting, self.journal):
+            try:
+                handle = open(path, 'rb')
+            except FileNotFoundError:
+                continue
+            for entry_key, record in _iter_lines(handle):
+                if entry_key == key:
+                    found = record
+        if found is not None:
+            return found
+        offset = self._load_index().get(key)
+        if offset is None:
+            return None
+        with open(self.snapshot, 'rb') as f:
+            f.seek(offset)
+            return _decode(f.readline())[1]
+
+    def latest(self):
+        """Return the (key, record) with the greatest key, or None"""
+        best = None
+        for path in (self.compacting, self.journal):
+            try:
+                handle = open(path, 'rb')
+            except FileNotFoundError:
+                continue
+            for entry in _iter_lines(handle):
+                if best is None or entry[0] >= best[0]:
+                    best = entry
+        index = self._load_index()
+        if index:
+            last_key = max(index)
+            if best is None or last_key > best[0]:
+                best = (last_key, self.get(last_key))
+        return best
+
+    def _journal_size(self):
+        try:
+            return os.path.getsize(self.journal)
+        except FileNotFoundError:
+            return 0
+
+    def maybe_compact(self):
+        """Start a background compaction when the journal has grown large enough"""
+        if self._journal_size() < self.compact_bytes and not os.path.exists(self.compacting):
+            return
+        with self._compact_thread_lock:
+            if self._compact_thread is not None and self._compact_thread.is_alive():
+                return
+            self._compact_thread = threading.Thread(
+                target=self.compact, name='history-compaction', daemon=True)
+            self._compact_thread.start()
+
+    def compact(self):
+        """Merge the journal into the snapshot, returns the number of snapshot records"""
+        directory = os.path.dirname(self._compact_lock_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self._compact_lock_file, 'a') as compact_lock:
+            try:
+                fcntl.flock(compact_lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return None  # another process is compacting
+            try:
+                return self._compact()
+            except Exception as e:
+                logger.error(f"History compaction of {self.journal} failed: {str(e)}")
+                return None
+            finally:
+                fcntl.flock(compact_lock.fileno(), fcntl.LOCK_UN)
+
+    def _compact(self):
+        # A leftover .compacting file from a crashed run is merged first,
+        # the live journal is picked up by the next compaction
+        with _file_lock(self._lock_file, fcntl.LOCK_EX):
+            if not os.path.exists(self.compacting):
+                if self._journal_size() == 0:
+                    return None
+                os.replace(self.journal, self.compacting)
+
+        with open(self.compacting, 'rb') as f:
+            pending = dict(_iter_lines(f))
+
+        def snapshot_entries():
+            try:
+                handle = open(self.snapshot, 'rb')
+            except FileNotFoundError:
+                return
+            for key, record in _iter_lines(handle):
+                if key not in pending:
+                    yield key, record
+
+        tmp_snapshot = self.snapshot + '.tmp'
+        tmp_index = self.snapshot_index + '.tmp'
+        index = {}
+        offset = 0
+        with open(tmp_snapshot, 'wb') as out:
+            merged = heapq.merge(snapshot_entries(), sorted(pending.items()), key=lambda e: e[0])
+            for key, record in merged:
+                line = _encode(key, record)
+                index[key] = offset
+                out.write(line)
+                offset += len(line)
+            out.flush()
+            os.fsync(out.fileno())
+        with open(tmp_index, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+
+        with _file_lock(self._lock_file, fcntl.LOCK_EX):
+            os.replace(tmp_snapshot, self.snapshot)
+            os.replace(tmp_index, self.snapshot_index)
+            os.remove(self.compacting)
+
+        logger.info(f"Compacted {self.journal}: merged {len(pending)} events, "
+                    f"{len(index)} records in snapshot")
+        return len(index)
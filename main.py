@@ -1,41 +1,194 @@
 # main.py
+import sys
+
+if '--profile-startup' in sys.argv:
+    from startup_profile import ImportProfiler
+    import_profiler = ImportProfiler().install()
+else:
+    import_profiler = None
+
 import argparse
 import os
+import signal
+import threading
 from loguru import logger
-from config import initialize_logger, bot, CHAT_ID
-from utils import (
-    create_food_poll,
-    close_food_poll,
-    bot_command_handlers
+from datetime import timedelta
+from config import (
+    initialize_logger, bot, CHAT_ID, CHAT_IDS, WEBHOOK_URL, WEBHOOK_SECRET,
+    WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_PATH, SCHEDULER_ENABLED,
+    SCHEDULE_CATCHUP_MINUTES, HOLIDAYS, CONTROL_SOCKET
 )
+from control import ControlServer, send_command
+
+
+def poll_commands():
+    from utils import create_food_poll, close_food_poll
+
+    def each_chat(function):
+        # Without a chat_id the command runs for every served group
+        def run(chat_id=None):
+            for target in ([chat_id] if chat_id else CHAT_IDS):
+                function(target)
+        return run
+
+    return {'vote': each_chat(create_food_poll), 'close-vote': each_chat(close_food_poll)}
+
+
+def schedule_jobs():
+    """Scheduler jobs of every served group, built from the per-chat schedules"""
+    from functools import partial
+    from chats import all_chats
+    from scheduler import cron
+    from utils import create_food_poll, close_food_poll
+
+    jobs = []
+    for chat in all_chats():
+        # A poll that would be closed in the same catch-up is not created
+        for job, function, superseded_by in (('vote', create_food_poll, 'close-vote'),
+                                             ('close-vote', close_food_poll, None)):
+            jobs.append((
+                f'{job} {chat.chat_id}',
+                cron(chat.schedule(job)),
+                partial(function, chat.chat_id),
+                partial(chat.store.claim_schedule_run, job),
+                superseded_by and f'{superseded_by} {chat.chat_id}',
+            ))
+    return jobs
+
+
+def exit_on_sigterm(signum, frame):
+    # The default SIGTERM action skips atexit, raising lets the outbox
+    # flush the messages still queued before run_bot restarts us
+    raise SystemExit(128 + signum)
+
+
+def start_daemon():
+    """Handlers, scheduler and control socket shared by --run and --webhook"""
+    from chats import all_chats
+    from utils import bot_command_handlers
+    from scheduler import Scheduler, parse_holidays
+
+    signal.signal(signal.SIGTERM, exit_on_sigterm)
+
+    # Fold whatever earlier runs appended into the history snapshots
+    for chat in all_chats():
+        chat.history.maybe_compact()
+    # Score the history now so the first poll doesn't have to
+    threading.Thread(target=lambda: [chat.food_scores() for chat in all_chats()],
+                     name='food-scores', daemon=True).start()
+    # Register all command handlers
+    bot_command_handlers()
+    commands = poll_commands()
+    ControlServer(CONTROL_SOCKET, commands, chat_ids=CHAT_IDS).start()
+    if not SCHEDULER_ENABLED:
+        logger.info("Scheduler disabled")
+        return
+    Scheduler(
+        schedule_jobs,
+        holidays=parse_holidays(HOLIDAYS),
+        catchup=timedelta(minutes=SCHEDULE_CATCHUP_MINUTES)
+    ).start()
+
+
+def run_command(command, chat_id=None):
+    """Let the running daemon execute a poll command, run it here if there is none"""
+    args = {'chat_id': chat_id} if chat_id else None
+    try:
+        response = send_command(CONTROL_SOCKET, command, args=args)
+    except OSError as e:
+        logger.warning(f"Bot daemon not reachable ({str(e)}), running {command} in this process")
+        poll_commands()[command](chat_id)
+        return True
+    if not response.get('ok'):
+        logger.error(f"Daemon refused {command}: {response.get('error')}")
+        return False
+    return True
+
+
+def print_stats(month, chat_id=None):
+    from datetime import datetime
+    from chats import get_chat
+    import stats
+
+    month = month or datetime.now().strftime('%Y-%m')
+    datetime.strptime(month, '%Y-%m')
+    for target in ([chat_id] if chat_id else CHAT_IDS):
+        print(f"[{target}]")
+        print(stats.format_report(stats.monthly_stats(get_chat(target)), month))
+        print()
+
+
+def sync_expenses(chat_id=None):
+    from chats import get_chat
+    import expense_sync
+
+    if not expense_sync.enabled():
+        print("EXPENSE_API_URL chưa được cấu hình")
+        return
+    for target in ([chat_id] if chat_id else CHAT_IDS):
+        totals, unmatched = expense_sync.sync_history(get_chat(target))
+        print(f"[{target}] Đã thêm {totals['created']} khoản chi, bỏ qua {totals['skipped']}")
+        if unmatched:
+            print(f"[{target}] Không tìm thấy thành viên: {', '.join(unmatched)}")
 
 
 def main():
     parser = argparse.ArgumentParser(description='Bot Telegram quản lý ăn uống')
     parser.add_argument('--vote', action='store_true', help='Tạo poll chọn món ăn')
     parser.add_argument('--close-vote', action='store_true', help='Đóng poll chọn món ăn')
+    parser.add_argument('--chat', help='Chỉ chạy --vote/--close-vote/--stats/--sync-expenses cho nhóm này (mặc định: mọi nhóm)')
     parser.add_argument('--run', action='store_true', help='Chạy bot trong chế độ thường')
+    parser.add_argument('--webhook', action='store_true',
+                        help='Chạy bot nhận update qua webhook thay vì polling')
+    parser.add_argument('--profile-startup', action='store_true',
+                        help='In thời gian import từng module khi khởi động')
+    parser.add_argument('--stats', nargs='?', const='', metavar='YYYY-MM',
+                        help='In thống kê của tháng (mặc định: tháng này)')
+    parser.add_argument('--sync-expenses', action='store_true',
+                        help='Gửi mọi khoản /debt trong lịch sử sang expense tracker')
+    parser.add_argument('--import-json', action='store_true',
+                        help='Nhập lại dữ liệu từ các file JSON cũ trong data/ vào database')
 
     args = parser.parse_args()
+    if args.chat is not None and args.chat not in CHAT_IDS:
+        parser.error(f"--chat {args.chat} không có trong CHAT_IDS")
 
     try:
         if args.vote:
-            create_food_poll()
-            logger.info("Created food poll")
+            if run_command('vote', args.chat):
+                logger.info("Food poll creation requested")
         elif args.close_vote:
-            close_food_poll()
-            logger.info("Closed food poll")
+            if run_command('close-vote', args.chat):
+                logger.info("Food poll closing requested")
         elif args.run:
             logger.info("Bot started in normal mode")
             print("Bot running...")
-            # Register all command handlers
-            bot_command_handlers()
+            start_daemon()
             bot.infinity_polling()
-        else:
-            parser.print_helNam
+        elif args.webhook:
+            logger.info("Bot started in webhook mode")
+            print("Bot running (webhook)...")
+            start_daemon()
+            from webhook import run_webhook
+            run_webhook(bot, WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_PATH,
+                        WEBHOOK_SECRET, public_url=WEBHOOK_URL)
+        elif args.stats is not None:
+            print_stats(args.stats, args.chat)
+        elif args.sync_expenses:
+            sync_expenses(args.chat)
+        elif args.import_json:
+            from chats import get_chat
+            get_chat(CHAT_ID).store.import_json_files(force=True)
+            logger.info("Imported JSON data files")
+        elif not args.profile_startup:
+            parser.print_help()
     except Exception as e:
         logger.error(f"System error: {str(e)}")
         print(f"Lỗi hệ thống do thằng Nam: {e}")
+    finally:
+        if import_profiler:
+            import_profiler.uninstall()
+            print(import_profiler.report())
 
 
 if __name__ == "__main__":
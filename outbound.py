@@ -0,0 +1,240 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from loguru import logger
+
+
+def retry_after(error):
+    """Seconds Telegram asked us to wait in a 429 response, if any"""
+    result = getattr(error, 'result_json', None) or {}
+    return result.get('parameters', {}).get('retry_after')
+
+
+class TokenBucket:
+    """`rate` tokens per second, holding at most `capacity`"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now):
+        """Seconds until a token is available"""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def consume(self, now):
+        self._refill(now)
+        self.tokens -= 1
+
+
+# Lanes of a chat, each with its own queue and per-chat bucket
+MESSAGES = 'messages'
+EDITS = 'edits'
+CALLBACKS = 'callbacks'
+LANES = {'edit_message_text': EDITS, 'answer_callback_query': CALLBACKS}
+
+
+class _Job:
+    def __init__(self, method, args, kwargs):
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+        self.attempts = 0
+
+
+class OutboundQueue:
+    """Single outbound path for everything the bot sends to Telegram.
+
+    Calls are queued per chat and lane and sent by one dispatcher thread,
+    oldest first within a lane and round-robin across lanes. A global
+    token bucket and per-chat buckets keep the bot under Telegram's flood
+    limits: messages and edits have separate budgets, so a streamed /ai
+    reply can't hold up a poll, and callback answers only count against
+    the global bucket since they are not chat messages. A 429 puts the
+    call back at the head of its lane and holds the whole chat until
+    retry_after has passed, and network errors are retried with backoff.
+    Every call returns a Future, so callers can fire and forget or wait
+    for the result.
+    """
+
+    def __init__(self, bot, global_rate, chat_rate, chat_burst, edit_rate=1.0, edit_burst=3,
+                 max_attempts=5):
+        self.bot = bot
+        self.limits = {MESSAGES: (chat_rate, chat_burst), EDITS: (edit_rate, edit_burst)}
+        self.max_attempts = max_attempts
+        self._global = TokenBucket(global_rate, global_rate)
+        self._buckets = {}      # (chat_id, lane) -> TokenBucket
+        self._pending = {}      # (chat_id, lane) -> deque of jobs
+        self._order = deque()   # lanes with pending jobs, round-robin
+        self._not_before = {}   # chat_id -> monotonic time set by retry_after
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self._thread = None
+        self.blocking = _BlockingView(self)
+
+    def submit(self, chat_id, method, *args, **kwargs):
+        # CHAT_IDS entries are strings while message.chat.id is an int, both
+        # must land in the same queue and bucket
+        lane = (str(chat_id), LANES.get(method, MESSAGES))
+        job = _Job(method, args, kwargs)
+        with self._cond:
+            self._push(lane, job)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='outbound', daemon=True)
+                self._thread.start()
+        return job.future
+
+    # Helpers mirroring the telebot methods the lunch bot uses
+
+    def send_message(self, chat_id, text, **kwargs):
+        return self.submit(chat_id, 'send_message', chat_id, text, **kwargs)
+
+    def reply_to(self, message, text, **kwargs):
+        return self.submit(message.chat.id, 'reply_to', message, text, **kwargs)
+
+    def send_poll(self, chat_id, question, options, **kwargs):
+        return self.submit(chat_id, 'send_poll', chat_id, question, options, **kwargs)
+
+    def stop_poll(self, chat_id, message_id, **kwargs):
+        return self.submit(chat_id, 'stop_poll', chat_id, message_id, **kwargs)
+
+    def edit_message_text(self, text, chat_id, message_id, **kwargs):
+        return self.submit(chat_id, 'edit_message_text', text, chat_id, message_id, **kwargs)
+
+    def send_chat_action(self, chat_id, action, **kwargs):
+        return self.submit(chat_id, 'send_chat_action', chat_id, action, **kwargs)
+
+    def answer_callback_query(self, call, **kwargs):
+        return self.submit(call.message.chat.id, 'answer_callback_query', call.id, **kwargs)
+
+    def cancel(self, future):
+        """Drop a call that is still queued, returns False if it was already sent or sending"""
+        with self._cond:
+            for lane, queue in self._pending.items():
+                for job in queue:
+                    if job.future is future:
+                        queue.remove(job)
+                        if not queue:
+                            del self._pending[lane]
+                            self._order.remove(lane)
+                        future.cancel()
+                        self._cond.notify_all()
+                        return True
+        return False
+
+    def flush(self, timeout=None):
+        """Wait until everything queued so far has been sent, returns False on timeout"""
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: not self._pending and not self._in_flight, timeout)
+
+    def _push(self, lane, job, front=False):
+        queue = self._pending.get(lane)
+        if queue is None:
+            queue = self._pending[lane] = deque()
+            self._order.append(lane)
+        if front:
+            queue.appendleft(job)
+        else:
+            queue.append(job)
+        self._cond.notify_all()
+
+    def _bucket(self, lane):
+        """Per-chat bucket of a lane, None for lanes only limited globally"""
+        limits = self.limits.get(lane[1])
+        if limits is None:
+            return None
+        bucket = self._buckets.get(lane)
+        if bucket is None:
+            bucket = self._buckets[lane] = TokenBucket(*limits)
+        return bucket
+
+    def _next_job(self):
+        """Pop the next sendable job, or return how long to wait for one"""
+        now = time.monotonic()
+        shortest = None
+        for _ in range(len(self._order)):
+            lane = self._order[0]
+            self._order.rotate(-1)
+            bucket = self._bucket(lane)
+            wait = max(self._not_before.get(lane[0], 0) - now,
+                       bucket.delay(now) if bucket is not None else 0.0, self._global.delay(now))
+            if wait > 0:
+                shortest = wait if shortest is None else min(shortest, wait)
+                continue
+            queue = self._pending[lane]
+            job = queue.popleft()
+            if not queue:
+                del self._pending[lane]
+                self._order.remove(lane)
+            if bucket is not None:
+                bucket.consume(now)
+            self._global.consume(now)
+            return lane, job, None
+        return None, None, shortest
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    lane, job, wait = self._next_job()
+                    if job is not None:
+                        self._in_flight += 1
+                        break
+                    self._cond.wait(timeout=wait)
+            try:
+                self._send(lane, job)
+            finally:
+                with self._cond:
+                    self._in_flight -= 1
+                    self._cond.notify_all()
+
+    def _send(self, lane, job):
+        chat_id = lane[0]
+        try:
+            result = getattr(self.bot, job.method)(*job.args, **job.kwargs)
+        except Exception as e:
+            job.attempts += 1
+            wait = retry_after(e)
+            # Telegram API errors other than 429 will fail again, network errors may not
+            transient = getattr(e, 'error_code', None) is None and job.attempts < self.max_attempts
+            if wait is None and not transient:
+                logger.error(f"Telegram {job.method} to {chat_id} failed: {str(e)}")
+                job.future.set_exception(e)
+                return
+            wait = wait if wait is not None else min(30, 2 ** job.attempts)
+            logger.warning(f"Telegram {job.method} to {chat_id} delayed {wait}s: {str(e)}")
+            with self._cond:
+                self._not_before[chat_id] = time.monotonic() + wait
+                self._push(lane, job, front=True)
+            return
+        job.future.set_result(result)
+
+
+class _BlockingView:
+    """Same helpers, but each call waits for its result and raises its error"""
+
+    def __init__(self, queue, timeout=120):
+        self._queue = queue
+        self._timeout = timeout
+
+    def __getattr__(self, name):
+        helper = getattr(self._queue, name)
+
+        def call(*args, **kwargs):
+            future = helper(*args, **kwargs)
+            try:
+                return future.result(timeout=self._timeout)
+            except FutureTimeout:
+                # The caller gives up on the call, so it must not go out later
+                self._queue.cancel(future)
+                raise
+        return call
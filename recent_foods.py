@@ -0,0 +1,52 @@
+from collections import Counter, deque
+from datetime import datetime, timedelta
+
+
+class RecentFoodWindow:
+    """Foods selected within the last `days` days.
+
+    Entries sit in a deque ordered by time, so expiry only ever pops from
+    the left, and a Counter beside it answers "was this food picked
+    recently" in constant time.
+    """
+
+    def __init__(self, days, entries=()):
+        self.length = timedelta(days=days)
+        self._entries = deque()
+        self._counts = Counter()
+        for food, selected_at in entries:
+            self.add(food, selected_at)
+
+    def add(self, food, selected_at=None):
+        selected_at = selected_at or datetime.now()
+        if self._entries and selected_at < self._entries[-1][0]:
+            # Out of order entry (clock change), keep the deque sorted
+            self._entries.append((selected_at, food))
+            self._entries = deque(sorted(self._entries, key=lambda e: e[0]))
+        else:
+            self._entries.append((selected_at, food))
+        self._counts[food] += 1
+
+    def cutoff(self, now=None):
+        return (now or datetime.now()) - self.length
+
+    def expire(self, now=None):
+        """Drop entries older than the window, returns the expired foods"""
+        cutoff = self.cutoff(now)
+        expired = []
+        while self._entries and self._entries[0][0] < cutoff:
+            _, food = self._entries.popleft()
+            self._counts[food] -= 1
+            if not self._counts[food]:
+                del self._counts[food]
+            expired.append(food)
+        return expired
+
+    def __contains__(self, food):
+        return food in self._counts
+
+    def __len__(self):
+        return len(self._entries)
+
+    def foods(self):
+        return [food for _, food in self._entries]
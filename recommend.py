@@ -0,0 +1,103 @@
+import heapq
+import math
+import random
+import threading
+from datetime import datetime
+
+# Lunch history of a chat folded into per-food statistics, used to pick
+# the options of the next poll. Every closed food poll adds, per offered
+# food, a recency weight w = 2 ** ((t - anchor) / half_life):
+#
+#   offered  sum of w over the polls the food appeared in
+#   share    sum of w * (votes for the food / votes in the poll)
+#   wins     sum of w over the polls the food won
+#
+# Popularity is share / offered and win rate is wins / offered. Both are
+# ratios of sums carrying the same decay, so the weights never have to be
+# decayed again as time passes, and a new poll is one O(options) update.
+
+SKIP_OPTION = 'Nhịn'
+PRIOR = 1 / 8          # expected share of one option in an 8 food poll
+PRIOR_WEIGHT = 2       # polls' worth of evidence before history dominates
+_MAX_EXPONENT = 512    # rebase the anchor long before 2 ** exponent overflows
+
+
+class FoodScores:
+    """Popularity, win rate and recency of every food seen in a chat's history"""
+
+    def __init__(self, half_life_days):
+        self.half_life = half_life_days * 86400
+        self._anchor = None
+        self._stats = {}  # food -> [offered, share, wins]
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_history(cls, records, half_life_days):
+        """Build from (key, record) pairs in a single pass"""
+        scores = cls(half_life_days)
+        for key, record in records:
+            scores.add(key, record)
+        return scores
+
+    def add(self, key, record):
+        """Fold one history record in, everything except closed food polls is ignored"""
+        if record.get('type') != 'food' or not record.get('poll_options'):
+            return
+        try:
+            timestamp = datetime.fromisoformat(key).timestamp()
+        except (TypeError, ValueError):
+            return
+        vote_counts = record.get('vote_counts') or {}
+        total_votes = sum(vote_counts.values())
+        with self._lock:
+            weight = self._weight(timestamp)
+            for food in record['poll_options']:
+                if food == SKIP_OPTION:
+                    continue
+                stats = self._stats.setdefault(food, [0.0, 0.0, 0.0])
+                stats[0] += weight
+                if total_votes:
+                    stats[1] += weight * vote_counts.get(food, 0) / total_votes
+                if food == record.get('selected'):
+                    stats[2] += weight
+
+    def _weight(self, timestamp):
+        if self._anchor is None:
+            self._anchor = timestamp
+        exponent = (timestamp - self._anchor) / self.half_life
+        if exponent > _MAX_EXPONENT:
+            factor = 2.0 ** -exponent
+            for stats in self._stats.values():
+                for i in range(3):
+                    stats[i] *= factor
+            self._anchor = timestamp
+            exponent = 0.0
+        return 2.0 ** exponent
+
+    def score(self, food):
+        """Smoothed popularity + win rate, a food never offered scores 2 * PRIOR"""
+        with self._lock:
+            offered, share, wins = self._stats.get(food, (0.0, 0.0, 0.0))
+            scale = self._scale()
+        offered, share, wins = offered * scale, share * scale, wins * scale
+        popularity = (share + PRIOR * PRIOR_WEIGHT) / (offered + PRIOR_WEIGHT)
+        win_rate = (wins + PRIOR * PRIOR_WEIGHT) / (offered + PRIOR_WEIGHT)
+        return popularity + win_rate
+
+    def _scale(self):
+        # Bring the sums to "now" so the prior weighs the same against old
+        # and recent history
+        if self._anchor is None:
+            return 1.0
+        exponent = (datetime.now().timestamp() - self._anchor) / self.half_life
+        return 2.0 ** -min(exponent, _MAX_EXPONENT * 2)
+
+
+def weighted_sample(items, weights, k):
+    """k distinct items, each drawn with probability proportional to its weight
+    (Efraimidis-Spirakis: keep the k largest random() ** (1 / weight))"""
+    if len(items) <= k:
+        return list(items)
+    keyed = ((math.log(random.random() or 1e-300) / weight, item)
+             for item, weight in zip(items, weights))
+    return [item for _, item in heapq.nlargest(k, keyed, key=lambda e: e[0])]
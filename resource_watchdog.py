@@ -0,0 +1,121 @@
+import threading
+from collections import deque
+from datetime import datetime
+from loguru import logger
+import psutil
+
+
+class ResourceWatchdog:
+    """Samples a child process and restarts it gracefully when it outgrows its limits.
+
+    Every `interval` seconds the RSS, CPU percentage, thread count and open
+    file descriptors are recorded in a ring buffer of `history` samples.
+    A limit must be exceeded for `strikes` samples in a row before the
+    child gets SIGTERM, and SIGKILL `grace` seconds later if it is still
+    alive. A limit set to 0 is disabled.
+    """
+
+    def __init__(self, pid, interval=30, history=120, max_rss_mb=0, max_cpu=0,
+                 max_threads=0, max_fds=0, strikes=3, grace=10, trend_every=10):
+        self.process = psutil.Process(pid)
+        self.interval = interval
+        self.samples = deque(maxlen=history)
+        self.limits = {
+            'rss_mb': max_rss_mb,
+            'cpu': max_cpu,
+            'threads': max_threads,
+            'fds': max_fds,
+        }
+        self.strikes = strikes
+        self.grace = grace
+        self.trend_every = trend_every
+        self.restart_reason = None
+        self._over = {name: 0 for name in self.limits}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        # First call only primes psutil's CPU counters, it always returns 0.0
+        try:
+            self.process.cpu_percent(None)
+        except psutil.Error:
+            pass
+        self._thread = threading.Thread(target=self._loop, name='resource-watchdog', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+
+    def sample(self):
+        with self.process.oneshot():
+            sample = {
+                'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'rss_mb': self.process.memory_info().rss / (1024 * 1024),
+                'cpu': self.process.cpu_percent(None),
+                'threads': self.process.num_threads(),
+                'fds': self.process.num_fds() if hasattr(self.process, 'num_fds') else 0,
+            }
+        self.samples.append(sample)
+        return sample
+
+    def _loop(self):
+        count = 0
+        while not self._stop.wait(self.interval):
+            try:
+                sample = self.sample()
+            except psutil.NoSuchProcess:
+                return
+            except psutil.Error as e:
+                logger.warning(f"Watchdog could not sample child: {str(e)}")
+                continue
+            count += 1
+            if count % self.trend_every == 0:
+                logger.info(self.trend())
+            exceeded = self._check(sample)
+            if exceeded:
+                self.restart(exceeded)
+                return
+
+    def _check(self, sample):
+        exceeded = []
+        for name, limit in self.limits.items():
+            if limit and sample[name] > limit:
+                self._over[name] += 1
+                if self._over[name] >= self.strikes:
+                    exceeded.append(f"{name}={sample[name]:.0f} > {limit}")
+            else:
+                self._over[name] = 0
+        return exceeded
+
+    def trend(self):
+        """One line summary of the latest sample and the change across the buffer"""
+        if not self.samples:
+            return "Watchdog: no samples yet"
+        first, last = self.samples[0], self.samples[-1]
+        return (
+            f"Watchdog: rss {last['rss_mb']:.1f}MB ({last['rss_mb'] - first['rss_mb']:+.1f}), "
+            f"cpu {last['cpu']:.0f}%, threads {last['threads']} ({last['threads'] - first['threads']:+d}), "
+            f"fds {last['fds']} ({last['fds'] - first['fds']:+d}) over {len(self.samples)} samples"
+        )
+
+    def restart(self, exceeded):
+        self.restart_reason = ', '.join(exceeded)
+        logger.warning(f"Watchdog restarting bot: {self.restart_reason}\n{self.dump()}")
+        try:
+            self.process.terminate()
+            self.process.wait(timeout=self.grace)
+        except psutil.TimeoutExpired:
+            logger.error(f"Bot ignored SIGTERM for {self.grace}s, killing it")
+            self.process.kill()
+        except psutil.NoSuchProcess:
+            pass
+
+    def dump(self, last=None):
+        samples = list(self.samples)[-last:] if last else list(self.samples)
+        lines = [f"{'time':19} {'rss_mb':>8} {'cpu':>6} {'threads':>7} {'fds':>5}"]
+        for s in samples:
+            lines.append(f"{s['time']:19} {s['rss_mb']:8.1f} {s['cpu']:6.1f} {s['threads']:7d} {s['fds']:5d}")
+        return '\n'.join(lines)
@@ -1,13 +1,20 @@
 # run_bot.py
 import sys
 import time
+import random
+import threading
 import subprocess
 import argparse
+from collections import deque
 from datetime import datetime
 from loguru import logger
 import os
 import signal
 import psutil
+from dotenv import load_dotenv
+from resource_watchdog import ResourceWatchdog
+
+load_dotenv()
 
 # Configure logger
 logger.remove()  # Remove default handler
@@ -21,50 +28,164 @@ logger.add(
 logger.add(sys.stderr, level="INFO")
 
 
+# Restart policy
+BACKOFF_BASE = 1.0         # first restart delay, seconds
+BACKOFF_MAX = 300.0        # cap for the exponential delay
+STABLE_AFTER = 60.0        # a child that lived this long resets the backoff
+CRASH_LOOP_COUNT = 5       # this many crashes ...
+CRASH_LOOP_WINDOW = 300.0  # ... within this many seconds is a crash loop
+CRASH_LOOP_PAUSE = 900.0   # pause after a crash loop
+STDERR_TAIL = 20           # stderr lines kept for the crash summary
+
+# Resource watchdog, limits of 0 are disabled. `kill -USR1 <runner pid>`
+# dumps the last WATCHDOG_SAMPLES samples to the log.
+WATCHDOG_INTERVAL = float(os.getenv('WATCHDOG_INTERVAL', 30))
+WATCHDOG_SAMPLES = int(os.getenv('WATCHDOG_SAMPLES', 120))
+WATCHDOG_MAX_RSS_MB = float(os.getenv('WATCHDOG_MAX_RSS_MB', 512))
+WATCHDOG_MAX_CPU = float(os.getenv('WATCHDOG_MAX_CPU', 0))
+WATCHDOG_MAX_THREADS = int(os.getenv('WATCHDOG_MAX_THREADS', 200))
+WATCHDOG_MAX_FDS = int(os.getenv('WATCHDOG_MAX_FDS', 512))
+
+current_watchdog = None
+
+
+def pump(stream, log, tail=None):
+    """Forward every line of a child pipe to the log until it closes"""
+    for line in iter(stream.readline, ''):
+        line = line.rstrip()
+        if line:
+            log(line)
+            if tail is not None:
+                tail.append(line)
+    stream.close()
+
+
+def start_pumps(process, stderr_tail):
+    # One thread per pipe: neither stream can fill up and block the child
+    # while the supervisor waits on the other one
+    threads = [
+        threading.Thread(target=pump, args=(process.stdout, logger.info), daemon=True),
+        threading.Thread(target=pump, args=(process.stderr, logger.error, stderr_tail), daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def next_delay(consecutive_failures):
+    """Exponential backoff with full jitter"""
+    ceiling = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** consecutive_failures))
+    return random.uniform(BACKOFF_BASE, max(BACKOFF_BASE, ceiling))
+
+
+def start_watchdog(process):
+    try:
+        watchdog = ResourceWatchdog(
+            process.pid,
+            interval=WATCHDOG_INTERVAL,
+            history=WATCHDOG_SAMPLES,
+            max_rss_mb=WATCHDOG_MAX_RSS_MB,
+            max_cpu=WATCHDOG_MAX_CPU,
+            max_threads=WATCHDOG_MAX_THREADS,
+            max_fds=WATCHDOG_MAX_FDS
+        )
+    except psutil.NoSuchProcess:
+        return None  # child already exited
+    return watchdog.start()
+
+
+dump_requested = threading.Event()
+
+
+def request_dump(signum, frame):
+    # Logging here could deadlock on loguru's lock if the signal interrupted
+    # the main thread while it was logging, so the dump thread does it
+    dump_requested.set()
+
+
+def dump_samples():
+    while True:
+        dump_requested.wait()
+        dump_requested.clear()
+        if current_watchdog is None:
+            logger.info("Watchdog: no bot process running")
+            continue
+        logger.info(f"{current_watchdog.trend()}\n{current_watchdog.dump()}")
+
+
 def run_bot():
+    global current_watchdog
     parser = argparse.ArgumentParser(description='Bot runner')
     parser.add_argument('--run', action='store_true', help='run bot')
     parser.add_argument('--stop', action='store_true', help='stop bot')
     args = parser.parse_args()
 
+    consecutive_failures = 0
+    crashes = deque()  # (time, return code) of recent crashes
+    stderr_tail = deque(maxlen=STDERR_TAIL)
+    threading.Thread(target=dump_samples, name='watchdog-dump', daemon=True).start()
+    signal.signal(signal.SIGUSR1, request_dump)
+
     while True:
         try:
             logger.info("bot...")
+            started = time.monotonic()
             process = subprocess.Popen(
                 [sys.executable, 'main.py', '--run'],
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
                 universal_newlines=True
             )
+            pumps = start_pumps(process, stderr_tail)
+            current_watchdog = start_watchdog(process)
+            return_code = process.wait()
+            restart_reason = None
+            if current_watchdog:
+                current_watchdog.stop()
+                restart_reason = current_watchdog.restart_reason
+            for thread in pumps:
+                thread.join(timeout=5)
+            uptime = time.monotonic() - started
 
-            while True:
-                output = process.stdout.readline()
-                if output:
-                    logger.info(output.strip())
+            if restart_reason:
+                logger.warning(f"Bot restarted by watchdog after {uptime:.0f}s: {restart_reason}")
+            elif return_code != 0:
+                logger.error(f"Bot crash {return_code} after {uptime:.0f}s")
+            else:
+                logger.warning(f"Bot stop after {uptime:.0f}s")
 
-                error = process.stderr.readline()
-                if error:
-                    logger.error(error.strip())
+            # A watchdog restart is planned and should not grow the backoff,
+            # it still counts towards crash loop detection below
+            if uptime >= STABLE_AFTER or restart_reason:
+                consecutive_failures = 0
+            else:
+                consecutive_failures += 1
 
-                if process.poll() is not None:
-                    break
+            now = time.monotonic()
+            crashes.append((now, return_code))
+            while crashes and now - crashes[0][0] > CRASH_LOOP_WINDOW:
+                crashes.popleft()
 
-            return_code = process.poll()
-            if return_code != 0:
-                logger.error(f"Bot crash {return_code}")
-                remaining_error = process.stderr.read()
-                if remaining_error:
-                    logger.error(f"error: {remaining_error}")
+            if len(crashes) >= CRASH_LOOP_COUNT:
+                logger.critical(
+                    f"Crash loop: {len(crashes)} exits in {CRASH_LOOP_WINDOW:.0f}s, "
+                    f"return codes {[code for _, code in crashes]}, "
+                    f"pausing {CRASH_LOOP_PAUSE:.0f}s. Last stderr:\n" + "\n".join(stderr_tail)
+                )
+                crashes.clear()
+                delay = CRASH_LOOP_PAUSE
             else:
-                logger.warning("Bot stop")
+                delay = next_delay(consecutive_failures)
 
-            logger.info("Wait 5 second...")
-            time.sleep(5)
+            logger.info(f"Wait {delay:.1f} second...")
+            time.sleep(delay)
 
         except Exception as e:
             logger.error(f"Lỗi runner do Nam: {str(e)}")
-            logger.info("Wait 5 second...")
-            time.sleep(5)
+            consecutive_failures += 1
+            delay = next_delay(consecutive_failures)
+            logger.info(f"Wait {delay:.1f} second...")
+            time.sleep(delay)
 
 
 if __name__ == "__main__":
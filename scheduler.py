@@ -0,0 +1,155 @@
+import threading
+from functools import lru_cache
+from datetime import datetime, timedelta
+from loguru import logger
+
+
+class CronSchedule:
+    """Five-field cron expression: minute hour day-of-month month day-of-week.
+
+    Fields accept `*`, numbers, ranges (1-5), lists (1,3,5) and steps
+    (*/15, 0-30/10). Day-of-week uses cron numbering, 0 or 7 = Sunday.
+    As in cron, when both day-of-month and day-of-week are restricted a
+    day matching either one is enough (`0 9 1 * 1` is the 1st and every
+    Monday).
+    """
+
+    RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression!r}")
+        self.expression = expression
+        (self.minutes, self.hours, self.days,
+         self.months, self.weekdays) = [
+            self._parse_field(field, low, high) for field, (low, high) in zip(fields, self.RANGES)
+        ]
+        if 7 in self.weekdays:
+            self.weekdays.add(0)
+        self._either_day = not fields[2].startswith('*') and not fields[4].startswith('*')
+
+    @staticmethod
+    def _parse_field(field, low, high):
+        values = set()
+        for part in field.split(','):
+            step = 1
+            if '/' in part:
+                part, step = part.split('/', 1)
+                step = int(step)
+            if part == '*':
+                start, end = low, high
+            elif '-' in part:
+                start, end = (int(v) for v in part.split('-', 1))
+            else:
+                start = end = int(part)
+            if start < low or end > high or start > end or step < 1:
+                raise ValueError(f"Invalid cron field: {field!r}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def matches(self, moment):
+        if not (moment.minute in self.minutes
+                and moment.hour in self.hours
+                and moment.month in self.months):
+            return False
+        day = moment.day in self.days
+        weekday = (moment.isoweekday() % 7) in self.weekdays
+        return (day or weekday) if self._either_day else (day and weekday)
+
+    def latest(self, now, within):
+        """Most recent scheduled minute in (now - within, now], or None"""
+        moment = now.replace(second=0, microsecond=0)
+        earliest = now - within
+        while moment > earliest:
+            if self.matches(moment):
+                return moment
+            moment -= timedelta(minutes=1)
+        return None
+
+
+@lru_cache(maxsize=256)
+def cron(expression):
+    """Parsed CronSchedule, shared by every chat using the same expression"""
+    return CronSchedule(expression)
+
+
+class Scheduler:
+    """Runs the poll jobs inside the long-lived bot process.
+
+    Every tick each job looks for its latest scheduled time within the
+    catch-up window, so runs missed while the bot was down are made up
+    once. A run is claimed in the database before it starts, which keeps
+    several bot processes from creating or closing the same poll twice.
+    `jobs` is a list of (name, CronSchedule, function, claim, superseded_by)
+    or a function returning one, called on every tick so schedule changes
+    apply at once. claim(scheduled_for) returns False when the run was
+    already claimed. superseded_by names another job (or is None): a run
+    that job makes pointless, because it is due at the same time or later,
+    is claimed and skipped, so catching up never creates a poll only to
+    close it right away.
+    """
+
+    def __init__(self, jobs, holidays=(), catchup=timedelta(minutes=90), tick=30):
+        self.jobs = jobs
+        self.holidays = set(holidays)
+        self.catchup = catchup
+        self.tick = tick
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_pending(self, now=None):
+        now = now or datetime.now()
+        due = []
+        for name, schedule, function, claim, superseded_by in self._current_jobs():
+            scheduled_for = schedule.latest(now, self.catchup)
+            if scheduled_for is None or scheduled_for.date() in self.holidays:
+                continue
+            due.append((scheduled_for, name, function, claim, superseded_by))
+        due_at = {name: scheduled_for for scheduled_for, name, _, _, _ in due}
+        for scheduled_for, name, function, claim, superseded_by in sorted(due, key=lambda d: d[0]):
+            if not claim(scheduled_for):
+                continue
+            if superseded_by in due_at and due_at[superseded_by] >= scheduled_for:
+                logger.warning(f"Skipping {name} scheduled for {scheduled_for:%Y-%m-%d %H:%M}, "
+                               f"{superseded_by} is due too")
+                continue
+            late = now - scheduled_for
+            if late > timedelta(minutes=1):
+                logger.warning(f"Catching up {name} scheduled for {scheduled_for:%Y-%m-%d %H:%M}")
+            try:
+                function()
+                logger.info(f"Scheduled job {name} ran for {scheduled_for:%Y-%m-%d %H:%M}")
+            except Exception as e:
+                logger.error(f"Scheduled job {name} failed: {str(e)}")
+
+    def _current_jobs(self):
+        return self.jobs() if callable(self.jobs) else self.jobs
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_pending()
+            except Exception as e:
+                logger.error(f"Scheduler error: {str(e)}")
+            self._stop.wait(self.tick)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name='scheduler', daemon=True)
+        self._thread.start()
+        logger.info("Scheduler started: " + ", ".join(
+            f"{name} '{schedule.expression}'" for name, schedule, *_ in self._current_jobs()))
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+
+def parse_holidays(value):
+    """Comma separated YYYY-MM-DD dates"""
+    holidays = set()
+    for item in (value or '').split(','):
+        item = item.strip()
+        if item:
+            holidays.add(datetime.strptime(item, '%Y-%m-%d').date())
+    return holidays
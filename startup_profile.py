@@ -0,0 +1,82 @@
+import importlib.abc
+import sys
+import time
+
+# Deliberately stdlib only: this module is installed before anything else
+# is imported so that it can time those imports.
+
+
+class _TimedLoader(importlib.abc.Loader):
+    def __init__(self, profiler, loader):
+        self._profiler = profiler
+        self._loader = loader
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._profiler._enter()
+        started = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profiler._leave(module.__name__, time.perf_counter() - started)
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+
+class ImportProfiler(importlib.abc.MetaPathFinder):
+    """Meta path finder that times the execution of every module imported after install()"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.cumulative = {}
+        self.self_time = {}
+        self._children = [0.0]
+        self._finding = set()
+
+    def install(self):
+        sys.meta_path.insert(0, self)
+        return self
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path=None, target=None):
+        if fullname in self._finding:
+            return None
+        self._finding.add(fullname)
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, 'find_spec'):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                        spec.loader = _TimedLoader(self, spec.loader)
+                    return spec
+            return None
+        finally:
+            self._finding.discard(fullname)
+
+    def _enter(self):
+        self._children.append(0.0)
+
+    def _leave(self, name, elapsed):
+        children = self._children.pop()
+        self.cumulative[name] = elapsed
+        self.self_time[name] = elapsed - children
+        self._children[-1] += elapsed
+
+    def report(self, top=20):
+        total = time.perf_counter() - self.started
+        lines = [f"Startup: {total * 1000:.0f} ms total, "
+                 f"{sum(self.self_time.values()) * 1000:.0f} ms importing "
+                 f"{len(self.cumulative)} modules",
+                 f"{'cumulative':>12} {'self':>10}  module"]
+        ranked = sorted(self.cumulative.items(), key=lambda item: item[1], reverse=True)
+        for name, elapsed in ranked[:top]:
+            lines.append(f"{elapsed * 1000:10.1f}ms {self.self_time[name] * 1000:8.1f}ms  {name}")
+        return '\n'.join(lines)
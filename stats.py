@@ -0,0 +1,135 @@
+import json
+from collections import Counter
+from datetime import datetime
+from loguru import logger
+
+# Lunch statistics of a chat, aggregated per month in one streaming pass
+# over the history. History keys are ISO timestamps and events are only
+# ever appended at the current time, so a month that has ended never
+# changes: its aggregate is stored in the chat's database and later
+# queries only read the history from the first month not yet stored.
+
+SKIP_OPTION = 'Nhịn'
+_CACHE_KEY = 'stats:months'
+
+
+def _new_period():
+    return {
+        'polls': 0,
+        'picks': {},    # food -> times selected
+        'voters': {},   # name -> polls voted in
+        'skips': {},    # name -> times voted SKIP_OPTION
+        'meals': 0,     # payments registered
+        'heads': 0,     # participants over all payments
+        'amount': 0.0,  # total paid
+    }
+
+
+def _bump(counter, key, by=1):
+    counter[key] = counter.get(key, 0) + by
+
+
+def add_record(periods, key, record):
+    """Fold one history record into `periods` (month -> aggregate)"""
+    month = key[:7]
+    try:
+        datetime.strptime(month, '%Y-%m')
+    except (TypeError, ValueError):
+        return
+    kind = record.get('type')
+    if kind not in ('food', 'payment'):
+        return
+    period = periods.setdefault(month, _new_period())
+    if kind == 'food':
+        period['polls'] += 1
+        if record.get('selected'):
+            _bump(period['picks'], record['selected'])
+        for option, names in (record.get('voters') or {}).items():
+            for name in names:
+                _bump(period['voters'], name.strip())
+                if option == SKIP_OPTION:
+                    _bump(period['skips'], name.strip())
+    else:
+        heads = record.get('total_participants') or len(record.get('participants') or [])
+        amount = record.get('amount') or 0
+        if heads and amount:
+            period['meals'] += 1
+            period['heads'] += heads
+            period['amount'] += amount
+
+
+def merge(periods):
+    """Sum several period aggregates into one"""
+    total = _new_period()
+    for period in periods:
+        for field in ('polls', 'meals', 'heads', 'amount'):
+            total[field] += period[field]
+        for field in ('picks', 'voters', 'skips'):
+            for name, count in period[field].items():
+                _bump(total[field], name, count)
+    return total
+
+
+def monthly_stats(chat, now=None):
+    """month -> aggregate for the whole history of `chat`.
+
+    Months before the current one come from the cache in the chat's
+    database; only the history from the first uncached month is read,
+    and months that have ended since are added to the cache.
+    """
+    current = (now or datetime.now()).strftime('%Y-%m')
+    cached = json.loads(chat.store.get_meta(_CACHE_KEY, '{}'))
+    watermark = cached.get('watermark')
+    months = cached.get('months', {})
+
+    fresh = {}
+    for key, record in chat.history.iter_records(since=watermark):
+        add_record(fresh, key, record)
+
+    ended = {month: period for month, period in fresh.items() if month < current}
+    if watermark is None or watermark < current:
+        months.update(ended)
+        chat.store.set_meta(_CACHE_KEY, json.dumps(
+            {'watermark': current, 'months': months}, ensure_ascii=False))
+        logger.info(f"Cached lunch stats of {len(ended)} month(s) for chat {chat.chat_id}")
+    result = dict(months)
+    result.update({month: period for month, period in fresh.items() if month >= current})
+    return result
+
+
+def summarize(period):
+    """Headline numbers of one aggregate"""
+    picks = Counter(period['picks']).most_common(1)
+    # Ranked by skip rate, then by number of skips
+    skippers = sorted(
+        ((count / period['voters'][name], count, name)
+         for name, count in period['skips'].items() if period['voters'].get(name)),
+        reverse=True)
+    return {
+        'polls': period['polls'],
+        'top_food': picks[0] if picks else None,
+        'top_skipper': (skippers[0][2], skippers[0][1], period['voters'][skippers[0][2]]) if skippers else None,
+        'meals': period['meals'],
+        'cost_per_head': period['amount'] / period['heads'] if period['heads'] else None,
+    }
+
+
+def format_report(months, month):
+    """Vietnamese report for `month` (YYYY-MM) and for all time"""
+    lines = []
+    for title, period in ((f"📊 Thống kê tháng {month}", months.get(month, _new_period())),
+                          ("📈 Từ trước đến nay", merge(months.values()))):
+        summary = summarize(period)
+        lines.append(f"{title} ({summary['polls']} poll, {summary['meals']} bữa):")
+        if summary['top_food']:
+            food, count = summary['top_food']
+            lines.append(f"🍜 Món được chọn nhiều nhất: {food} ({count} lần)")
+        else:
+            lines.append("🍜 Chưa có món nào được chọn")
+        if summary['top_skipper']:
+            name, skips, polls = summary['top_skipper']
+            lines.append(f"🙅 Hay nhịn nhất: {name} ({skips}/{polls} lần)")
+        if summary['cost_per_head'] is not None:
+            lines.append(f"💵 Trung bình mỗi người: {summary['cost_per_head']:,.0f}đ")
+        lines.append("")
+    return '\n'.join(lines).rstrip()
@@ -0,0 +1,385 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from loguru import logger
+from catalog import normalize
+from config import FOOD_FILE, ACTIVE_VOTE_FILE, COMPLETED_VOTE_FILE, WEEK_FOOD
+
+# SQLite store of one chat, shared by the cron process (main.py
+# --vote/--close-vote) and the polling daemon (main.py --run). WAL mode
+# lets readers run while one writer commits, and busy_timeout makes
+# concurrent writers wait for the lock instead of failing. Every chat has
+# its own database file, so groups never wait on each other's writes.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS foods (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE,
+    key TEXT
+);
+CREATE TABLE IF NOT EXISTS active_state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS poll_votes (
+    poll_id TEXT NOT NULL,
+    user_name TEXT NOT NULL,
+    option TEXT NOT NULL,
+    voted_at TEXT NOT NULL,
+    PRIMARY KEY (poll_id, user_name)
+);
+CREATE TABLE IF NOT EXISTS week_food (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    food TEXT NOT NULL,
+    selected_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS week_food_selected_at ON week_food(selected_at);
+CREATE TABLE IF NOT EXISTS users (
+    user_name TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    seen_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS schedule_runs (
+    job TEXT NOT NULL,
+    scheduled_for TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    PRIMARY KEY (job, scheduled_for)
+);
+"""
+
+SCHEDULE_RUNS_KEEP = timedelta(days=7)
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False)
+
+
+class ChatStore:
+    """Database of one chat. `history` is the chat's HistoryJournal, the
+    legacy JSON files are only imported when `legacy_import` is set (the
+    chat from CHAT_ID)."""
+
+    def __init__(self, path, history, legacy_import=False):
+        self.path = path
+        self.history = history
+        self.legacy_import = legacy_import
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def get_connection(self):
+        """Return the connection of the current thread, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            db_dir = os.path.dirname(self.path)
+            if db_dir:
+                os.makedirs(db_dir, exist_ok=True)
+            # isolation_level=None: transactions are opened explicitly below
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA busy_timeout=30000')
+            self._local.conn = conn
+            self._ensure_initialized(conn)
+        return conn
+
+    def _ensure_initialized(self, conn):
+        with self._init_lock:
+            if self._initialized:
+                return
+            conn.executescript(SCHEMA)
+            self._add_food_keys(conn)
+            if self.legacy_import:
+                self.import_json_files(conn)
+            self._initialized = True
+
+    @contextmanager
+    def transaction(self):
+        """Write transaction, takes the database write lock up front"""
+        conn = self.get_connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    @contextmanager
+    def snapshot(self):
+        """Read transaction, gives a consistent view across several queries"""
+        conn = self.get_connection()
+        conn.execute('BEGIN')
+        try:
+            yield conn
+        finally:
+            conn.execute('COMMIT')
+
+    # Settings
+
+    def get_meta(self, key, default=None):
+        row = self.get_connection().execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        with self.transaction() as conn:
+            conn.execute('INSERT OR REPLACE INTO meta(key, value) VALUES (?, ?)', (key, value))
+
+    # Food list
+
+    def load_foods(self):
+        conn = self.get_connection()
+        return [name for (name,) in conn.execute('SELECT name FROM foods ORDER BY id')]
+
+    def save_foods(self, foods):
+        with self.transaction() as conn:
+            _replace_foods(conn, foods)
+
+    def add_food(self, name):
+        """Insert one food, returns False if it exists under any spelling"""
+        with self.transaction() as conn:
+            cursor = conn.execute('INSERT OR IGNORE INTO foods(name, key) VALUES (?, ?)',
+                                  (name, normalize(name)))
+            return cursor.rowcount == 1
+
+    def remove_food(self, name):
+        """Delete one food by any spelling, returns False if it was not in the list"""
+        with self.transaction() as conn:
+            cursor = conn.execute('DELETE FROM foods WHERE key = ?', (normalize(name),))
+            return cursor.rowcount == 1
+
+    def _add_food_keys(self, conn):
+        """Give foods from before the catalog index their normalized key, once"""
+        columns = [row[1] for row in conn.execute('PRAGMA table_info(foods)')]
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if 'key' not in columns:
+                conn.execute('ALTER TABLE foods ADD COLUMN key TEXT')
+            rows = conn.execute('SELECT id, name FROM foods WHERE key IS NULL ORDER BY id').fetchall()
+            seen = set()
+            if rows:
+                seen = {key for (key,) in conn.execute('SELECT key FROM foods WHERE key IS NOT NULL')}
+            for food_id, name in rows:
+                key = normalize(name)
+                if key in seen:
+                    # Same food spelled differently, the oldest spelling wins
+                    conn.execute('DELETE FROM foods WHERE id = ?', (food_id,))
+                    logger.warning(f"Removed duplicate food {name!r} from {self.path}")
+                    continue
+                seen.add(key)
+                conn.execute('UPDATE foods SET key = ? WHERE id = ?', (key, food_id))
+            conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS foods_key ON foods(key)')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    # Active vote state
+
+    def load_active_state(self, with_votes=True):
+        with self.snapshot() as conn:
+            state = {key: json.loads(value)
+                     for key, value in conn.execute('SELECT key, value FROM active_state')}
+            poll = state.get('food_poll')
+            if poll is not None and with_votes:
+                poll['votes'] = dict(conn.execute(
+                    'SELECT user_name, option FROM poll_votes WHERE poll_id = ? ORDER BY voted_at',
+                    (poll['poll_id'],)
+                ))
+        return state
+
+    def get_active(self, key):
+        """Read a single key of the active state without loading the votes"""
+        row = self.get_connection().execute(
+            'SELECT value FROM active_state WHERE key = ?', (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_active_state(self, state):
+        with self.transaction() as conn:
+            _replace_active_state(conn, state)
+
+    def upsert_vote(self, poll_id, user_name, option, user_id=None):
+        now = datetime.now().isoformat()
+        with self.transaction() as conn:
+            conn.execute(
+                'INSERT INTO poll_votes(poll_id, user_name, option, voted_at) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT(poll_id, user_name) DO UPDATE SET '
+                'option = excluded.option, voted_at = excluded.voted_at',
+                (poll_id, user_name, option, now)
+            )
+            if user_id is not None:
+                _remember_user(conn, user_name, user_id, now)
+
+    def delete_vote(self, poll_id, user_name):
+        with self.transaction() as conn:
+            conn.execute('DELETE FROM poll_votes WHERE poll_id = ? AND user_name = ?',
+                         (poll_id, user_name))
+
+    # Telegram user ids, records only keep display names
+
+    def remember_user(self, user_name, user_id):
+        with self.transaction() as conn:
+            _remember_user(conn, user_name, user_id, datetime.now().isoformat())
+
+    def user_ids(self, names):
+        """name -> Telegram user id for the names seen in this chat"""
+        names = list(names)
+        if not names:
+            return {}
+        placeholders = ','.join('?' * len(names))
+        return dict(self.get_connection().execute(
+            f'SELECT user_name, user_id FROM users WHERE user_name IN ({placeholders})', names))
+
+    def load_votes(self, poll_id):
+        return dict(self.get_connection().execute(
+            'SELECT user_name, option FROM poll_votes WHERE poll_id = ? ORDER BY voted_at', (poll_id,)))
+
+    # Recent foods
+
+    def load_recent_foods(self, since):
+        """(food, selected_at) picked at or after `since`, oldest first"""
+        rows = self.get_connection().execute(
+            'SELECT food, selected_at FROM week_food WHERE selected_at >= ? ORDER BY selected_at',
+            (since.isoformat(),)
+        )
+        entries = []
+        for food, selected_at in rows:
+            try:
+                entries.append((food, datetime.fromisoformat(selected_at)))
+            except (ValueError, TypeError):
+                logger.error(f"Invalid timestamp format: {selected_at}")
+        return entries
+
+    def add_recent_food(self, food, selected_at, expire_before):
+        """Insert one pick and drop the rows that fell out of the window"""
+        with self.transaction() as conn:
+            conn.execute('INSERT INTO week_food(food, selected_at) VALUES (?, ?)',
+                         (food, selected_at.isoformat()))
+            conn.execute('DELETE FROM week_food WHERE selected_at < ?', (expire_before.isoformat(),))
+
+    # Scheduler
+
+    def claim_schedule_run(self, job, scheduled_for):
+        """Record that a scheduled run started, False if some process already claimed it"""
+        now = datetime.now()
+        with self.transaction() as conn:
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO schedule_runs(job, scheduled_for, started_at) VALUES (?, ?, ?)',
+                (job, scheduled_for.isoformat(), now.isoformat())
+            )
+            # Runs this old are far outside any catch-up window, their claims are never checked again
+            conn.execute('DELETE FROM schedule_runs WHERE scheduled_for < ?',
+                         ((now - SCHEDULE_RUNS_KEEP).isoformat(),))
+            return cursor.rowcount == 1
+
+    # One-time import of the legacy JSON files
+
+    def import_json_files(self, conn=None, force=False):
+        """Copy data/*.json into the database once, returns True if it ran"""
+        conn = conn or self.get_connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            done = conn.execute("SELECT 1 FROM meta WHERE key = 'json_imported'").fetchone()
+            if done and not force:
+                conn.execute('COMMIT')
+                return False
+
+            food_data = _read_json(FOOD_FILE)
+            if food_data:
+                _replace_foods(conn, food_data.get('foods', []))
+            active_votes = _read_json(ACTIVE_VOTE_FILE)
+            if active_votes is not None:
+                _replace_active_state(conn, active_votes)
+            completed_votes = _read_json(COMPLETED_VOTE_FILE)
+            if completed_votes and not done:
+                # The history journal is append-only, neither a forced re-import nor a
+                # rerun after a rollback may duplicate it
+                self.history.append_missing(sorted(completed_votes.items()))
+            week_food = _read_json(WEEK_FOOD)
+            if week_food:
+                _replace_week_food(conn, week_food)
+
+            conn.execute(
+                "INSERT OR REPLACE INTO meta(key, value) VALUES ('json_imported', ?)",
+                (datetime.now().isoformat(),)
+            )
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+        logger.info(
+            f"Imported JSON data into {self.path}: "
+            f"{len((food_data or {}).get('foods', []))} foods, "
+            f"{len(completed_votes or {})} completed votes"
+        )
+        return True
+
+
+def _replace_foods(conn, foods):
+    conn.execute('CREATE TEMP TABLE IF NOT EXISTS keep_foods (name TEXT PRIMARY KEY)')
+    conn.execute('DELETE FROM keep_foods')
+    conn.executemany('INSERT OR IGNORE INTO keep_foods(name) VALUES (?)', [(f,) for f in foods])
+    conn.execute('DELETE FROM foods WHERE name NOT IN (SELECT name FROM keep_foods)')
+    conn.executemany('INSERT OR IGNORE INTO foods(name, key) VALUES (?, ?)',
+                     [(f, normalize(f)) for f in foods])
+
+
+def _replace_active_state(conn, state):
+    keys = list(state)
+    placeholders = ','.join('?' * len(keys))
+    conn.execute(f'DELETE FROM active_state WHERE key NOT IN ({placeholders})', keys)
+    for key, value in state.items():
+        if key == 'food_poll':
+            # Votes live in their own table so that every answer is a one row upsert
+            value = {k: v for k, v in value.items() if k != 'votes'}
+        conn.execute(
+            'INSERT INTO active_state(key, value) VALUES (?, ?) '
+            'ON CONFLICT(key) DO UPDATE SET value = excluded.value',
+            (key, _dumps(value))
+        )
+    poll = state.get('food_poll')
+    if poll is None:
+        conn.execute('DELETE FROM poll_votes')
+        return
+    now = datetime.now().isoformat()
+    # Never overwrite rows here: a vote upserted by another process after
+    # `state` was loaded must survive this save
+    conn.executemany(
+        'INSERT OR IGNORE INTO poll_votes(poll_id, user_name, option, voted_at) VALUES (?, ?, ?, ?)',
+        [(poll['poll_id'], user, option, now) for user, option in poll.get('votes', {}).items()]
+    )
+    conn.execute('DELETE FROM poll_votes WHERE poll_id != ?', (poll['poll_id'],))
+
+
+def _replace_week_food(conn, week_food):
+    conn.execute('DELETE FROM week_food')
+    conn.executemany(
+        'INSERT INTO week_food(food, selected_at) VALUES (?, ?)',
+        list(zip(week_food['selected_foods'], week_food['timestamps']))
+    )
+
+
+def _remember_user(conn, user_name, user_id, seen_at):
+    conn.execute(
+        'INSERT INTO users(user_name, user_id, seen_at) VALUES (?, ?, ?) '
+        'ON CONFLICT(user_name) DO UPDATE SET user_id = excluded.user_id, seen_at = excluded.seen_at',
+        (user_name, str(user_id), seen_at)
+    )
+
+
+def _read_json(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except json.JSONDecodeError as e:
+        logger.error(f"Skipping unreadable {path}: {e}")
+        return None
@@ -0,0 +1,76 @@
+import time
+from loguru import logger
+from outbound import retry_after
+
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+
+class StreamingReply:
+    """Reply that grows while the answer is generated.
+
+    A placeholder is sent first, then edited with the text received so
+    far at most once every `interval` seconds. Text past Telegram's
+    message limit rolls over into a new reply.
+    """
+
+    def __init__(self, bot, message, interval=1.0, placeholder="⏳ Đang suy nghĩ...",
+                 limit=TELEGRAM_MESSAGE_LIMIT):
+        self.bot = bot
+        self.message = message
+        self.interval = interval
+        self.placeholder = placeholder
+        self.limit = limit
+        self.sent_messages = []
+        self._text = ''
+        self._shown = None
+        self._last_edit = 0.0
+
+    def start(self):
+        self._new_message()
+        return self
+
+    def feed(self, chunk):
+        self._text += chunk
+        while len(self._text) > self.limit:
+            head, self._text = self._split(self._text)
+            self._edit(head, attempts=3)
+            self._new_message()
+        if time.monotonic() - self._last_edit >= self.interval:
+            self._edit(self._text)
+
+    def finish(self, empty_text="🤷 Không có phản hồi."):
+        self._edit(self._text or empty_text, attempts=3)
+
+    def fail(self, error_text):
+        partial = self._text[:self.limit - len(error_text) - 2]
+        self._edit(f"{partial}\n\n{error_text}" if partial else error_text, attempts=3)
+
+    def _split(self, text):
+        # Prefer breaking at a newline in the second half of the message
+        cut = text.rfind('\n', self.limit // 2, self.limit)
+        if cut == -1:
+            cut = self.limit
+        return text[:cut], text[cut:].lstrip('\n')
+
+    def _new_message(self):
+        sent = self.bot.reply_to(self.message, self.placeholder)
+        self.sent_messages.append(sent)
+        self._shown = self.placeholder
+        self._last_edit = 0.0  # first chunk of a new message is shown at once
+
+    def _edit(self, text, attempts=1):
+        self._last_edit = time.monotonic()
+        if not text or text == self._shown:
+            return
+        current = self.sent_messages[-1]
+        for attempt in range(attempts):
+            try:
+                self.bot.edit_message_text(text, current.chat.id, current.message_id)
+                self._shown = text
+                return
+            except Exception as e:
+                # Intermediate edits may be dropped, the next one carries the full text
+                logger.warning(f"Could not update streaming reply: {str(e)}")
+                if attempt + 1 < attempts:
+                    time.sleep(retry_after(e) or 1)
+
@@ -0,0 +1,75 @@
+import threading
+
+
+class PollTally:
+    """Live option -> voters index of one poll, updated one answer at a time"""
+
+    def __init__(self, poll_id, options):
+        self.poll_id = poll_id
+        self.options = list(options)
+        # dicts instead of sets keep voters in the order they voted
+        self.voters = {option: {} for option in self.options}
+        self.choices = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_votes(cls, poll_id, options, votes):
+        tally = cls(poll_id, options)
+        for user_name, option in votes.items():
+            tally.vote(user_name, option)
+        return tally
+
+    def vote(self, user_name, option):
+        """Record a (re)vote, returns the option the user had before"""
+        with self._lock:
+            previous = self.choices.get(user_name)
+            if previous == option:
+                return previous
+            if previous is not None:
+                self.voters[previous].pop(user_name, None)
+            self.voters.setdefault(option, {})[user_name] = None
+            self.choices[user_name] = option
+            return previous
+
+    def retract(self, user_name):
+        """Remove the vote of a user, returns the retracted option or None"""
+        with self._lock:
+            previous = self.choices.pop(user_name, None)
+            if previous is not None:
+                self.voters[previous].pop(user_name, None)
+            return previous
+
+    def counts(self):
+        """Options with at least one vote, in poll order"""
+        with self._lock:
+            return {option: len(users) for option, users in self.voters.items() if users}
+
+    def voter_lists(self):
+        with self._lock:
+            return {option: list(users) for option, users in self.voters.items() if users}
+
+    @property
+    def total(self):
+        return len(self.choices)
+
+
+_tallies = {}  # chat_id -> PollTally of the chat's current poll
+_lock = threading.Lock()
+
+
+def get_tally(chat_id, poll_data, load_votes):
+    """Return the cached tally of a chat's poll, built once from load_votes() on a miss.
+    A tally of an earlier poll of the chat (one never closed through this
+    process, e.g. after a restart or a manual stop) is replaced."""
+    chat_id = str(chat_id)
+    with _lock:
+        tally = _tallies.get(chat_id)
+        if tally is None or tally.poll_id != poll_data['poll_id']:
+            tally = PollTally.from_votes(poll_data['poll_id'], poll_data['options'], load_votes())
+            _tallies[chat_id] = tally
+        return tally
+
+
+def discard_tally(chat_id):
+    with _lock:
+        _tallies.pop(str(chat_id), None)
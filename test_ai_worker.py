@@ -0,0 +1,75 @@
+"""
+Unit tests for the bounded /ai worker pool
+Tests the global and per-chat limits and releasing slots when jobs finish.
+"""
+
+import threading
+import pytest
+from ai_worker import BoundedExecutor
+
+
+@pytest.fixture
+def executor():
+    executor = BoundedExecutor(max_workers=1, max_queue=1, per_key_limit=2, name='test')
+    yield executor
+    executor.shutdown()
+
+
+def finished(future):
+    """Wait until the executor's own done callback has released the slot"""
+    done = threading.Event()
+    # Callbacks run in the order they were added, after the executor's
+    future.add_done_callback(lambda _: done.set())
+    assert done.wait(timeout=5)
+    return future
+
+
+def blocked_job():
+    release = threading.Event()
+    return release, lambda: release.wait(timeout=5)
+
+
+class TestBoundedExecutor:
+
+    def test_rejects_when_pool_and_queue_are_full(self, executor):
+        release, job = blocked_job()
+
+        assert executor.submit('-100', job) is not None
+        assert executor.submit('-200', job) is not None
+        assert executor.submit('-300', job) is None
+
+        release.set()
+
+    def test_rejects_past_the_per_chat_limit(self):
+        executor = BoundedExecutor(max_workers=4, max_queue=4, per_key_limit=1, name='test')
+        release, job = blocked_job()
+
+        assert executor.submit('-100', job) is not None
+        assert executor.submit('-100', job) is None
+        assert executor.submit('-200', job) is not None
+
+        release.set()
+        executor.shutdown()
+
+    def test_finished_jobs_free_their_slots(self, executor):
+        finished(executor.submit('-100', lambda: 'done'))
+        finished(executor.submit('-100', lambda: 'done'))
+
+        assert executor.stats() == {'pending': 0, 'capacity': 2, 'per_key': {}}
+        assert executor.submit('-100', lambda: 'again').result(timeout=5) == 'again'
+
+    def test_failing_job_frees_its_slot(self, executor):
+        def broken():
+            raise RuntimeError("boom")
+
+        future = finished(executor.submit('-100', broken))
+
+        with pytest.raises(RuntimeError):
+            future.result()
+        assert executor.stats()['pending'] == 0
+
+    def test_submit_after_shutdown_is_rejected(self, executor):
+        executor.shutdown()
+
+        assert executor.submit('-100', lambda: None) is None
+        assert executor.stats()['pending'] == 0
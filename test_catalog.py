@@ -0,0 +1,52 @@
+"""
+Unit tests for the food catalog
+Tests accent-insensitive keys, prefix lookups and trigram matching.
+"""
+
+from catalog import FoodCatalog, normalize
+
+
+class TestNormalize:
+
+    def test_strips_accents_case_and_spacing(self):
+        assert normalize("Phở  Bò") == "pho bo"
+        assert normalize("Bún đậu") == "bun dau"
+
+
+class TestFoodCatalog:
+
+    def test_add_is_accent_insensitive(self):
+        catalog = FoodCatalog(["Phở bò"])
+
+        assert catalog.add("pho bo") is False
+        assert catalog.get("PHO BO") == "Phở bò"
+        assert len(catalog) == 1
+
+    def test_remove_by_any_spelling(self):
+        catalog = FoodCatalog(["Phở bò", "Bún chả"])
+
+        assert catalog.remove("pho bo") == "Phở bò"
+        assert "Phở bò" not in catalog
+        assert catalog.fuzzy("pho bo") == []
+
+    def test_prefix_in_key_order(self):
+        catalog = FoodCatalog(["Phở gà", "Bún chả", "Phở bò"])
+
+        assert catalog.prefix("pho") == ["Phở bò", "Phở gà"]
+
+    def test_fuzzy_tolerates_typos(self):
+        catalog = FoodCatalog(["Bún chả", "Bánh mì", "Cơm tấm"])
+
+        assert catalog.fuzzy("bun cha")[0] == "Bún chả"
+        assert catalog.fuzzy("com tam")[0] == "Cơm tấm"
+        assert catalog.fuzzy("xyz") == []
+
+    def test_search_puts_prefix_matches_first(self):
+        catalog = FoodCatalog(["Cơm gà", "Gà rán", "Gà luộc"])
+
+        assert catalog.search("ga")[:2] == ["Gà luộc", "Gà rán"]
+
+    def test_pages_split_by_size(self):
+        catalog = FoodCatalog(["A", "B", "C"])
+
+        assert catalog.pages(page_size=2, max_chars=1000) == [["A", "B"], ["C"]]
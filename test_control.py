@@ -0,0 +1,87 @@
+"""
+Unit tests for the control socket
+Tests running commands in the daemon, argument validation and socket ownership.
+"""
+
+import os
+import stat
+import threading
+import pytest
+from control import ControlServer, send_command
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    ran = []
+    done = threading.Event()
+
+    def vote(chat_id=None):
+        ran.append(('vote', chat_id))
+        done.set()
+
+    path = str(tmp_path / 'control.sock')
+    server = ControlServer(path, {'vote': vote}, chat_ids=[-100, '-200']).start()
+    yield path, ran, done
+    server.shutdown()
+    server.server_close()
+
+
+class TestControlServer:
+
+    def test_ping_answers_with_the_daemon_pid(self, daemon):
+        path, _, _ = daemon
+
+        assert send_command(path, 'ping') == {'ok': True, 'pid': os.getpid()}
+
+    def test_command_runs_in_the_daemon(self, daemon):
+        path, ran, done = daemon
+
+        assert send_command(path, 'vote', args={'chat_id': '-100'}) == {'ok': True, 'accepted': 'vote'}
+        assert done.wait(timeout=5)
+        assert ran == [('vote', '-100')]
+
+    def test_unknown_chat_is_refused(self, daemon):
+        path, ran, _ = daemon
+
+        response = send_command(path, 'vote', args={'chat_id': '-300'})
+
+        assert response == {'ok': False, 'error': 'unknown chat -300'}
+        assert ran == []
+
+    def test_other_arguments_are_refused(self, daemon):
+        path, ran, _ = daemon
+
+        assert send_command(path, 'vote', args={'chat_id': '-100', 'force': True}) == \
+            {'ok': False, 'error': 'bad request'}
+        assert ran == []
+
+    def test_unknown_command(self, daemon):
+        path, _, _ = daemon
+
+        assert send_command(path, 'stats') == {'ok': False, 'error': 'unknown command stats'}
+
+    def test_socket_is_owner_only(self, daemon):
+        path, _, _ = daemon
+
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+    def test_live_socket_is_not_taken_over(self, daemon):
+        path, _, _ = daemon
+
+        with pytest.raises(RuntimeError):
+            ControlServer(path, {})
+
+    def test_stale_socket_file_is_replaced(self, tmp_path):
+        path = str(tmp_path / 'control.sock')
+        ControlServer(path, {}).socket.close()  # daemon died without cleaning up
+
+        server = ControlServer(path, {}).start()
+        try:
+            assert send_command(path, 'ping')['ok']
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_no_daemon_raises_oserror(self, tmp_path):
+        with pytest.raises(OSError):
+            send_command(str(tmp_path / 'control.sock'), 'ping')
@@ -0,0 +1,118 @@
+"""
+Unit tests for the completed votes journal
+Tests appends, compaction into the snapshot and recovery from interrupted writes.
+"""
+
+import json
+import pytest
+from history import HistoryJournal
+
+
+@pytest.fixture
+def history(tmp_path):
+    return HistoryJournal(str(tmp_path / 'history.jsonl'), str(tmp_path / 'history_snapshot.jsonl'),
+                          compact_bytes=1024 * 1024)
+
+
+def snapshot_keys(history):
+    with open(history.snapshot, 'rb') as f:
+        return [json.loads(line)['key'] for line in f]
+
+
+class TestAppend:
+
+    def test_records_are_read_back_in_order(self, history):
+        history.append('2025-01-02', {'n': 2})
+        history.append('2025-01-01', {'n': 1})
+
+        assert list(history.iter_records()) == [('2025-01-02', {'n': 2}), ('2025-01-01', {'n': 1})]
+        assert history.get('2025-01-01') == {'n': 1}
+        assert history.latest() == ('2025-01-02', {'n': 2})
+
+    def test_partial_tail_of_crashed_append_is_ignored(self, history):
+        history.append('2025-01-01', {'n': 1})
+        with open(history.journal, 'ab') as f:
+            f.write(b'{"key": "2025-01-02", "rec')
+
+        assert list(history.iter_records()) == [('2025-01-01', {'n': 1})]
+
+    def test_append_after_crashed_append_is_read_back(self, history):
+        history.append('2025-01-01', {'n': 1})
+        with open(history.journal, 'ab') as f:
+            f.write(b'{"key": "2025-01-02", "rec')
+
+        history.append('2025-01-03', {'n': 3})
+
+        assert list(history.iter_records()) == [('2025-01-01', {'n': 1}), ('2025-01-03', {'n': 3})]
+
+    def test_append_after_crash_on_first_line(self, history):
+        with open(history.journal, 'wb') as f:
+            f.write(b'{"key": "2025-01-01"')
+
+        history.append('2025-01-02', {'n': 2})
+
+        assert list(history.iter_records()) == [('2025-01-02', {'n': 2})]
+
+    def test_append_missing_skips_known_keys(self, history):
+        history.append('2025-01-01', {'n': 1})
+        history.compact()
+        history.append('2025-01-02', {'n': 2})
+
+        appended = history.append_missing([('2025-01-01', {'n': 1}), ('2025-01-02', {'n': 2}),
+                                           ('2025-01-03', {'n': 3})])
+
+        assert appended == 1
+        assert [key for key, _ in history.iter_records()] == ['2025-01-01', '2025-01-02', '2025-01-03']
+
+
+class TestCompact:
+
+    def test_merges_journal_into_sorted_snapshot(self, history, tmp_path):
+        history.append('2025-01-03', {'n': 3})
+        history.append('2025-01-01', {'n': 1})
+
+        assert history.compact() == 2
+
+        assert snapshot_keys(history) == ['2025-01-01', '2025-01-03']
+        assert not (tmp_path / 'history.jsonl.compacting').exists()
+        assert history.get('2025-01-03') == {'n': 3}
+
+    def test_later_event_replaces_earlier_record(self, history):
+        history.append('2025-01-01', {'n': 1})
+        history.compact()
+        history.append('2025-01-01', {'n': 'updated'})
+
+        history.compact()
+
+        assert list(history.iter_records()) == [('2025-01-01', {'n': 'updated'})]
+
+    def test_index_points_at_snapshot_lines(self, history):
+        for day in range(1, 6):
+            history.append(f'2025-01-0{day}', {'n': day})
+        history.compact()
+
+        assert [key for key, _ in history.iter_records(since='2025-01-04')] == ['2025-01-04', '2025-01-05']
+        assert history.get('2025-01-02') == {'n': 2}
+
+    def test_empty_journal_is_a_no_op(self, history):
+        assert history.compact() is None
+
+    def test_leftover_compacting_file_is_merged_first(self, history, tmp_path):
+        history.append('2025-01-01', {'n': 1})
+        # A compaction that crashed after moving the journal aside
+        (tmp_path / 'history.jsonl').rename(tmp_path / 'history.jsonl.compacting')
+        history.append('2025-01-02', {'n': 2})
+        # The append sees the leftover file and merges it in the background
+        history._compact_thread.join(timeout=5)
+
+        assert snapshot_keys(history) == ['2025-01-01']
+        assert [key for key, _ in history.iter_records()] == ['2025-01-01', '2025-01-02']
+        history.compact()
+        assert snapshot_keys(history) == ['2025-01-01', '2025-01-02']
+
+    def test_background_compaction_starts_past_threshold(self, history):
+        history.compact_bytes = 1
+        history.append('2025-01-01', {'n': 1})
+        history._compact_thread.join(timeout=5)
+
+        assert snapshot_keys(history) == ['2025-01-01']
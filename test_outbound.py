@@ -0,0 +1,134 @@
+"""
+Unit tests for the outbound Telegram queue
+Tests per-chat ordering, the token buckets and dropping calls a caller gave up on.
+"""
+
+import time
+import pytest
+from concurrent.futures import TimeoutError as FutureTimeout
+from unittest.mock import Mock
+from outbound import OutboundQueue, TokenBucket
+
+
+def throttled(seconds):
+    error = Exception("Too Many Requests")
+    error.error_code = 429
+    error.result_json = {'parameters': {'retry_after': seconds}}
+    return error
+
+
+def queue(bot, chat_rate=100, chat_burst=100):
+    return OutboundQueue(bot, global_rate=100, chat_rate=chat_rate, chat_burst=chat_burst)
+
+
+class TestTokenBucket:
+
+    def test_burst_then_rate(self):
+        bucket = TokenBucket(rate=2, capacity=2)
+        bucket.updated = 0.0
+
+        bucket.consume(0.0)
+        bucket.consume(0.0)
+
+        assert bucket.delay(0.0) == 0.5
+        assert bucket.delay(0.5) == 0.0
+
+
+class TestOutboundQueue:
+
+    def test_calls_to_a_chat_keep_their_order(self):
+        bot = Mock()
+        outbox = queue(bot)
+
+        for i in range(5):
+            outbox.send_message(-100, f"message {i}")
+        assert outbox.flush(timeout=2)
+
+        assert [c.args[1] for c in bot.send_message.call_args_list] == [f"message {i}" for i in range(5)]
+
+    def test_int_and_str_chat_ids_share_queue_and_bucket(self):
+        bot = Mock()
+        outbox = queue(bot, chat_rate=1 / 60, chat_burst=1)
+
+        first = outbox.send_message('-100', "from CHAT_IDS")
+        second = outbox.reply_to(Mock(chat=Mock(id=-100)), "reply")
+        first.result(timeout=2)
+
+        assert not outbox.flush(timeout=0.2)
+        assert not second.done()
+        assert list(outbox._buckets) == [('-100', 'messages')]
+        bot.reply_to.assert_not_called()
+
+    def test_result_is_returned_through_the_future(self):
+        bot = Mock()
+        bot.send_poll.return_value = "poll message"
+        outbox = queue(bot)
+
+        assert outbox.blocking.send_poll('-100', "question", ["a", "b"]) == "poll message"
+
+    def test_429_is_retried_after_retry_after(self):
+        bot = Mock()
+        bot.send_message.side_effect = [throttled(0.1), "sent"]
+        outbox = queue(bot)
+
+        started = time.monotonic()
+        assert outbox.send_message('-100', "hi").result(timeout=2) == "sent"
+
+        assert time.monotonic() - started >= 0.1
+        assert bot.send_message.call_count == 2
+
+    def test_api_error_fails_the_future(self):
+        bot = Mock()
+        error = Exception("Bad Request: chat not found")
+        error.error_code = 400
+        bot.send_message.side_effect = error
+        outbox = queue(bot)
+
+        with pytest.raises(Exception, match="chat not found"):
+            outbox.send_message('-100', "hi").result(timeout=2)
+        assert bot.send_message.call_count == 1
+
+    def test_blocking_timeout_drops_the_queued_call(self):
+        bot = Mock()
+        outbox = queue(bot, chat_rate=1 / 60, chat_burst=1)
+        outbox.blocking._timeout = 0.1
+        outbox.send_message('-100', "uses the only token")
+
+        with pytest.raises(FutureTimeout):
+            outbox.blocking.send_poll('-100', "question", ["a", "b"])
+
+        assert outbox.flush(timeout=1)
+        bot.send_poll.assert_not_called()
+
+    def test_sent_call_cannot_be_cancelled(self):
+        bot = Mock()
+        outbox = queue(bot)
+        future = outbox.send_message('-100', "hi")
+        future.result(timeout=2)
+
+        assert outbox.cancel(future) is False
+
+    def test_callback_answer_skips_the_chat_bucket(self):
+        bot = Mock()
+        outbox = queue(bot, chat_rate=1 / 60, chat_burst=1)
+        call = Mock(id="cb1", message=Mock(chat=Mock(id=-100)))
+        outbox.send_message(-100, "uses the only token")
+        waiting = outbox.send_message(-100, "waits a minute")
+
+        outbox.answer_callback_query(call).result(timeout=2)
+
+        bot.answer_callback_query.assert_called_once_with("cb1")
+        assert not waiting.done()
+        assert ('-100', 'callbacks') not in outbox._buckets
+
+    def test_edits_do_not_use_the_message_budget(self):
+        bot = Mock()
+        outbox = OutboundQueue(bot, global_rate=100, chat_rate=100, chat_burst=100,
+                               edit_rate=1 / 60, edit_burst=2)
+        for i in range(3):
+            outbox.edit_message_text(f"partial {i}", -100, 1)
+
+        outbox.send_poll(-100, "question", ["a", "b"]).result(timeout=2)
+
+        assert bot.edit_message_text.call_count == 2
+        assert not outbox.flush(timeout=0.2)
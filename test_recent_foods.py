@@ -0,0 +1,55 @@
+"""
+Unit tests for the recent-food window
+Tests membership counting, expiry at the window edge and out-of-order entries.
+"""
+
+from datetime import datetime, timedelta
+from recent_foods import RecentFoodWindow
+
+MONDAY = datetime(2025, 1, 6, 12, 16)
+
+
+class TestRecentFoodWindow:
+
+    def test_membership_counts_repeated_picks(self):
+        window = RecentFoodWindow(7, [("Phở bò", MONDAY), ("Phở bò", MONDAY + timedelta(days=1))])
+
+        assert "Phở bò" in window
+        assert "Bún chả" not in window
+        assert len(window) == 2
+
+    def test_expire_pops_only_entries_older_than_the_window(self):
+        window = RecentFoodWindow(7, [
+            ("Phở bò", MONDAY),
+            ("Bún chả", MONDAY + timedelta(days=1)),
+            ("Cơm tấm", MONDAY + timedelta(days=2)),
+        ])
+
+        expired = window.expire(now=MONDAY + timedelta(days=8, minutes=1))
+
+        assert expired == ["Phở bò", "Bún chả"]
+        assert window.foods() == ["Cơm tấm"]
+        assert "Phở bò" not in window
+
+    def test_entry_exactly_at_the_cutoff_stays(self):
+        window = RecentFoodWindow(7, [("Phở bò", MONDAY)])
+
+        assert window.expire(now=MONDAY + timedelta(days=7)) == []
+        assert "Phở bò" in window
+
+    def test_food_stays_while_a_later_pick_is_in_the_window(self):
+        window = RecentFoodWindow(7, [("Phở bò", MONDAY), ("Phở bò", MONDAY + timedelta(days=3))])
+
+        window.expire(now=MONDAY + timedelta(days=8))
+
+        assert "Phở bò" in window
+        assert len(window) == 1
+
+    def test_out_of_order_entry_keeps_expiry_sorted(self):
+        window = RecentFoodWindow(7, [("Bún chả", MONDAY + timedelta(days=2))])
+
+        window.add("Phở bò", MONDAY)
+
+        assert window.foods() == ["Phở bò", "Bún chả"]
+        assert window.expire(now=MONDAY + timedelta(days=8)) == ["Phở bò"]
+        assert "Bún chả" in window
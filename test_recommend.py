@@ -0,0 +1,88 @@
+"""
+Unit tests for the food recommendation scores
+Tests popularity and win rate, the recency decay and weighted sampling.
+"""
+
+import random
+import pytest
+from datetime import datetime, timedelta
+from recommend import FoodScores, PRIOR, weighted_sample
+
+NOW = datetime.now().replace(microsecond=0)
+
+
+def poll(days_ago, options, vote_counts, selected):
+    key = (NOW - timedelta(days=days_ago)).isoformat()
+    return key, {'type': 'food', 'poll_options': options + ['Nhịn'], 'vote_counts': vote_counts,
+                 'selected': selected}
+
+
+class TestFoodScores:
+
+    def test_unknown_food_scores_the_prior(self):
+        assert FoodScores(60).score("Phở bò") == pytest.approx(2 * PRIOR)
+
+    def test_winning_food_outscores_the_loser(self):
+        scores = FoodScores.from_history([
+            poll(1, ["Phở bò", "Bún chả"], {"Phở bò": 5, "Bún chả": 1}, "Phở bò"),
+            poll(2, ["Phở bò", "Bún chả"], {"Phở bò": 4, "Bún chả": 2}, "Phở bò"),
+        ], half_life_days=60)
+
+        assert scores.score("Phở bò") > 2 * PRIOR > scores.score("Bún chả")
+
+    def test_recent_polls_weigh_more_than_old_ones(self):
+        scores = FoodScores.from_history([
+            poll(300, ["Phở bò", "Bún chả"], {"Phở bò": 6}, "Phở bò"),
+            poll(1, ["Phở bò", "Bún chả"], {"Bún chả": 6}, "Bún chả"),
+        ], half_life_days=30)
+
+        assert scores.score("Bún chả") > scores.score("Phở bò")
+
+    def test_old_history_decays_toward_the_prior(self):
+        history = [poll(0, ["Phở bò"], {"Phở bò": 5}, "Phở bò")]
+        recent = FoodScores.from_history(history, half_life_days=30)
+        history = [poll(600, ["Phở bò"], {"Phở bò": 5}, "Phở bò")]
+        old = FoodScores.from_history(history, half_life_days=30)
+
+        assert recent.score("Phở bò") > old.score("Phở bò") > 2 * PRIOR
+        assert old.score("Phở bò") == pytest.approx(2 * PRIOR, rel=1e-3)
+
+    def test_anchor_is_rebased_without_overflow(self):
+        scores = FoodScores.from_history([
+            poll(3000, ["Phở bò"], {"Phở bò": 1}, "Phở bò"),
+            poll(0, ["Bún chả"], {"Bún chả": 1}, "Bún chả"),
+        ], half_life_days=1)
+
+        assert scores.score("Bún chả") > scores.score("Phở bò")
+
+    def test_records_other_than_food_polls_are_ignored(self):
+        scores = FoodScores.from_history([
+            (NOW.isoformat(), {'type': 'payment', 'amount': 100000}),
+            ('not a date', {'type': 'food', 'poll_options': ["Phở bò"], 'selected': "Phở bò"}),
+        ], half_life_days=60)
+
+        assert scores.score("Phở bò") == pytest.approx(2 * PRIOR)
+
+
+class TestWeightedSample:
+
+    def test_returns_k_distinct_items(self):
+        items = [f"food {i}" for i in range(20)]
+
+        sample = weighted_sample(items, [1.0] * 20, 8)
+
+        assert len(sample) == len(set(sample)) == 8
+        assert set(sample) <= set(items)
+
+    def test_short_list_is_returned_whole(self):
+        assert weighted_sample(["a", "b"], [1.0, 1.0], 8) == ["a", "b"]
+
+    def test_heavier_items_are_picked_more_often(self):
+        random.seed(1)
+        picks = {"heavy": 0, "light": 0}
+
+        for _ in range(2000):
+            for item in weighted_sample(["heavy", "light", "a", "b"], [8.0, 0.5, 1.0, 1.0], 1):
+                picks[item] = picks.get(item, 0) + 1
+
+        assert picks["heavy"] > 4 * picks["light"]
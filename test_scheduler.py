@@ -0,0 +1,128 @@
+"""
+Unit tests for the in-process scheduler
+Tests cron parsing and matching, and catching up on missed runs.
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+from scheduler import CronSchedule, Scheduler, parse_holidays
+
+
+class TestCronSchedule:
+
+    def test_parses_ranges_lists_and_steps(self):
+        schedule = CronSchedule('*/15 9-11 * * 1,3,5')
+
+        assert schedule.minutes == {0, 15, 30, 45}
+        assert schedule.hours == {9, 10, 11}
+        assert schedule.weekdays == {1, 3, 5}
+
+    def test_seven_is_sunday(self):
+        schedule = CronSchedule('0 9 * * 7')
+
+        assert schedule.matches(datetime(2025, 1, 5, 9, 0))  # a Sunday
+
+    @pytest.mark.parametrize('expression', ['0 9 * *', '60 9 * * *', '0 9 * * 1-8', '0 9 5-1 * *', '*/0 * * * *'])
+    def test_rejects_invalid_expressions(self, expression):
+        with pytest.raises(ValueError):
+            CronSchedule(expression)
+
+    def test_weekday_restriction(self):
+        schedule = CronSchedule('45 10 * * 1-5')
+
+        assert schedule.matches(datetime(2025, 1, 6, 10, 45))      # Monday
+        assert not schedule.matches(datetime(2025, 1, 4, 10, 45))  # Saturday
+        assert not schedule.matches(datetime(2025, 1, 6, 10, 46))
+
+    def test_day_of_month_or_day_of_week_when_both_restricted(self):
+        schedule = CronSchedule('0 9 1 * 1')
+
+        assert schedule.matches(datetime(2025, 1, 1, 9, 0))       # the 1st, a Wednesday
+        assert schedule.matches(datetime(2025, 1, 6, 9, 0))       # a Monday
+        assert not schedule.matches(datetime(2025, 1, 7, 9, 0))
+
+    def test_latest_within_window(self):
+        schedule = CronSchedule('45 10 * * *')
+        now = datetime(2025, 1, 6, 11, 30, 20)
+
+        assert schedule.latest(now, timedelta(minutes=90)) == datetime(2025, 1, 6, 10, 45)
+        assert schedule.latest(now, timedelta(minutes=30)) is None
+
+
+def job(name, expression, superseded_by=None, claimed=()):
+    function = Mock(name=name)
+    runs = set(claimed)
+
+    def claim(scheduled_for):
+        if scheduled_for in runs:
+            return False
+        runs.add(scheduled_for)
+        return True
+    return (name, CronSchedule(expression), function, claim, superseded_by), function
+
+
+class TestScheduler:
+
+    def test_runs_due_job_once(self):
+        entry, function = job('vote', '45 10 * * *')
+        scheduler = Scheduler([entry])
+
+        scheduler.run_pending(datetime(2025, 1, 6, 10, 45, 10))
+        scheduler.run_pending(datetime(2025, 1, 6, 10, 45, 40))
+
+        function.assert_called_once()
+
+    def test_catches_up_within_window_in_schedule_order(self):
+        calls = []
+        early, _ = job('early', '0 9 * * *')
+        late, _ = job('late', '30 9 * * *')
+        early[2].side_effect = lambda: calls.append('early')
+        late[2].side_effect = lambda: calls.append('late')
+
+        Scheduler([late, early], catchup=timedelta(minutes=90)).run_pending(datetime(2025, 1, 6, 10, 0))
+
+        assert calls == ['early', 'late']
+
+    def test_vote_is_skipped_when_its_close_is_due_too(self):
+        vote, create = job('vote', '45 10 * * *', superseded_by='close-vote')
+        close, close_poll = job('close-vote', '16 12 * * *')
+        scheduler = Scheduler([vote, close], catchup=timedelta(minutes=120))
+
+        scheduler.run_pending(datetime(2025, 1, 6, 12, 20))
+        scheduler.run_pending(datetime(2025, 1, 6, 12, 21))
+
+        create.assert_not_called()
+        close_poll.assert_called_once()
+
+    def test_vote_after_close_still_runs(self):
+        vote, create = job('vote', '30 12 * * *', superseded_by='close-vote')
+        close, close_poll = job('close-vote', '16 12 * * *')
+
+        Scheduler([vote, close], catchup=timedelta(minutes=60)).run_pending(datetime(2025, 1, 6, 12, 40))
+
+        close_poll.assert_called_once()
+        create.assert_called_once()
+
+    def test_claimed_run_is_not_repeated(self):
+        entry, function = job('vote', '45 10 * * *', claimed={datetime(2025, 1, 6, 10, 45)})
+
+        Scheduler([entry]).run_pending(datetime(2025, 1, 6, 10, 50))
+
+        function.assert_not_called()
+
+    def test_holidays_are_skipped(self):
+        entry, function = job('vote', '45 10 * * *')
+
+        Scheduler([entry], holidays=parse_holidays('2025-01-06')).run_pending(datetime(2025, 1, 6, 10, 45))
+
+        function.assert_not_called()
+
+    def test_failing_job_does_not_stop_others(self):
+        broken, _ = job('broken', '0 9 * * *')
+        broken[2].side_effect = RuntimeError("boom")
+        entry, function = job('vote', '0 9 * * *')
+
+        Scheduler([broken, entry]).run_pending(datetime(2025, 1, 6, 9, 0))
+
+        function.assert_called_once()
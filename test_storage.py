@@ -0,0 +1,164 @@
+"""
+Unit tests for the SQLite chat store
+Tests the one-time JSON import, vote upserts and concurrent writers.
+"""
+
+import json
+import threading
+from datetime import datetime, timedelta
+import pytest
+import storage
+from history import HistoryJournal
+from storage import ChatStore
+
+
+@pytest.fixture
+def legacy_files(tmp_path, monkeypatch):
+    files = {
+        'FOOD_FILE': {'foods': ["Phở bò", "Bún chả"]},
+        'ACTIVE_VOTE_FILE': {'food_poll': {'poll_id': 'p1', 'message_id': 7, 'votes': {'An': "Phở bò"}}},
+        'COMPLETED_VOTE_FILE': {'2025-01-02': {'food': "Bún chả"}, '2025-01-01': {'food': "Phở bò"}},
+        'WEEK_FOOD': {'selected_foods': ["Bún chả"], 'timestamps': ['2025-01-02T12:16:00']},
+    }
+    for name, content in files.items():
+        path = tmp_path / f'{name.lower()}.json'
+        path.write_text(json.dumps(content, ensure_ascii=False), encoding='utf-8')
+        monkeypatch.setattr(storage, name, str(path))
+    return files
+
+
+def make_store(tmp_path, legacy_import=False):
+    history = HistoryJournal(str(tmp_path / 'history.jsonl'), str(tmp_path / 'history_snapshot.jsonl'),
+                             compact_bytes=1024 * 1024)
+    return ChatStore(str(tmp_path / 'lunch_bot.db'), history, legacy_import=legacy_import)
+
+
+class TestJsonImport:
+
+    def test_legacy_files_are_imported_on_first_use(self, tmp_path, legacy_files):
+        store = make_store(tmp_path, legacy_import=True)
+
+        assert store.load_foods() == ["Phở bò", "Bún chả"]
+        poll = store.load_active_state()['food_poll']
+        assert poll['message_id'] == 7
+        assert poll['votes'] == {'An': "Phở bò"}
+        assert [key for key, _ in store.history.iter_records()] == ['2025-01-01', '2025-01-02']
+        assert [food for food, _ in store.load_recent_foods(datetime(2025, 1, 1))] == ["Bún chả"]
+
+    def test_import_runs_once_unless_forced(self, tmp_path, legacy_files):
+        store = make_store(tmp_path, legacy_import=True)
+        store.add_food("Cơm tấm")
+
+        assert store.import_json_files() is False
+        assert "Cơm tấm" in store.load_foods()
+
+        assert store.import_json_files(force=True) is True
+        assert store.load_foods() == ["Phở bò", "Bún chả"]
+
+    def test_forced_import_does_not_duplicate_history(self, tmp_path, legacy_files):
+        store = make_store(tmp_path, legacy_import=True)
+
+        store.import_json_files(force=True)
+
+        assert len(list(store.history.iter_records())) == 2
+
+    def test_other_chats_skip_the_legacy_files(self, tmp_path, legacy_files):
+        store = make_store(tmp_path)
+
+        assert store.load_foods() == []
+        assert store.get_meta('json_imported') is None
+
+
+class TestVotes:
+
+    @pytest.fixture
+    def store(self, tmp_path):
+        store = make_store(tmp_path)
+        store.save_active_state({'food_poll': {'poll_id': 'p1', 'votes': {}}})
+        return store
+
+    def test_upsert_replaces_the_previous_answer(self, store):
+        store.upsert_vote('p1', 'An', "Phở bò", user_id=11)
+        store.upsert_vote('p1', 'An', "Bún chả")
+
+        assert store.load_votes('p1') == {'An': "Bún chả"}
+        assert store.user_ids(['An', 'Bình']) == {'An': '11'}
+
+    def test_delete_retracts_a_vote(self, store):
+        store.upsert_vote('p1', 'An', "Phở bò")
+        store.upsert_vote('p1', 'Bình', "Bún chả")
+
+        store.delete_vote('p1', 'An')
+
+        assert store.load_votes('p1') == {'Bình': "Bún chả"}
+
+    def test_saving_loaded_state_keeps_later_votes(self, store):
+        state = store.load_active_state()
+        store.upsert_vote('p1', 'An', "Phở bò")
+
+        store.save_active_state(state)
+
+        assert store.load_votes('p1') == {'An': "Phở bò"}
+
+    def test_new_poll_drops_votes_of_the_old_one(self, store):
+        store.upsert_vote('p1', 'An', "Phở bò")
+
+        store.save_active_state({'food_poll': {'poll_id': 'p2', 'votes': {}}})
+
+        assert store.load_votes('p1') == {}
+        assert store.get_active('food_poll') == {'poll_id': 'p2'}
+
+    def test_failed_transaction_is_rolled_back(self, store):
+        with pytest.raises(RuntimeError):
+            with store.transaction() as conn:
+                conn.execute("INSERT INTO foods(name, key) VALUES ('Phở bò', 'pho bo')")
+                raise RuntimeError("boom")
+
+        assert store.load_foods() == []
+
+
+class TestConcurrentWriters:
+
+    def test_threads_writing_at_once_lose_no_votes(self, tmp_path):
+        store = make_store(tmp_path)
+        store.save_active_state({'food_poll': {'poll_id': 'p1', 'votes': {}}})
+        errors = []
+
+        def vote(worker):
+            try:
+                for i in range(20):
+                    store.upsert_vote('p1', f'user {worker}-{i}', "Phở bò")
+                    store.add_food(f"Món {worker}-{i}")
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=vote, args=(worker,)) for worker in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        assert len(store.load_votes('p1')) == 80
+        assert len(store.load_foods()) == 80
+
+
+class TestScheduleRuns:
+
+    def test_each_run_is_claimed_once_across_stores(self, tmp_path):
+        first, second = make_store(tmp_path), make_store(tmp_path)
+        run = datetime.now().replace(second=0, microsecond=0)
+
+        assert first.claim_schedule_run('vote -100', run) is True
+        assert second.claim_schedule_run('vote -100', run) is False
+        assert second.claim_schedule_run('close-vote -100', run) is True
+
+    def test_old_claims_are_pruned(self, tmp_path):
+        store = make_store(tmp_path)
+        now = datetime.now().replace(second=0, microsecond=0)
+        store.claim_schedule_run('vote -100', now - storage.SCHEDULE_RUNS_KEEP - timedelta(days=1))
+
+        store.claim_schedule_run('vote -100', now)
+
+        rows = store.get_connection().execute('SELECT scheduled_for FROM schedule_runs').fetchall()
+        assert rows == [(now.isoformat(),)]
@@ -0,0 +1,84 @@
+"""
+Unit tests for the in-memory poll tally
+Tests votes, changed and retracted votes, and rebuilding a tally from storage.
+"""
+
+import pytest
+import tally
+from tally import PollTally, get_tally, discard_tally
+
+OPTIONS = ["Phở bò", "Bún chả", "Nhịn"]
+
+
+@pytest.fixture(autouse=True)
+def no_cached_tallies():
+    tally._tallies.clear()
+    yield
+    tally._tallies.clear()
+
+
+def poll(poll_id):
+    return {'poll_id': poll_id, 'options': OPTIONS}
+
+
+class TestPollTally:
+
+    def test_votes_are_counted_in_poll_order(self):
+        poll_tally = PollTally('p1', OPTIONS)
+
+        poll_tally.vote('An', "Bún chả")
+        poll_tally.vote('Bình', "Phở bò")
+        poll_tally.vote('Chi', "Bún chả")
+
+        assert list(poll_tally.counts().items()) == [("Phở bò", 1), ("Bún chả", 2)]
+        assert poll_tally.voter_lists()["Bún chả"] == ['An', 'Chi']
+        assert poll_tally.total == 3
+
+    def test_changed_vote_moves_the_voter(self):
+        poll_tally = PollTally('p1', OPTIONS)
+        poll_tally.vote('An', "Phở bò")
+
+        assert poll_tally.vote('An', "Nhịn") == "Phở bò"
+
+        assert poll_tally.counts() == {"Nhịn": 1}
+        assert poll_tally.total == 1
+
+    def test_retract_removes_the_vote(self):
+        poll_tally = PollTally('p1', OPTIONS)
+        poll_tally.vote('An', "Phở bò")
+
+        assert poll_tally.retract('An') == "Phở bò"
+        assert poll_tally.retract('An') is None
+
+        assert poll_tally.counts() == {}
+        assert poll_tally.total == 0
+
+
+class TestTallyCache:
+
+    def test_rebuilt_from_storage_once(self):
+        load_votes = lambda: {'An': "Phở bò", 'Bình': "Bún chả"}
+        calls = []
+
+        first = get_tally(-100, poll('p1'), lambda: calls.append(1) or load_votes())
+        second = get_tally('-100', poll('p1'), lambda: calls.append(1) or load_votes())
+
+        assert first is second
+        assert calls == [1]
+        assert first.counts() == {"Phở bò": 1, "Bún chả": 1}
+
+    def test_new_poll_of_a_chat_replaces_the_old_tally(self):
+        old = get_tally('-100', poll('p1'), lambda: {'An': "Phở bò"})
+
+        new = get_tally('-100', poll('p2'), dict)
+
+        assert new is not old
+        assert new.total == 0
+        assert list(tally._tallies) == ['-100']
+
+    def test_discard_forces_a_rebuild(self):
+        get_tally('-100', poll('p1'), dict).vote('An', "Phở bò")
+
+        discard_tally(-100)
+
+        assert get_tally('-100', poll('p1'), lambda: {'Bình': "Nhịn"}).voter_lists() == {"Nhịn": ['Bình']}
@@ -0,0 +1,84 @@
+"""
+Unit tests for the webhook server
+Tests posting a recorded update with a wrong and a right secret token.
+"""
+
+import json
+import threading
+import urllib.error
+import urllib.request
+import pytest
+import telebot
+from webhook import SECRET_HEADER, create_server
+
+PATH = '/telegram/webhook'
+SECRET = 'test-secret'
+
+# Update as Telegram posts it for "/list" sent in a group
+RECORDED_UPDATE = {
+    'update_id': 100001,
+    'message': {
+        'message_id': 42,
+        'date': 1736135100,
+        'from': {'id': 11, 'is_bot': False, 'first_name': "An"},
+        'chat': {'id': -100, 'type': 'group', 'title': "Lunch"},
+        'text': '/list',
+        'entities': [{'offset': 0, 'length': 5, 'type': 'bot_command'}],
+    },
+}
+
+
+@pytest.fixture
+def bot():
+    # threaded=False runs handlers inside process_new_updates
+    return telebot.TeleBot('123456:test-token', threaded=False)
+
+
+@pytest.fixture
+def server_url(bot):
+    server = create_server(bot, '127.0.0.1', 0, PATH, SECRET)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+
+def post(url, body, secret):
+    request = urllib.request.Request(url, data=json.dumps(body).encode('utf-8'), method='POST',
+                                     headers={'Content-Type': 'application/json', SECRET_HEADER: secret})
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+class TestWebhook:
+
+    def test_wrong_secret_is_refused(self, bot, server_url):
+        received = []
+        bot.message_handler(commands=['list'])(received.append)
+
+        assert post(server_url + PATH, RECORDED_UPDATE, 'wrong-secret') == 403
+        assert received == []
+
+    def test_update_is_dispatched_to_handlers(self, bot, server_url):
+        received = threading.Event()
+        messages = []
+
+        @bot.message_handler(commands=['list'])
+        def handle_list(message):
+            messages.append(message)
+            received.set()
+
+        assert post(server_url + PATH, RECORDED_UPDATE, SECRET) == 200
+        assert received.wait(timeout=5)
+        assert messages[0].chat.id == -100
+        assert messages[0].text == '/list'
+
+    def test_unknown_path_is_not_found(self, server_url):
+        assert post(server_url + '/other', RECORDED_UPDATE, SECRET) == 404
+
+    def test_invalid_body_is_rejected(self, server_url):
+        assert post(server_url + PATH, ['not', 'an', 'update'], SECRET) == 400
@@ -1,110 +1,72 @@
-import base64
-from google.genai import types
-from google import genai
-import os
-import json
-from datetime import datetime, timedelta
+import atexit
+from datetime import datetime
 import random
 from loguru import logger
 from config import (
-    bot, CHAT_ID, FOOD_FILE, ACTIVE_VOTE_FILE,
-    COMPLETED_VOTE_FILE, DEFAULT_FOOD_LIST,
-    GEMINI_API_KEY, WEEK_FOOD
+    bot, CHAT_ID, AI_MAX_WORKERS,
+    AI_MAX_QUEUE, AI_MAX_PER_CHAT, AI_STREAM_EDIT_INTERVAL,
+    OUTBOUND_GLOBAL_RATE, OUTBOUND_CHAT_RATE, OUTBOUND_CHAT_BURST,
+    OUTBOUND_EDIT_RATE, OUTBOUND_EDIT_BURST
 )
+from chats import get_chat, is_served, remember_poll, chat_for_poll, forget_poll
+from scheduler import CronSchedule
+from recommend import weighted_sample
+import stats
+from tally import get_tally, discard_tally
+from ai_worker import BoundedExecutor
+from gemini import stream_gemini
+from streaming_reply import StreamingReply
+from outbound import OutboundQueue
+import expense_sync
 # File operations
 
 
-def load_food_list():
-    try:
-        with open(FOOD_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        save_food_list(DEFAULT_FOOD_LIST)
-        return DEFAULT_FOOD_LIST
-
-
-def save_food_list(food_data):
-    with open(FOOD_FILE, 'w', encoding='utf-8') as f:
-        json.dump(food_data, f, ensure_ascii=False, indent=2)
-
-
-def load_active_votes():
-    try:
-        with open(ACTIVE_VOTE_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {}
-
-
-def load_completed_votes():
-    try:
-        with open(COMPLETED_VOTE_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {}
-
-
-def save_active_votes(votes):
-    with open(ACTIVE_VOTE_FILE, 'w', encoding='utf-8') as f:
-        json.dump(votes, f, ensure_ascii=False, indent=2)
-
-
-def save_completed_votes(votes):
-    with open(COMPLETED_VOTE_FILE, 'w', encoding='utf-8') as f:
-        json.dump(votes, f, ensure_ascii=False, indent=2)
-
-
-def save_week_food(votes):
-    with open(WEEK_FOOD, 'w', encoding='utf-8') as f:
-        json.dump(votes, f, ensure_ascii=False, indent=2)
+def load_food_list(chat_id):
+    return {'foods': get_chat(chat_id).store.load_foods()}
 
 
-def load_week_food():
-    try:
-        with open(WEEK_FOOD, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {'selected_foods': [], 'timestamps': []}
-
+def load_active_votes(chat_id):
+    return get_chat(chat_id).store.load_active_state()
 
-def update_week_food(selected_food):
-    week_food = load_week_food()
-    current_time = datetime.now().isoformat()
 
-    week_food['selected_foods'].append(selected_food)
-    week_food['timestamps'].append(current_time)
+def save_active_votes(chat_id, votes):
+    get_chat(chat_id).store.save_active_state(votes)
 
-    one_week_ago = (datetime.now() - timedelta(days=7)).isoformat()
 
-    new_selected_foods = []
-    new_timestamps = []
+def save_payment(message, key, record):
+    """Append a /debt payment with the Telegram ids of its people and copy it
+    to the expense tracker"""
+    chat = get_chat(message.chat.id)
+    chat.store.remember_user(record['payer'], message.from_user.id)
+    record['telegram_ids'] = chat.store.user_ids(record['participants'])
+    chat.history.append(key, record)
+    expense_sync.push_payment(chat.chat_id, key, record)
 
-    for food, timestamp in zip(week_food['selected_foods'], week_food['timestamps']):
-        try:
-            timestamp_dt = datetime.fromisoformat(timestamp)
-            one_week_ago_dt = datetime.fromisoformat(one_week_ago)
 
-            if timestamp_dt >= one_week_ago_dt:
-                new_selected_foods.append(food)
-                new_timestamps.append(timestamp)
-        except (ValueError, TypeError):
-            logger.error(f"Invalid timestamp format: {timestamp}")
-            continue
+ai_executor = BoundedExecutor(AI_MAX_WORKERS, AI_MAX_QUEUE, AI_MAX_PER_CHAT, name='ai')
+# Every message to Telegram goes through this queue
+outbox = OutboundQueue(bot, OUTBOUND_GLOBAL_RATE, OUTBOUND_CHAT_RATE, OUTBOUND_CHAT_BURST,
+                       OUTBOUND_EDIT_RATE, OUTBOUND_EDIT_BURST)
+# --vote/--close-vote without a daemon exit right after queueing their results
+atexit.register(outbox.flush, 60)
 
-    week_food['selected_foods'] = new_selected_foods
-    week_food['timestamps'] = new_timestamps
 
-    save_week_food(week_food)
-    logger.info(f"Updated week food list: added {selected_food}, total foods in past week: {len(new_selected_foods)}")
-    return week_food
+def update_week_food(chat_id, selected_food):
+    chat = get_chat(chat_id)
+    window = chat.recent_window()
+    now = datetime.now()
+    window.add(selected_food, now)
+    chat.store.add_recent_food(selected_food, now, window.cutoff(now))
+    logger.info(f"Updated week food list: added {selected_food}, total foods in past week: {len(window)}")
+    return window
 
 
-def get_available_foods():
-    food_data = load_food_list()
-    week_food = load_week_food()
+def get_available_foods(chat_id):
+    food_data = load_food_list(chat_id)
+    window = get_chat(chat_id).recent_window()
 
     available_foods = [food for food in food_data['foods']
-                       if food not in week_food['selected_foods']]
+                       if food not in window]
 
     if len(available_foods) < 3:
         logger.info("Available foods too few, adding some from previous week")
@@ -114,6 +76,12 @@ def get_available_foods():
 
 def bot_command_handlers():
 
+    bot.poll_answer_handler()(handle_poll_answer)
+
+    # Commands with state only answer groups from CHAT_IDS, each from its own partition
+    def served(message):
+        return is_served(message.chat.id)
+
     @bot.message_handler(commands=['start'])
     def send_welcome(message):
         help_text = """
@@ -121,78 +89,108 @@ def bot_command_handlers():
     1️⃣ Gợi ý món ăn:
     /add [tên món] - Thêm món ăn mới
     /list - Xem danh sách món ăn
+    /find [tên món] - Tìm món (không cần dấu, gõ sai chút cũng được)
     /remove [tên món] - Xóa món ăn
     2️⃣ Tính tiền nhóm:
     /debt [số tiền] - Khai báo số tiền (dành cho người được chọn trả tiền)
+    /stats [YYYY-MM] - Thống kê món ăn, người hay nhịn, tiền trung bình
+    3️⃣ Lịch của nhóm:
+    /schedule - Xem lịch tạo/đóng poll
+    /schedule vote|close [cron] - Đổi lịch, ví dụ: /schedule vote 45 10 * * 1-5
     ⚠️ Các tính năng khác được chạy tự động theo lịch:
     - Tạo poll chọn món ăn
     - Đóng poll chọn món
         """
-        bot.reply_to(message, help_text)
+        outbox.reply_to(message, help_text)
         logger.info(f"User {message.from_user.first_name} started bot")
 
-    @bot.message_handler(commands=['add'])
+    @bot.message_handler(commands=['add'], func=served)
     def add_food(message):
         try:
             food_name = ' '.join(message.text.split()[1:])
             if not food_name:
-                bot.reply_to(message, "Vui lòng nhập tên món ăn! Ví dụ: /add Phở bò")
+                outbox.reply_to(message, "Vui lòng nhập tên món ăn! Ví dụ: /add Phở bò")
                 return
-            food_data = load_food_list()
-            if food_name in food_data['foods']:
-                bot.reply_to(message, f"Món {food_name} đã có trong danh sách!")
+            stored = get_chat(message.chat.id).add_food(food_name)
+            if stored != food_name:
+                outbox.reply_to(message, f"Món {stored} đã có trong danh sách!")
                 return
-            food_data['foods'].append(food_name)
-            save_food_list(food_data)
-            bot.reply_to(message, f"Đã thêm món {food_name} vào danh sách!")
+            outbox.reply_to(message, f"Đã thêm món {food_name} vào danh sách!")
             logger.info(f"Added food: {food_name} by {message.from_user.first_name}")
         except Exception as e:
             logger.error(f"Error adding food: {str(e)}")
-            bot.reply_to(message, "Có lỗi xảy ra khi thêm món ăn!")
+            outbox.reply_to(message, "Có lỗi xảy ra khi thêm món ăn!")
 
-    @bot.message_handler(commands=['remove'])
+    @bot.message_handler(commands=['remove'], func=served)
     def remove_food(message):
         try:
             food_name = ' '.join(message.text.split()[1:])
             if not food_name:
-                bot.reply_to(message, "Vui lòng nhập tên món ăn cần xóa! Ví dụ: /remove Phở bò")
+                outbox.reply_to(message, "Vui lòng nhập tên món ăn cần xóa! Ví dụ: /remove Phở bò")
                 return
-            food_data = load_food_list()
-            if food_name not in food_data['foods']:
-                bot.reply_to(message, f"Không tìm thấy món {food_name} trong danh sách!")
+            removed = get_chat(message.chat.id).remove_food(food_name)
+            if removed is None:
+                outbox.reply_to(message, f"Không tìm thấy món {food_name} trong danh sách!")
                 return
-            food_data['foods'].remove(food_name)
-            save_food_list(food_data)
-            bot.reply_to(message, f"Đã xóa món {food_name} khỏi danh sách!")
+            outbox.reply_to(message, f"Đã xóa món {removed} khỏi danh sách!")
             logger.info(f"Removed food: {food_name} by {message.from_user.first_name}")
         except Exception as e:
             logger.error(f"Error removing food: {str(e)}")
-            bot.reply_to(message, "Có lỗi xảy ra khi xóa món ăn!")
+            outbox.reply_to(message, "Có lỗi xảy ra khi xóa món ăn!")
 
-    @bot.message_handler(commands=['list'])
+    @bot.message_handler(commands=['find'], func=served)
+    def find_food(message):
+        try:
+            query = ' '.join(message.text.split()[1:])
+            if not query:
+                outbox.reply_to(message, "Vui lòng nhập tên món cần tìm! Ví dụ: /find pho")
+                return
+            found = get_chat(message.chat.id).catalog().search(query)
+            if not found:
+                outbox.reply_to(message, f"Không tìm thấy món nào giống \"{query}\"")
+                return
+            food_list = "\n".join(f"- {food}" for food in found)
+            outbox.reply_to(message, f"🔎 Kết quả cho \"{query}\":\n\n{food_list}")
+        except Exception as e:
+            logger.error(f"Error finding food: {str(e)}")
+            outbox.reply_to(message, "Có lỗi xảy ra khi tìm món ăn!")
+
+    @bot.message_handler(commands=['list'], func=served)
     def list_foods(message):
         try:
-            food_data = load_food_list()
-            food_list = "\n".join([f"- {food}" for food in food_data['foods']])
-            response = f"📋 Danh sách món ăn:\n\n{food_list}"
-            bot.reply_to(message, response)
+            text, markup = render_food_page(message.chat.id, 0)
+            outbox.reply_to(message, text, reply_markup=markup)
             logger.info(f"Listed foods for {message.from_user.first_name}")
         except Exception as e:
             logger.error(f"Error listing foods: {str(e)}")
-            bot.reply_to(message, "Có lỗi xảy ra khi hiển thị danh sách món ăn!")
+            outbox.reply_to(message, "Có lỗi xảy ra khi hiển thị danh sách món ăn!")
+
+    def is_list_page(call):
+        return bool(call.data) and call.data.startswith('list:') and is_served(call.message.chat.id)
+
+    @bot.callback_query_handler(func=is_list_page)
+    def turn_food_page(call):
+        try:
+            text, markup = render_food_page(call.message.chat.id, int(call.data.split(':', 1)[1]))
+            # Edit the list in place instead of sending a new message
+            outbox.edit_message_text(text, call.message.chat.id, call.message.message_id,
+                                     reply_markup=markup)
+        except Exception as e:
+            logger.error(f"Error turning food list page: {str(e)}")
+        outbox.answer_callback_query(call)
 
-    @bot.message_handler(commands=['debt'])
+    @bot.message_handler(commands=['debt'], func=served)
     def register_debt(message):
         try:
             now = datetime.now()
-            active_votes = load_active_votes()
+            active_votes = load_active_votes(message.chat.id)
             if 'today_foods' not in active_votes or 'voters' not in active_votes:
-                bot.reply_to(message, "Chưa có bữa ăn nào được chọn!")
+                outbox.reply_to(message, "Chưa có bữa ăn nào được chọn!")
                 return
             try:
                 amount = float(message.text.split()[1])
             except (IndexError, ValueError):
-                bot.reply_to(message, "Vui lòng nhập số tiền hợp lệ! Ví dụ: /debt 100000")
+                outbox.reply_to(message, "Vui lòng nhập số tiền hợp lệ! Ví dụ: /debt 100000")
                 return
             # Get payer info
             payer = message.from_user
@@ -206,7 +204,7 @@ def bot_command_handlers():
             participants = list(set(all_voters + [payer_name]))
             total_participants = len(participants)
             if total_participants == 0:
-                bot.reply_to(message, "Không có người tham gia nào được ghi nhận!")
+                outbox.reply_to(message, "Không có người tham gia nào được ghi nhận!")
                 return
             per_person = amount / total_participants
             # Get list of people who voted "Nhịn" for display
@@ -231,10 +229,9 @@ def bot_command_handlers():
                 for idx, participant in enumerate(sorted(skipped_participants), 1):
                     result += f"{idx}. {participant}\n"
             result += "\n💡 Vui lòng chuyển khoản cho người trả tiền!"
-            bot.send_message(CHAT_ID, result)
+            outbox.send_message(message.chat.id, result)
             # Save to completed votes with full datetime
-            completed_votes = load_completed_votes()
-            completed_votes[now.isoformat()] = {
+            save_payment(message, now.isoformat(), {
                 'type': 'payment',
                 'datetime': now.isoformat(),
                 'payer': payer_name,
@@ -244,11 +241,10 @@ def bot_command_handlers():
                 'total_participants': total_participants,
                 'participants': sorted_participants,
                 'skipped_participants': sorted(skipped_participants)  # Add list of people who skipped
-            }
-            save_completed_votes(completed_votes)
+            })
             # Clear active votes
             active_votes.clear()
-            save_active_votes(active_votes)
+            save_active_votes(message.chat.id, active_votes)
             logger.info(
                 f"Payment registered: {amount} by {payer_name}, "
                 f"per person: {per_person}, total participants: {total_participants}, "
@@ -256,29 +252,28 @@ def bot_command_handlers():
             )
         except Exception as e:
             logger.error(f"Error registering debt: {str(e)}")
-            bot.reply_to(message, "Có lỗi xảy ra khi xử lý khai báo tiền!")
+            outbox.reply_to(message, "Có lỗi xảy ra khi xử lý khai báo tiền!")
             try:
                 current_time = datetime.now().strftime("%H:%M")
-                active_votes = load_active_votes()
+                active_votes = load_active_votes(message.chat.id)
                 if 'today_foods' not in active_votes:
-                    bot.reply_to(message, "Chưa có bữa ăn nào được chọn!")
+                    outbox.reply_to(message, "Chưa có bữa ăn nào được chọn!")
                     return
                 try:
                     amount = float(message.text.split()[1])
                 except (IndexError, ValueError):
-                    bot.reply_to(message, "Vui lòng nhập số tiền hợp lệ! Ví dụ: /debt 100000")
+                    outbox.reply_to(message, "Vui lòng nhập số tiền hợp lệ! Ví dụ: /debt 100000")
                     return
                 # Lấy thông tin người trả tiền
                 payer = message.from_user
                 payer_name = f"{payer.first_name} {payer.last_name if payer.last_name else ''}".strip()
-                # Lấy vote gần nhất từ completed_votes
-                completed_votes = load_completed_votes()
-                if not completed_votes:
+                # Lấy vote gần nhất từ lịch sử
+                latest_vote = get_chat(message.chat.id).history.latest()
+                if not latest_vote:
                     # Nếu không có vote nào trước đó, tạo danh sách chỉ với người trả tiền
                     total_participants = 1
                     participants = [payer_name]
                 else:
-                    latest_vote = max(completed_votes.items(), key=lambda x: x[0])
                     vote_data = latest_vote[1]
                     votes = vote_data.get('votes', {})
                     # Tạo danh sách người tham gia từ votes và người trả tiền
@@ -300,9 +295,9 @@ def bot_command_handlers():
                     else:
                         result += f"{idx}. {participant}: {per_person:,.0f}đ\n"
                 result += "\n💡 Vui lòng chuyển khoản cho người trả tiền!"
-                bot.send_message(CHAT_ID, result)
+                outbox.send_message(message.chat.id, result)
                 # Save to completed votes
-                completed_votes[datetime.now().isoformat()] = {
+                save_payment(message, datetime.now().isoformat(), {
                     'type': 'payment',
                     'time': current_time,
                     'payer': payer_name,
@@ -311,18 +306,17 @@ def bot_command_handlers():
                     'food': active_votes['today_foods'],
                     'total_participants': total_participants,
                     'participants': sorted_participants
-                }
-                save_completed_votes(completed_votes)
+                })
                 # Clear active votes
                 active_votes.clear()
-                save_active_votes(active_votes)
+                save_active_votes(message.chat.id, active_votes)
                 logger.bind(completed_vote=True).info(
                     f"Payment registered at {current_time}: {amount} by {payer_name}, "
                     f"per person: {per_person}, total participants: {total_participants}"
                 )
             except Exception as e:
                 logger.error(f"Error registering debt: {str(e)}")
-                bot.reply_to(message, "Có lỗi xảy ra khi xử lý khai báo tiền!")
+                outbox.reply_to(message, "Có lỗi xảy ra khi xử lý khai báo tiền!")
 
     @bot.message_handler(commands=['ai'])
     def handle_ai_command(message):
@@ -331,67 +325,151 @@ def bot_command_handlers():
 
             # Trích xuất nội dung sau lệnh /ai
             command_parts = message.text.split(' ', 1)
-            if len(command_parts) > 1:
-                prompt = command_parts[1].strip()
-                logger.info(f"Extracted prompt: {prompt}")
-
-                if prompt:
-                    bot.send_chat_action(message.chat.id, 'typing')
-                    response = chat_with_gemini(prompt)
-                    bot.reply_to(message, response)
-                    logger.info("Response sent successfully")
-                else:
-                    bot.reply_to(message, "Vui lòng cung cấp nội dung sau lệnh /ai!")
-            else:
-                bot.reply_to(message, "Vui lòng cung cấp nội dung sau lệnh /ai!")
+            prompt = command_parts[1].strip() if len(command_parts) > 1 else ''
+            if not prompt:
+                outbox.reply_to(message, "Vui lòng cung cấp nội dung sau lệnh /ai!")
+                return
+            logger.info(f"Extracted prompt: {prompt}")
+
+            # Gemini runs on the AI pool, the handler thread returns at once
+            if ai_executor.submit(message.chat.id, answer_ai_prompt, message, prompt) is None:
+                outbox.reply_to(message, "⏳ Bot đang bận trả lời các câu hỏi khác, thử lại sau ít phút nhé!")
+                logger.warning(f"AI pool saturated, rejected prompt from chat {message.chat.id}")
 
         except Exception as e:
             logger.error(f"Error in handle_ai_command: {str(e)}")
-            bot.reply_to(message, "Xin lỗi, đã xảy ra lỗi khi xử lý yêu cầu của bạn.")
+            outbox.reply_to(message, "Xin lỗi, đã xảy ra lỗi khi xử lý yêu cầu của bạn.")
+
+    @bot.message_handler(commands=['stats'], func=served)
+    def show_stats(message):
+        try:
+            parts = message.text.split()
+            month = parts[1] if len(parts) > 1 else datetime.now().strftime('%Y-%m')
+            try:
+                datetime.strptime(month, '%Y-%m')
+            except ValueError:
+                outbox.reply_to(message, "Vui lòng nhập tháng hợp lệ! Ví dụ: /stats 2025-01")
+                return
+            months = stats.monthly_stats(get_chat(message.chat.id))
+            outbox.reply_to(message, stats.format_report(months, month))
+            logger.info(f"Stats {month} for {message.from_user.first_name}")
+        except Exception as e:
+            logger.error(f"Error showing stats: {str(e)}")
+            outbox.reply_to(message, "Có lỗi xảy ra khi tính thống kê!")
+
+    @bot.message_handler(commands=['schedule'], func=served)
+    def set_schedule(message):
+        try:
+            chat = get_chat(message.chat.id)
+            parts = message.text.split(maxsplit=2)
+            if len(parts) == 1:
+                outbox.reply_to(message, (
+                    f"⏰ Lịch của nhóm:\n"
+                    f"- Tạo poll: {chat.schedule('vote')}\n"
+                    f"- Đóng poll: {chat.schedule('close-vote')}"
+                ))
+                return
+            job = {'vote': 'vote', 'close': 'close-vote'}.get(parts[1])
+            if job is None or len(parts) < 3:
+                outbox.reply_to(message, "Cú pháp: /schedule vote|close [cron]. Ví dụ: /schedule vote 45 10 * * 1-5")
+                return
+            try:
+                expression = CronSchedule(parts[2]).expression
+            except ValueError:
+                outbox.reply_to(message, f"Lịch không hợp lệ: {parts[2]}")
+                return
+            chat.set_schedule(job, expression)
+            outbox.reply_to(message, f"Đã đổi lịch {parts[1]} thành: {expression}")
+            logger.info(f"Schedule {job} of {chat.chat_id} set to '{expression}' by {message.from_user.first_name}")
+        except Exception as e:
+            logger.error(f"Error setting schedule: {str(e)}")
+            outbox.reply_to(message, "Có lỗi xảy ra khi đổi lịch!")
+
+
+def render_food_page(chat_id, page):
+    """Text and prev/next keyboard of one /list page"""
+    pages = get_chat(chat_id).list_pages()
+    if not pages:
+        return "📋 Danh sách món ăn trống. Thêm món bằng /add [tên món]", None
+    page = max(0, min(page, len(pages) - 1))
+    total = sum(len(p) for p in pages)
+    food_list = "\n".join(f"- {food}" for food in pages[page])
+    text = f"📋 Danh sách món ăn ({total} món, trang {page + 1}/{len(pages)}):\n\n{food_list}"
+    if len(pages) == 1:
+        return text, None
+    from telebot.types import InlineKeyboardMarkup, InlineKeyboardButton
+    buttons = []
+    if page > 0:
+        buttons.append(InlineKeyboardButton("◀️ Trước", callback_data=f"list:{page - 1}"))
+    if page < len(pages) - 1:
+        buttons.append(InlineKeyboardButton("Sau ▶️", callback_data=f"list:{page + 1}"))
+    return text, InlineKeyboardMarkup().row(*buttons)
+
+
+def answer_ai_prompt(message, prompt):
+    reply = StreamingReply(outbox.blocking, message, interval=AI_STREAM_EDIT_INTERVAL)
+    try:
+        reply.start()
+        for chunk in stream_gemini(prompt):
+            reply.feed(chunk)
+        reply.finish()
+        logger.info(f"Response streamed in {len(reply.sent_messages)} message(s)")
+    except Exception as e:
+        logger.error(f"Error answering AI prompt: {str(e)}")
+        if reply.sent_messages:
+            reply.fail("⚠️ Xin lỗi, đã xảy ra lỗi khi xử lý yêu cầu của bạn.")
+        else:
+            outbox.reply_to(message, "Xin lỗi, đã xảy ra lỗi khi xử lý yêu cầu của bạn.")
 
 
-@bot.poll_answer_handler()
 def handle_poll_answer(poll_answer):
     try:
-        active_votes = load_active_votes()
-        if 'food_poll' not in active_votes:
+        chat = chat_for_poll(poll_answer.poll_id)
+        if chat is None:
+            return
+        poll_data = chat.store.get_active('food_poll')
+        if not poll_data:
             return
-        poll_data = active_votes['food_poll']
         if poll_answer.poll_id != poll_data['poll_id']:
             return
         user = poll_answer.user
         user_name = f"{user.first_name} {user.last_name if user.last_name else ''}"
-        option_id = poll_answer.option_ids[0]
-        if 'votes' not in poll_data:
-            poll_data['votes'] = {}
-        poll_data['votes'][user_name] = poll_data['options'][option_id]
-        active_votes['food_poll'] = poll_data
-        save_active_votes(active_votes)
-        logger.bind(active_vote=True).info(f"Vote recorded: {user_name} voted for {poll_data['options'][option_id]}")
+        poll_id = poll_data['poll_id']
+        tally = get_tally(chat.chat_id, poll_data, lambda: chat.store.load_votes(poll_id))
+        if not poll_answer.option_ids:
+            # Empty option_ids means the user retracted their vote
+            previous = tally.retract(user_name)
+            chat.store.delete_vote(poll_id, user_name)
+            logger.bind(active_vote=True).info(f"Vote retracted: {user_name} (was {previous})")
+            return
+        option = poll_data['options'][poll_answer.option_ids[0]]
+        tally.vote(user_name, option)
+        chat.store.upsert_vote(poll_id, user_name, option, user_id=user.id)
+        logger.bind(active_vote=True).info(f"Vote recorded: {user_name} voted for {option}")
     except Exception as e:
         logger.error(f"Error handling poll answer: {str(e)}")
 
 
-def create_food_poll():
+def create_food_poll(chat_id=CHAT_ID):
     try:
         current_time = datetime.now().strftime("%H:%M")
 
-        available_foods = get_available_foods()
+        available_foods = get_available_foods(chat_id)
 
-        if len(available_foods) > 8:
-            selected_foods = random.sample(available_foods, 8)
-        else:
-            selected_foods = available_foods
+        # Foods that did well in past polls are more likely to be offered again
+        scores = get_chat(chat_id).food_scores()
+        selected_foods = weighted_sample(
+            available_foods, [scores.score(food) for food in available_foods], 8)
 
         options = selected_foods + ['Nhịn', ]
-        poll = bot.send_poll(
-            CHAT_ID,
+        poll = outbox.blocking.send_poll(
+            chat_id,
             f"🍽️ [{current_time}] Hôm nay ăn gì?",
             options,
             is_anonymous=False,
             allows_multiple_answers=False
         )
-        active_votes = load_active_votes()
+        active_votes = load_active_votes(chat_id)
         active_votes['food_poll'] = {
             'poll_id': poll.poll.id,
             'message_id': poll.message_id,
@@ -399,39 +477,35 @@ def create_food_poll():
             'votes': {},
             'created_at': datetime.now().isoformat()
         }
-        save_active_votes(active_votes)
+        save_active_votes(chat_id, active_votes)
+        # The previous poll's tally is stale once its row is replaced
+        discard_tally(chat_id)
+        remember_poll(poll.poll.id, chat_id)
         logger.bind(active_vote=True).info(
-            f"Created food poll at {current_time} with {len(selected_foods)} available foods")
+            f"Created food poll in {chat_id} at {current_time} with {len(selected_foods)} available foods")
     except Exception as e:
-        logger.error(f"Error creating food poll: {str(e)}")
+        logger.error(f"Error creating food poll in {chat_id}: {str(e)}")
 
 
-def close_food_poll():
-    active_votes = load_active_votes()
+def close_food_poll(chat_id=CHAT_ID):
+    store = get_chat(chat_id).store
+    active_votes = store.load_active_state(with_votes=False)
     if 'food_poll' not in active_votes:
-        logger.error("No active food poll to close")
+        logger.error(f"No active food poll to close in {chat_id}")
         return
     poll_data = active_votes['food_poll']
-    # Get poll results
-    poll_message = bot.forward_message(CHAT_ID, CHAT_ID, poll_data['message_id'])
-    poll = poll_message.poll
-    if not poll:
-        logger.error("Could not get poll results")
-        bot.send_message(CHAT_ID, "❌ Không thể lấy kết quả poll!")
-        return
-    # Count votes
-    vote_counts = {}
-    voters = {}  # Track who voted for what
-    total_voters = 0
-    for i, option in enumerate(poll.options):
-        vote_count = option.voter_count
-        if vote_count > 0:
-            option_text = poll_data['options'][i]
-            vote_counts[option_text] = vote_count
-            # Store voters for this option from poll_data votes
-            voters[option_text] = [user for user, vote in poll_data['votes'].items()
-                                   if vote == option_text]
-            total_voters += vote_count
+    # Stop the poll in the group, results come from the local tally so the
+    # poll is never forwarded back into the chat
+    outbox.stop_poll(chat_id, poll_data['message_id'])
+    # The daemon kept the tally up to date answer by answer, the stored
+    # votes are only read when this process has none (e.g. after a restart)
+    poll_id = poll_data['poll_id']
+    tally = get_tally(chat_id, poll_data, lambda: store.load_votes(poll_id))
+    discard_tally(chat_id)
+    forget_poll(poll_data['poll_id'])
+    vote_counts = tally.counts()
+    voters = tally.voter_lists()  # Track who voted for what
+    total_voters = tally.total
     # Select winning food
     regular_options = [opt for opt in poll_data['options']
                        if opt not in ['Nhịn', ]]
@@ -450,78 +524,35 @@ def close_food_poll():
     else:
         selected_food = random.choice(regular_options)
 
-    update_week_food(selected_food)
+    update_week_food(chat_id, selected_food)
 
     # Store result with full datetime
     now = datetime.now()
     active_votes['today_foods'] = selected_food
     active_votes['vote_time'] = now.isoformat()
     active_votes['voters'] = voters  # Store who voted for what
-    save_active_votes(active_votes)
+    save_active_votes(chat_id, active_votes)
     # Save to completed votes
-    completed_votes = load_completed_votes()
-    completed_votes[now.isoformat()] = {
+    get_chat(chat_id).record_poll(now.isoformat(), {
         'type': 'food',
         'selected': selected_food,
         'poll_options': poll_data['options'],
         'vote_counts': vote_counts,
         'voters': voters
-    }
-    save_completed_votes(completed_votes)
+    })
     # Remove food poll but keep today's food and voters
     del active_votes['food_poll']
-    save_active_votes(active_votes)
+    save_active_votes(chat_id, active_votes)
     # Send results
     vote_summary = f"📊 Kết quả vote [{now.strftime('%Y-%m-%d %H:%M')}]:\n"
     for food, count in vote_counts.items():
         percentage = (count / total_voters) * 100
         vote_summary += f"- {food}: {count} vote ({percentage:.1f}%)\n"
-    bot.send_message(CHAT_ID, vote_summary)
+    outbox.send_message(chat_id, vote_summary)
     result_message = (
         f"🎉 Kết quả: Hôm nay chúng ta sẽ ăn {selected_food}!\n\n"
         "💰 Người thanh toán vui lòng dùng lệnh /debt [số tiền] để khai báo số tiền.\n"
         "Ví dụ: /debt 100000"
     )
-    bot.send_message(CHAT_ID, result_message)
-
+    outbox.send_message(chat_id, result_message)
 
-def chat_with_gemini(prompt):
-    """Send prompt to Gemini and get response"""
-    try:
-        client = genai.Client(
-            api_key=GEMINI_API_KEY,
-        )
-
-        model = "gemini-2.0-flash"
-        contents = [
-            types.Content(
-                role="user",
-                parts=[
-                    types.Part.from_text(
-                        text=prompt
-                    ),
-                ],
-            ),
-        ]
-
-        generate_content_config = types.GenerateContentConfig(
-            temperature=1,
-            top_p=0.95,
-            top_k=40,
-            max_output_tokens=8192,
-            response_mime_type="text/plain",
-        )
-
-        # Collect the response chunks
-        response_text = ""
-        for chunk in client.models.generate_content_stream(
-            model=model,
-            contents=contents,
-            config=generate_content_config,
-        ):
-            response_text += chunk.text
-
-        return response_text
-    except Exception as e:
-        logger.error(f"Error chatting with Gemini: {str(e)}")
-        return "Sorry, I encountered an error while processing your request."
@@ -0,0 +1,80 @@
+import hmac
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from loguru import logger
+import telebot
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+MAX_BODY_BYTES = 1024 * 1024
+
+
+def make_handler(bot, path, secret):
+    """Request handler class bound to one bot, webhook path and secret token"""
+
+    class WebhookHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path != path:
+                self._reply(404)
+                return
+            token = self.headers.get(SECRET_HEADER, '')
+            if not hmac.compare_digest(token.encode('utf-8'), secret.encode('utf-8')):
+                logger.warning(f"Webhook call with a bad secret token from {self.client_address[0]}")
+                self._reply(403)
+                return
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+            except ValueError:
+                length = -1
+            if length <= 0 or length > MAX_BODY_BYTES:
+                self._reply(400)
+                return
+            try:
+                update = telebot.types.Update.de_json(json.loads(self.rfile.read(length)))
+            except Exception as e:
+                logger.error(f"Invalid webhook update: {str(e)}")
+                self._reply(400)
+                return
+
+            # Acknowledge first so Telegram never waits on a handler
+            self._reply(200)
+            try:
+                bot.process_new_updates([update])
+            except Exception as e:
+                logger.error(f"Error dispatching update {update.update_id}: {str(e)}")
+
+        def do_GET(self):
+            self._reply(405)
+
+        def _reply(self, status):
+            self.send_response(status)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            self.wfile.flush()
+
+        def log_message(self, format, *args):
+            # BaseHTTPRequestHandler writes every request to stderr
+            logger.debug(f"Webhook {self.address_string()} {format % args}")
+
+    return WebhookHandler
+
+
+def create_server(bot, host, port, path, secret):
+    if not secret:
+        raise ValueError("WEBHOOK_SECRET is required for webhook mode")
+    return ThreadingHTTPServer((host, port), make_handler(bot, path, secret))
+
+
+def run_webhook(bot, host, port, path, secret, public_url=None):
+    """Serve Telegram updates over HTTP until interrupted"""
+    server = create_server(bot, host, port, path, secret)
+    if public_url:
+        bot.remove_webhook()
+        bot.set_webhook(url=public_url.rstrip('/') + path, secret_token=secret)
+        logger.info(f"Webhook registered at {public_url.rstrip('/')}{path}")
+    else:
+        logger.warning("WEBHOOK_URL not set, serving without registering the webhook")
+    logger.info(f"Webhook server listening on {host}:{port}{path}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()